@@ -0,0 +1,224 @@
+import asyncio
+import threading
+
+import serial
+
+from data_quality import DEVICE_SAMPLE_RATE
+
+# How often the serial transport checks for new bytes where the event loop cannot watch the port
+# directly (e.g. COM ports on Windows)
+SERIAL_POLL_INTERVAL = 0.002
+
+# Longest line accepted from any source; longer lines are cut
+MAX_LINE_LENGTH = 1024
+
+
+class Transport:
+    """
+    Line-oriented connection to a data source
+
+    Subclasses implement open/readline/write/close as coroutines. readline()
+    returns one line including its newline, or b'' once the source has closed.
+    A source is only read when readline() is awaited, so a slow consumer
+    automatically slows down reading (backpressure). `handshake` tells whether
+    the source answers the ready handshake (see device_session); `sample_rate`
+    is the rate in Hz its device samples at, which recordings are checked against.
+    """
+
+    name = "transport"
+    handshake = True
+    sample_rate = DEVICE_SAMPLE_RATE
+
+    async def open(self):
+        pass
+
+    async def readline(self):
+        raise NotImplementedError
+
+    async def write(self, data):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    def __str__(self):
+        return self.name
+
+
+class SerialTransport(Transport):
+    """pyserial port read without blocking: the event loop wakes on new bytes or polls briefly"""
+
+    def __init__(self, port, baudrate=115200):
+        self.port = port
+        self.baudrate = baudrate
+        self.name = port
+        self.serial_port = None
+        self._buffer = bytearray()
+        self._data_ready = None
+        self._watching = False
+
+    async def open(self):
+        self.serial_port = serial.Serial(self.port, self.baudrate, timeout=0)
+        self._data_ready = asyncio.Event()
+
+        # Let the event loop wake us when the port becomes readable (selector loops on POSIX)
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_reader(self.serial_port.fileno(), self._data_ready.set)
+            self._watching = True
+        except (NotImplementedError, AttributeError, ValueError, OSError):
+            self._watching = False
+
+    async def readline(self):
+        while True:
+            newline = self._buffer.find(b'\n')
+            if newline >= 0:
+                line = bytes(self._buffer[:newline + 1])
+                del self._buffer[:newline + 1]
+                return line
+            if len(self._buffer) > MAX_LINE_LENGTH:
+                line = bytes(self._buffer)
+                self._buffer.clear()
+                return line
+
+            chunk = self.serial_port.read(max(1, self.serial_port.in_waiting))
+            if chunk:
+                self._buffer += chunk
+            elif self._watching:
+                self._data_ready.clear()
+                await self._data_ready.wait()
+            else:
+                await asyncio.sleep(SERIAL_POLL_INTERVAL)
+
+    async def write(self, data):
+        self.serial_port.write(data)
+
+    async def close(self):
+        if self.serial_port is None:
+            return
+        if self._watching:
+            asyncio.get_running_loop().remove_reader(self.serial_port.fileno())
+            self._watching = False
+        self.serial_port.close()
+        self.serial_port = None
+
+
+class TcpTransport(Transport):
+    """TCP socket (e.g. a Wi-Fi bridge); the stream reader pauses the socket when its buffer is full"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = int(port)
+        self.name = f"tcp://{host}:{port}"
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, limit=MAX_LINE_LENGTH * 64)
+
+    async def readline(self):
+        try:
+            return await self.reader.readline()
+        except ConnectionError:
+            return b''
+
+    async def write(self, data):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.writer = None
+
+
+class ReplayTransport(Transport):
+    """
+    Replay a captured serial log (one line per line) as if it came from a device
+
+    Replay starts when the first command is written, like the receiver answering
+    a measurement command. `line_interval` spaces the lines in seconds (0: as fast
+    as the consumer reads).
+    """
+
+    handshake = False
+
+    def __init__(self, path, line_interval=0.0):
+        self.path = path
+        self.line_interval = line_interval
+        self.name = f"replay://{path}"
+        self._file = None
+        self._started = None
+
+    async def open(self):
+        self._file = open(self.path, 'rb')
+        self._started = asyncio.Event()
+
+    async def readline(self):
+        await self._started.wait()
+        if self.line_interval > 0:
+            await asyncio.sleep(self.line_interval)
+        line = self._file.readline(MAX_LINE_LENGTH)
+        if not line:
+            await asyncio.sleep(0)  # Still a suspension point when the file is exhausted
+        return line
+
+    async def write(self, data):
+        self._started.set()
+
+    async def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def open_transport(spec):
+    """
+    Create (not yet opened) the transport for a source name
+
+    'tcp://host:port'  - TCP socket
+    'replay://path'    - captured serial log
+    'sim://'           - simulated receiver, see simulated_device (options as query, e.g. sim://?drop=0.01)
+    anything else      - serial port name (COM3, /dev/ttyUSB0, or a pty)
+    """
+    if spec.startswith('tcp://'):
+        host, port = spec[len('tcp://'):].rsplit(':', 1)
+        return TcpTransport(host, port)
+    if spec.startswith('replay://'):
+        return ReplayTransport(spec[len('replay://'):])
+    if spec.startswith('sim://'):
+        from simulated_device import SimulatedDevice, LoopbackTransport
+        return LoopbackTransport(SimulatedDevice.from_spec(spec))
+    return SerialTransport(spec)
+
+
+class AsyncioLoopThread:
+    """
+    One asyncio event loop, shared by every acquisition, running beside the Tk main loop
+
+    Tk keeps the main thread; all transports run as tasks on this loop, so any
+    number of devices needs no extra threads. Coroutines are submitted from Tk
+    with submit() and cancelled through the returned future; results go back to
+    Tk with root.after, as elsewhere in the app. Keeping the loop off the Tk thread
+    means a long redraw never stalls reading a port.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="acquisition-loop", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine):
+        """Run a coroutine on the loop; returns a concurrent.futures.Future (cancel() cancels the task)"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,74 @@
+import numpy as np
+from scipy.fft import next_fast_len
+
+
+def estimate_lag(reference, other, fs, max_lag_seconds=None):
+    """
+    Estimate how far `other` lags behind `reference` using FFT cross-correlation
+
+    Both inputs may be 1-D signals or (..., n) arrays of signal pairs, so a whole
+    batch of sessions can be processed in one call. The integer lag of the
+    correlation peak is refined to sub-sample precision by fitting a parabola
+    through the peak and its two neighbours. Cost is O(n log n).
+
+    Returns a dict with:
+    'lag_samples': fractional lag in samples (positive: `other` is late)
+    'lag_seconds': the same lag in seconds
+    'correlation': normalized cross-correlation at the integer peak
+    """
+    x = np.asarray(reference, dtype=float)
+    y = np.asarray(other, dtype=float)
+    x = x - np.mean(x, axis=-1, keepdims=True)
+    y = y - np.mean(y, axis=-1, keepdims=True)
+    n = x.shape[-1]
+
+    # Circular correlation with enough zero padding to make it linear
+    n_fft = next_fast_len(2 * n - 1)
+    corr = np.fft.irfft(np.fft.rfft(y, n_fft, axis=-1) * np.conj(np.fft.rfft(x, n_fft, axis=-1)),
+                        n_fft, axis=-1)
+
+    # Reorder to lags -(n-1) .. (n-1)
+    corr = np.concatenate([corr[..., -(n - 1):], corr[..., :n]], axis=-1)
+    lags = np.arange(-(n - 1), n)
+
+    if max_lag_seconds is not None:
+        max_lag = max(1, int(round(max_lag_seconds * fs)))
+        keep = np.abs(lags) <= max_lag
+        corr = corr[..., keep]
+        lags = lags[keep]
+
+    peak = np.argmax(corr, axis=-1)
+
+    # Parabolic interpolation around the peak (not possible at the window edges)
+    inner = np.clip(peak, 1, corr.shape[-1] - 2)
+    left = np.take_along_axis(corr, (inner - 1)[..., None], axis=-1)[..., 0]
+    centre = np.take_along_axis(corr, inner[..., None], axis=-1)[..., 0]
+    right = np.take_along_axis(corr, (inner + 1)[..., None], axis=-1)[..., 0]
+    denominator = left - 2 * centre + right
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = np.where((peak == inner) & (denominator < 0), 0.5 * (left - right) / denominator, 0.0)
+
+    lag_samples = lags[peak] + offset
+
+    peak_value = np.take_along_axis(corr, peak[..., None], axis=-1)[..., 0]
+    norm = np.sqrt(np.sum(x ** 2, axis=-1) * np.sum(y ** 2, axis=-1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = np.where(norm > 0, peak_value / norm, 0.0)
+
+    return {
+        'lag_samples': lag_samples,
+        'lag_seconds': lag_samples / fs,
+        'correlation': correlation,
+    }
+
+
+def shift_signal(signal, lag_samples):
+    """
+    Shift a signal earlier by a (fractional) number of samples to undo a lag
+
+    Uses linear interpolation; samples shifted in from outside the recording
+    repeat the first or last value.
+    """
+    signal = np.asarray(signal, dtype=float)
+    positions = np.arange(len(signal))
+    return np.interp(positions + lag_samples, positions, signal)
@@ -1,16 +1,34 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+import os
 import threading
 import time
+import numpy as np
 
 # Import modules
+from acquisition import AsyncioLoopThread
 from data_acquisition import SerialDataCollector
+from device_session import DeviceSession
 from data_visualization import DataVisualizer
 from frequency_analysis import FrequencyAnalyzer
 from movement_analysis import MovementAnalyzer
 from force_analysis import ForceAnalyzer
 from bradykinesia_comparison import BradykinesiaComparison
 from tremor_comparison import TremorComparison  # New import
+from session_recorder import SessionRecorder, SessionRecording, new_session_path, save_session
+from resampling import resample_uniform, format_timing_report
+from data_quality import screen_recording, format_quality_report, DEVICE_SAMPLE_RATE
+from shared_recording import SharedRecording
+from calibration import list_profiles, load_profile, session_profile
+from session_analysis import trim_initial_data, analyze_session, summary_metrics, INITIAL_TRIM_SECONDS
+from report_generator import generate_reports
+from protocol_runner import (ProtocolRunner, DEFAULT_PROTOCOL, DEFAULT_REST_SECONDS, parse_protocol,
+                             create_protocol_pool)
+from trend_store import PatientTrendStore
+from trend_view import TrendView
+from session_index import SessionIndex, index_entry, write_thumbnail
+from session_browser import SessionBrowser
+from range_statistics import RecordingStatistics
 from ui_components import create_tab, create_logger
 
 
@@ -23,7 +41,31 @@ class SensorApp:
         # Data storage
         self.data = []
         self.collecting = False
-        self.collection_thread = None
+        self.collection_future = None
+        self.device_session = None
+        self.recorder = None
+        self.recording = None
+
+        # Shared memory copy of the ingested recording (resampled, without its settling time);
+        # app.data is a view of it and worker processes attach to it by name
+        self.shared_recording = None
+
+        # Worker processes analysing protocol tests, started with the first protocol
+        self.protocol_pool = None
+
+        # Set once per recording by the resampling stage and shared by every analyzer
+        self.sample_rate = None
+        self.timing_report = None
+        self.quality_report = None
+
+        # Recording without its settling time, the statistics of its time ranges and the
+        # (start, stop) rows selected on the Raw Data tab, which the analyses then use
+        self.trimmed_data = None
+        self.range_statistics = None
+        self.selection = None
+
+        # Calibration of the selected glove; converts raw sensor readings in every analyzer
+        self.calibration = load_profile()
 
         # Create the main notebook with tabs
         self.notebook = ttk.Notebook(self.root)
@@ -33,15 +75,21 @@ class SensorApp:
         self.setup_tab = ttk.Frame(self.notebook)
         self.raw_data_tab = ttk.Frame(self.notebook)
         self.analysis_tab = ttk.Frame(self.notebook)
+        self.sessions_tab = ttk.Frame(self.notebook)
 
         self.notebook.add(self.setup_tab, text="Setup & Control")
         self.notebook.add(self.raw_data_tab, text="Raw Data")
         self.notebook.add(self.analysis_tab, text="Analysis")
+        self.notebook.add(self.sessions_tab, text="Sessions")
+
+        # Searchable list of every recorded session
+        self.session_index = SessionIndex()
 
         # Initialize UI components
         self.initialize_ui()
 
         # Initialize modules
+        self.acquisition_loop = AsyncioLoopThread()
         self.data_collector = SerialDataCollector(self)
         self.data_visualizer = DataVisualizer(self)
         self.frequency_analyzer = FrequencyAnalyzer(self)
@@ -49,6 +97,11 @@ class SensorApp:
         self.force_analyzer = ForceAnalyzer(self)
         self.bradykinesia_comparison = BradykinesiaComparison(self)
         self.tremor_comparison = TremorComparison(self)  # New analyzer
+        self.protocol_runner = ProtocolRunner(self, self.data_collector)
+        self.trend_view = TrendView(self)
+        self.session_browser = SessionBrowser(self, self.sessions_tab, self.session_index)
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Refresh serial ports
         self.refresh_ports()
@@ -64,23 +117,59 @@ class SensorApp:
         self.port_var = tk.StringVar()
         self.port_combo = ttk.Combobox(control_frame, textvariable=self.port_var, width=30)
         self.port_combo.grid(row=0, column=1, sticky='w', padx=5, pady=5)
+        self.port_combo.bind("<<ComboboxSelected>>", self.connect_device)
         ttk.Button(control_frame, text="Refresh", command=self.refresh_ports).grid(row=0, column=2, padx=5, pady=5)
 
+        # Glove whose calibration profile converts the sensor readings
+        glove_frame = ttk.Frame(control_frame)
+        glove_frame.grid(row=0, column=3, sticky='w', padx=5, pady=5)
+        ttk.Label(glove_frame, text="Glove:").pack(side='left')
+        self.glove_var = tk.StringVar(value=self.calibration.glove_id)
+        self.glove_combo = ttk.Combobox(glove_frame, textvariable=self.glove_var, values=list_profiles(), width=15)
+        self.glove_combo.pack(side='left', padx=5)
+        self.glove_combo.bind("<<ComboboxSelected>>", self.select_glove)
+
         # Measurement type selection
         ttk.Label(control_frame, text="Measurement Type:").grid(row=1, column=0, sticky='w', padx=5, pady=5)
         self.measure_type = ttk.Combobox(control_frame, values=["Tremor", "Bradykinesia", "Stiffness"], width=30)
         self.measure_type.grid(row=1, column=1, sticky='w', padx=5, pady=5)
         self.measure_type.current(0)  # Default to Tremor
 
+        # Patient the measurements belong to (used for the longitudinal trends)
+        ttk.Label(control_frame, text="Patient ID:").grid(row=1, column=2, sticky='w', padx=5, pady=5)
+        self.patient_var = tk.StringVar()
+        ttk.Entry(control_frame, textvariable=self.patient_var, width=20).grid(row=1, column=3, sticky='w',
+                                                                              padx=5, pady=5)
+
         # Timeout setting
         ttk.Label(control_frame, text="Timeout (sec):").grid(row=2, column=0, sticky='w', padx=5, pady=5)
         self.timeout_var = tk.IntVar(value=45)  # Default to 45 seconds
         timeout_spinner = ttk.Spinbox(control_frame, from_=5, to=120, textvariable=self.timeout_var, width=5)
         timeout_spinner.grid(row=2, column=1, sticky='w', padx=5, pady=5)
 
+        # Continuous recording option (streaming sources, minutes to hours)
+        self.continuous_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Continuous recording (until aborted, saved to disk)",
+                        variable=self.continuous_var).grid(row=2, column=2, sticky='w', padx=5, pady=5)
+
+        # Protocol: a sequence of tests run on one connection, e.g. "Tremor x2, Bradykinesia"
+        ttk.Label(control_frame, text="Protocol:").grid(row=3, column=0, sticky='w', padx=5, pady=5)
+        self.protocol_var = tk.StringVar(value=DEFAULT_PROTOCOL)
+        ttk.Entry(control_frame, textvariable=self.protocol_var, width=40).grid(row=3, column=1, columnspan=2,
+                                                                               sticky='w', padx=5, pady=5)
+
+        protocol_options = ttk.Frame(control_frame)
+        protocol_options.grid(row=3, column=3, sticky='w', padx=5, pady=5)
+        ttk.Label(protocol_options, text="Repeats:").pack(side='left')
+        self.repeats_var = tk.IntVar(value=1)
+        ttk.Spinbox(protocol_options, from_=1, to=10, textvariable=self.repeats_var, width=3).pack(side='left', padx=5)
+        ttk.Label(protocol_options, text="Rest (sec):").pack(side='left')
+        self.rest_var = tk.IntVar(value=DEFAULT_REST_SECONDS)
+        ttk.Spinbox(protocol_options, from_=0, to=300, textvariable=self.rest_var, width=4).pack(side='left', padx=5)
+
         # Button frame
         button_frame = ttk.Frame(control_frame)
-        button_frame.grid(row=3, column=0, columnspan=3, pady=10)
+        button_frame.grid(row=4, column=0, columnspan=4, pady=10)
 
         # Control buttons - first row
         button_row1 = ttk.Frame(button_frame)
@@ -89,6 +178,9 @@ class SensorApp:
         self.measure_btn = ttk.Button(button_row1, text="Start Measurement", command=self.start_measurement)
         self.measure_btn.pack(side='left', padx=5)
 
+        self.protocol_btn = ttk.Button(button_row1, text="Run Protocol", command=self.run_protocol)
+        self.protocol_btn.pack(side='left', padx=5)
+
         self.abort_btn = ttk.Button(button_row1, text="Abort", command=self.abort_measurement, state='disabled')
         self.abort_btn.pack(side='left', padx=5)
 
@@ -123,6 +215,13 @@ class SensorApp:
                                              command=self.compare_tremor, state='disabled')
         self.compare_tremor_btn.pack(side='left', padx=5)
 
+        self.report_btn = ttk.Button(button_row3, text="Generate Session Reports", command=self.generate_reports)
+        self.report_btn.pack(side='left', padx=5)
+
+        self.trends_btn = ttk.Button(button_row3, text="Patient Trends",
+                                     command=lambda: self.trend_view.show(self.patient_var.get().strip()))
+        self.trends_btn.pack(side='left', padx=5)
+
         # Status indicator
         status_frame = ttk.Frame(self.setup_tab)
         status_frame.pack(fill='x', padx=10, pady=5)
@@ -147,10 +246,45 @@ class SensorApp:
         """Update the available serial ports in the dropdown"""
         import serial.tools.list_ports
         ports = [port.device for port in serial.tools.list_ports.comports()]
+        ports.append("sim://")  # Simulated receiver for trying the app without a glove
         self.port_combo['values'] = ports
         if ports:
             self.port_combo.current(0)
 
+    def connect_device(self, event=None):
+        """
+        Return the session of the selected port, connecting it in the background if needed
+
+        The session stays open across measurements; selecting another port closes
+        the previous one.
+        """
+        port = self.port_var.get()
+        if not port:
+            return None
+        if self.device_session is not None and self.device_session.spec == port:
+            return self.device_session
+
+        if self.device_session is not None:
+            self.acquisition_loop.submit(self.device_session.close())
+
+        def on_status(connected):
+            self.root.after(0, lambda: self.status_var.set(
+                f"Connected to {port}" if connected else f"Disconnected from {port} - reconnecting..."))
+
+        self.device_session = DeviceSession(port, log=self.log, on_status=on_status)
+        self.acquisition_loop.loop.call_soon_threadsafe(self.device_session.start)
+        return self.device_session
+
+    def select_glove(self, event=None):
+        """Load the calibration profile of the selected glove for the next measurements"""
+        glove_id = self.glove_var.get().strip() or 'default'
+        try:
+            self.calibration = load_profile(glove_id)
+        except (OSError, ValueError) as e:
+            self.show_error(f"Could not load calibration of glove {glove_id}: {e}")
+            return
+        self.log(f"Calibration {self.calibration} loaded")
+
     def start_measurement(self):
         """Start a measurement based on selected type"""
         # Validate inputs
@@ -164,16 +298,16 @@ class SensorApp:
 
         # Clear previous data
         self.data = []
+        self.recording = None
+        self.trimmed_data = None
+        self.range_statistics = None
+        self.selection = None
 
         # Update UI states
         self.measure_btn.configure(state='disabled')
+        self.protocol_btn.configure(state='disabled')
         self.abort_btn.configure(state='normal')
-        self.display_btn.configure(state='disabled')
-        self.analyze_freq_btn.configure(state='disabled')
-        self.analyze_move_btn.configure(state='disabled')
-        self.analyze_force_btn.configure(state='disabled')
-        self.compare_brady_btn.configure(state='disabled')
-        self.compare_tremor_btn.configure(state='disabled')
+        self.set_analysis_state('disabled')
 
         # Reset progress
         self.progress_var.set(0)
@@ -181,14 +315,72 @@ class SensorApp:
         # Log the action
         self.log(f"Starting {self.measure_type.get()} measurement on port {self.port_var.get()}")
 
-        # Start data collection in a separate thread
+        # Start data collection on the acquisition event loop
+        self.collecting = True
+        if self.continuous_var.get():
+            self.recorder = SessionRecorder(new_session_path(self.measure_type.get()), self.measure_type.get())
+            self.log(f"Recording to {self.recorder.data_path}")
+            self.collection_future = self.acquisition_loop.submit(self.data_collector.collect_continuous(
+                self.connect_device(), self.measure_type.get(), self.timeout_var.get(), self.recorder))
+        else:
+            self.collection_future = self.acquisition_loop.submit(self.data_collector.collect_data(
+                self.connect_device(), self.measure_type.get(), self.timeout_var.get()))
+
+    def run_protocol(self):
+        """Run the protocol's tests on one connection; each test is analyzed while the next is acquired"""
+        if not self.port_var.get():
+            messagebox.showerror("Error", "Please select a serial port")
+            return
+        try:
+            tests = parse_protocol(self.protocol_var.get(), self.repeats_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid protocol: {e}")
+            return
+
+        self.measure_btn.configure(state='disabled')
+        self.protocol_btn.configure(state='disabled')
+        self.abort_btn.configure(state='normal')
+        self.progress_var.set(0)
+        self.log(f"Starting protocol on port {self.port_var.get()}: {', '.join(tests)}")
+
+        if self.protocol_pool is None:
+            self.protocol_pool = create_protocol_pool()
+        metadata = {'patient_id': self.patient_var.get().strip(), 'calibration': self.calibration.to_dict()}
+
         self.collecting = True
-        self.collection_thread = threading.Thread(
-            target=self.data_collector.collect_data,
-            args=(self.port_var.get(), self.measure_type.get(), self.timeout_var.get()),
-            daemon=True
-        )
-        self.collection_thread.start()
+        self.collection_future = self.acquisition_loop.submit(self.protocol_runner.run(
+            self.connect_device(), tests, self.rest_var.get(), self.timeout_var.get(), self.protocol_pool, metadata))
+
+    def protocol_complete(self, visit):
+        """Log a finished (or aborted) protocol and add its tests to the patient's trends"""
+        self.collecting = False
+        self.measure_btn.configure(state='normal')
+        self.protocol_btn.configure(state='normal')
+        self.abort_btn.configure(state='disabled')
+
+        analyzed = [test for test in visit['tests'] if 'metrics' in test]
+        for test in visit['tests']:
+            result = test.get('error') or f"{len(test.get('quality_issues', []))} quality problems"
+            self.log(f"Test {test['number']} ({test['measure_type']}): {test['samples']} points, {result}")
+        self.log(f"Protocol {visit['status']}: {len(analyzed)} of {len(visit['tests'])} tests analyzed, "
+                 f"visit report {visit['report']}")
+        self.status_var.set(f"Protocol {visit['status']} - {len(analyzed)} tests analyzed")
+
+        for test in analyzed:
+            try:
+                self.session_browser.add(index_entry(test['session']))
+            except OSError as e:
+                self.log(f"Could not index session: {e}")
+
+        patient_id = self.patient_var.get().strip()
+        if patient_id and analyzed:
+            try:
+                store = PatientTrendStore(patient_id)
+                for test in analyzed:
+                    store.add_session(os.path.basename(test['session']), test['started'], test['metrics'])
+                self.log(f"Patient {patient_id} trends updated ({len(store.sessions)} sessions)")
+            except Exception as e:
+                self.log(f"Could not update patient trends: {e}")
 
     def abort_measurement(self):
         """Abort the current measurement"""
@@ -197,41 +389,34 @@ class SensorApp:
             self.status_var.set("Measurement aborted")
             self.log("Measurement aborted by user")
 
-            # Give the thread a moment to clean up
-            self.root.after(500, self.reset_ui_after_abort)
-
-    def reset_ui_after_abort(self):
-        """Reset the UI after an aborted measurement"""
-        self.measure_btn.configure(state='normal')
-        self.abort_btn.configure(state='disabled')
+            # Cancelling the task interrupts any pending read immediately; the collector then
+            # hands back to measurement_aborted (or recording_complete) and stops the device
+            if self.collection_future is not None:
+                self.collection_future.cancel()
 
-        # Only enable display/analyze if we got some data
+    def measurement_aborted(self):
+        """Reset the UI after an aborted measurement, keeping the data received so far"""
         if len(self.data) > 0:
-            self.display_btn.configure(state='normal')
-            self.analyze_freq_btn.configure(state='normal')
-            self.analyze_move_btn.configure(state='normal')
-            self.analyze_force_btn.configure(state='normal')
-            self.compare_brady_btn.configure(state='normal')
-            self.compare_tremor_btn.configure(state='normal')
+            self.measurement_complete()
             self.status_var.set(f"Measurement aborted - {len(self.data)} points collected")
         else:
+            self.measure_btn.configure(state='normal')
+            self.protocol_btn.configure(state='normal')
+            self.abort_btn.configure(state='disabled')
             self.status_var.set("Measurement aborted - no data collected")
 
     def measurement_complete(self):
         """Process data when measurement is complete"""
         self.measure_btn.configure(state='normal')
+        self.protocol_btn.configure(state='normal')
         self.abort_btn.configure(state='disabled')
-        self.display_btn.configure(state='normal')
-        self.analyze_freq_btn.configure(state='normal')
-        self.analyze_move_btn.configure(state='normal')
-        self.analyze_force_btn.configure(state='normal')
-        self.compare_brady_btn.configure(state='normal')
-        self.compare_tremor_btn.configure(state='normal')
+        self.set_analysis_state('normal')
         self.progress_var.set(100)
 
         # Store the mode in app.measurement_mode for future reference
-        if self.data:
+        if len(self.data) > 0:
             self.measurement_mode = self.data[0][2]
+            self.ingest_recording()
 
         # Display the data
         self.display_data()
@@ -239,57 +424,272 @@ class SensorApp:
         # Switch to the Raw Data tab
         self.notebook.select(1)  # Index 1 is the Raw Data tab
 
+    def set_analysis_state(self, state):
+        """Enable or disable the display and analysis buttons"""
+        for button in (self.display_btn, self.analyze_freq_btn, self.analyze_move_btn, self.analyze_force_btn,
+                       self.compare_brady_btn, self.compare_tremor_btn):
+            button.configure(state=state)
+
+    def open_session(self, session_path):
+        """Open a recorded session from the session browser for display and analysis"""
+        if self.collecting:
+            messagebox.showerror("Error", "Please wait until the measurement has finished")
+            return
+        try:
+            recording = SessionRecording(session_path)
+            data = recording.view()
+        except (OSError, ValueError) as e:
+            self.show_error(f"Could not open session: {e}")
+            return
+        if len(data) == 0:
+            self.show_error("The session contains no data")
+            return
+
+        # Only this session's file is memory-mapped: the mode is read from its column
+        # and the analyses' value columns chunk by chunk as they are resampled
+        self.recording = recording
+        self.data = data
+        metadata = recording.metadata
+        self.calibration = session_profile(metadata)
+        self.glove_var.set(self.calibration.glove_id)
+        self.measure_type.set(metadata.get('measure_type', self.measure_type.get()))
+        self.log(f"Session {os.path.basename(session_path)} opened: {len(data)} points")
+
+        self.measurement_mode = recording.column('mode')[0]
+        # Sessions recorded before the rate was stored all come from the glove firmware
+        self.prepare_recording(data, metadata.get('device_sample_rate', DEVICE_SAMPLE_RATE))
+        self.set_analysis_state('normal')
+        self.display_data()
+        self.notebook.select(1)  # Index 1 is the Raw Data tab
+
+    def recording_complete(self):
+        """Open a finished continuous recording as a memory-mapped view for display and analysis"""
+        self.recording = SessionRecording(self.recorder.path)
+        self.recorder = None
+        self.collecting = False
+
+        # Analyzers work directly on the memory-mapped (rows, columns) array
+        self.data = self.recording.view()
+        self.log(f"Continuous recording opened: {len(self.data)} points")
+
+        if len(self.data) > 0:
+            self.measurement_complete()
+        else:
+            self.measure_btn.configure(state='normal')
+            self.protocol_btn.configure(state='normal')
+            self.abort_btn.configure(state='disabled')
+            self.status_var.set("Recording stopped - no data collected")
+
+    def prepare_recording(self, raw_data, device_sample_rate):
+        """
+        Resample a recording (without its settling time) into shared memory as app.data and
+        screen it against the rate its device was set to
+        """
+        # One copy in shared memory serves the analyses here and in worker processes; it is
+        # resampled without the settling time straight into the block, a chunk at a time, so
+        # the recording is held in memory once however long it is
+        self.data = None
+        if self.shared_recording is not None:
+            self.shared_recording.close()
+
+        def create(rows):
+            self.shared_recording = SharedRecording(rows)
+            return self.shared_recording
+
+        self.data, self.timing_report = resample_uniform(raw_data, start_ms=INITIAL_TRIM_SECONDS * 1000.0,
+                                                         create=create)
+        self.sample_rate = self.timing_report.get('fs')
+
+        self.quality_report = screen_recording(raw_data, device_sample_rate)
+        self.log(format_quality_report(self.quality_report))
+        self.log(format_timing_report(self.timing_report))
+
+        # Built once here, so selecting any time range afterwards is instant
+        self.trimmed_data = self.data
+        self.selection = None
+        self.range_statistics = None
+        if len(self.trimmed_data) > 1:
+            self.range_statistics = RecordingStatistics(self.trimmed_data, self.sample_rate)
+
+    def ingest_recording(self):
+        """
+        Screen the new recording for quality problems and resample it onto an exact
+        uniform grid once, so every analysis uses the same data and sampling rate; both
+        reports and the calibration profile are stored with the session
+        """
+        raw_data = self.data
+        session = self.device_session
+        device_sample_rate = session.sample_rate if session is not None else None
+        self.prepare_recording(raw_data, device_sample_rate)
+
+        patient_id = self.patient_var.get().strip()
+        try:
+            if self.recording is None:
+                self.recording = save_session(raw_data, self.measure_type.get())
+            self.recording.update_metadata(timing_report=self.timing_report, quality_report=self.quality_report,
+                                           device_sample_rate=device_sample_rate, patient_id=patient_id,
+                                           calibration=self.calibration.to_dict())
+        except OSError as e:
+            self.log(f"Could not save session: {e}")
+            return
+
+        # Tell the operator while the patient is still here
+        if self.quality_report['issues']:
+            messagebox.showwarning("Data Quality", "This recording may need to be repeated:\n\n" +
+                                   "\n".join(self.quality_report['issues']))
+
+        self.index_recording(patient_id)
+
+    def index_recording(self, patient_id):
+        """
+        Store the key metrics and thumbnail of the new session in the background, then add
+        it to the session index and the patient's running trend aggregates
+        """
+        filtered_data = self.trimmed_data
+        recording, sample_rate, calibration = self.recording, self.sample_rate, self.calibration
+
+        def run():
+            try:
+                metrics = {}
+                if len(filtered_data) >= 10:
+                    metrics = summary_metrics(analyze_session(filtered_data, sample_rate, calibration))
+                recording.update_metadata(metrics=metrics)
+                write_thumbnail(recording.path)
+                entry = index_entry(recording.path, recording)
+            except Exception as e:
+                self.log(f"Could not index session: {e}")
+                return
+            self.root.after(0, lambda: self.session_indexed(entry, patient_id))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def session_indexed(self, entry, patient_id):
+        self.session_browser.add(entry)
+        if not patient_id or not entry['metrics']:
+            return
+        try:
+            store = PatientTrendStore(patient_id)
+            store.add_session(entry['id'], entry['started'], entry['metrics'])
+            self.log(f"Patient {patient_id} trends updated ({len(store.sessions)} sessions)")
+        except Exception as e:
+            self.log(f"Could not update patient trends: {e}")
+
     def display_data(self):
         """Display the raw data on the Raw Data tab"""
         # Filter out first 0.5 seconds
-        filtered_data = self.filter_initial_data(self.data)
+        filtered_data = self.filter_initial_data(self.data) if self.trimmed_data is None else self.trimmed_data
         self.data_visualizer.plot_raw_data(self.raw_data_tab, filtered_data, self.measure_type.get())
+        self.show_range()
         self.status_var.set(f"Displaying {len(filtered_data)} data points (filtered)")
-        self.log(f"Data displayed on Raw Data tab - filtered first 0.5s")
+        self.log(f"Data displayed on Raw Data tab - filtered first {INITIAL_TRIM_SECONDS}s")
+
+    def analysis_data(self):
+        """The recording without its settling time, or only the range selected on the Raw Data tab"""
+        if self.trimmed_data is None:
+            return self.filter_initial_data(self.data)
+        if self.selection is None:
+            return self.trimmed_data
+        start, stop = self.selection
+        return self.trimmed_data[start:stop]
+
+    def select_range(self, start_seconds, stop_seconds):
+        """Use only a time range of the recording for the statistics and analyses"""
+        if self.range_statistics is None:
+            return
+        start, stop = self.range_statistics.index_range(start_seconds, stop_seconds)
+        if stop - start < 2:
+            return
+        self.selection = (start, stop)
+        self.show_range()
+        self.status_var.set(f"Analyses use {stop - start} of {len(self.trimmed_data)} data points")
+
+    def clear_range(self):
+        self.selection = None
+        self.show_range()
+        if self.trimmed_data is not None:
+            self.status_var.set(f"Analyses use all {len(self.trimmed_data)} data points")
+
+    def show_range(self):
+        """Statistics of the selected range (or the whole recording) on the Raw Data tab"""
+        statistics = self.range_statistics
+        if statistics is None:
+            return
+        if self.selection is None:
+            self.data_visualizer.show_selection(None, None, statistics.range_statistics(0, len(statistics)))
+        else:
+            start, stop = self.selection
+            self.data_visualizer.show_selection(statistics.time[start], statistics.time[stop - 1],
+                                                statistics.range_statistics(start, stop))
 
     def analyze_frequency(self):
         """Analyze frequency content of the data"""
-        # Filter out first 0.5 seconds
-        filtered_data = self.filter_initial_data(self.data)
+        # Without the first 0.5 seconds, or only the selected range
+        filtered_data = self.analysis_data()
         self.frequency_analyzer.analyse(self.analysis_tab, filtered_data, self.measure_type.get())
         self.notebook.select(2)  # Switch to Analysis tab
 
     def analyze_movement(self):
         """Analyze movement metrics"""
-        # Filter out first 0.5 seconds
-        filtered_data = self.filter_initial_data(self.data)
+        # Without the first 0.5 seconds, or only the selected range
+        filtered_data = self.analysis_data()
         # Pass the analysis tab as the parent frame (even though MovementAnalyzer creates its own window)
         self.movement_analyzer.analyze(self.analysis_tab, filtered_data, self.measure_type.get())
 
     def analyze_force(self):
         """Analyze force data and convert to newtons"""
-        # Filter out first 0.5 seconds
-        filtered_data = self.filter_initial_data(self.data)
+        # Without the first 0.5 seconds, or only the selected range
+        filtered_data = self.analysis_data()
         self.force_analyzer.analyze(filtered_data, self.measure_type.get())
 
     def compare_bradykinesia(self):
         """Compare analog sensor and IMU angle for bradykinesia measurements"""
-        # Filter out first 0.5 seconds
-        filtered_data = self.filter_initial_data(self.data)
+        # Without the first 0.5 seconds, or only the selected range
+        filtered_data = self.analysis_data()
         self.bradykinesia_comparison.analyze(filtered_data, self.measure_type.get())
 
     def compare_tremor(self):
         """Compare analog sensor and accelerometer for tremor measurements using frequency analysis"""
-        # Filter out first 0.5 seconds
-        filtered_data = self.filter_initial_data(self.data)
+        # Without the first 0.5 seconds, or only the selected range
+        filtered_data = self.analysis_data()
         self.tremor_comparison.analyze(filtered_data, self.measure_type.get())
 
+    def generate_reports(self):
+        """Render HTML reports for all recorded sessions that do not have an up-to-date report"""
+        self.report_btn.configure(state='disabled')
+        self.log("Generating session reports...")
+
+        def progress(done, total, session_path, result):
+            if isinstance(result, Exception):
+                self.log(f"Report for {session_path} failed: {result}")
+            self.root.after(0, lambda: self.status_var.set(f"Generating reports: {done}/{total}"))
+
+        def run():
+            try:
+                written, skipped, failed = generate_reports(progress=progress)
+                self.log(f"Reports: {len(written)} written, {len(skipped)} up to date, {len(failed)} failed")
+                self.root.after(0, lambda: self.status_var.set("Reports generated"))
+            except Exception as e:
+                self.log(f"Report generation error: {e}")
+            finally:
+                self.root.after(0, lambda: self.report_btn.configure(state='normal'))
+
+        threading.Thread(target=run, daemon=True).start()
+
     def filter_initial_data(self, data):
-        """Filter out the first 0.5 seconds of data and normalize time to 0-10 seconds"""
-        if not data:
+        """Filter out the first INITIAL_TRIM_SECONDS of data and restart time at zero"""
+        if len(data) == 0:
             return data
 
+        if isinstance(data, np.ndarray):
+            # Recordings are time ordered, so the cut is a slice of the (memory-mapped) array
+            return trim_initial_data(data)
+
         filtered_data = []
         first_valid_time = None
 
         for item in data:
             time_ms = item[1]  # Time is at index 1
-            if time_ms >= 500:  # Keep data after 500ms (0.5 seconds)
+            if time_ms >= INITIAL_TRIM_SECONDS * 1000.0:  # Keep data after the settling time
                 if first_valid_time is None:
                     first_valid_time = time_ms
 
@@ -300,12 +700,32 @@ class SensorApp:
 
         return filtered_data
 
+    def on_close(self):
+        """Release the shared recording, the protocol and auto-tune workers and the device before the window closes"""
+        if self.device_session is not None:
+            self.acquisition_loop.submit(self.device_session.close())
+        if self.protocol_pool is not None:
+            self.protocol_pool.shutdown(wait=False, cancel_futures=True)
+        self.movement_analyzer.close()
+        if self.shared_recording is not None:
+            self.data = []
+            self.shared_recording.close()
+            self.shared_recording = None
+        self.root.destroy()
+
     def log(self, message):
         """Add a message to the log with timestamp"""
         timestamp = time.strftime("%H:%M:%S")
         log_msg = f"[{timestamp}] {message}\n"
 
-        # Update the log text widget
+        # Messages from other threads (acquisition loop, analysis stages) are written by the Tk thread
+        if threading.current_thread() is not threading.main_thread():
+            self.root.after(0, lambda: self.write_log(log_msg))
+            return
+        self.write_log(log_msg)
+
+    def write_log(self, log_msg):
+        """Append a formatted message to the log widget (Tk thread only)"""
         self.log_text.config(state='normal')
         self.log_text.insert(tk.END, log_msg)
         self.log_text.see(tk.END)  # Scroll to the end
@@ -316,6 +736,7 @@ class SensorApp:
         messagebox.showerror("Error", message)
         self.status_var.set("Ready")
         self.measure_btn.configure(state='normal')
+        self.protocol_btn.configure(state='normal')
         self.abort_btn.configure(state='disabled')
         self.collecting = False
         self.log(f"ERROR: {message}")
\ No newline at end of file
@@ -3,8 +3,13 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from scipy.signal import savgol_filter
+from smoothing import savgol
 from scipy.stats import pearsonr
+from alignment import estimate_lag, shift_signal
+from resampling import seconds_to_samples
+
+# Savitzky-Golay window applied to both angle channels
+SMOOTH_SECONDS = 0.21
 
 
 class BradykinesiaComparison:
@@ -13,9 +18,12 @@ class BradykinesiaComparison:
         self.canvas = None
         self.fig = None
 
+        # Largest latency difference between the analog sensor and the IMU that is searched for
+        self.max_lag_seconds = 0.5
+
     def analyze(self, data, measure_type):
         """Compare analog angle sensor (value1) and IMU angle (value2) for bradykinesia measurements"""
-        if not data or len(data) < 50:
+        if data is None or len(data) < 50:
             self.app.show_error("Not enough data for bradykinesia angle comparison")
             return
 
@@ -45,64 +53,17 @@ class BradykinesiaComparison:
             messagebox.showerror("Error", "Not enough valid data points for angle comparison")
             return
 
-        # Convert analog reading to degrees (0-4095 -> 0-360)
-        analog_angle_raw = (value1_clean / 4095.0) * 360.0
-        imu_angle = value2_clean.copy()
-
-        # Check if sensors move in opposite directions by looking at correlation
-        # Remove any DC offsets first for accurate correlation check
-        analog_detrended = analog_angle_raw - np.mean(analog_angle_raw)
-        imu_detrended = imu_angle - np.mean(imu_angle)
-
-        # Calculate initial correlation to detect inverse relationship
-        initial_correlation, _ = pearsonr(analog_detrended, imu_detrended)
-
-        # If correlation is negative, the sensors move in opposite directions
-        direction_inverted = False
-        if initial_correlation < -0.3:  # Threshold for detecting inverse correlation
-            # Invert the analog sensor direction
-            analog_angle_raw = 360.0 - analog_angle_raw
-            direction_inverted = True
-            self.app.log(
-                f"Detected inverse correlation ({initial_correlation:.3f}). Inverting analog sensor direction.")
-
-        # Align the starting angles by adjusting the analog sensor offset
-        analog_start = analog_angle_raw[0]
-        imu_start = imu_angle[0]
-        offset = imu_start - analog_start
-
-        # Adjust analog angle to start at the same point as IMU
-        analog_angle_aligned = analog_angle_raw + offset
-
-        # Handle angle wrapping for analog sensor (keep it in reasonable range)
-        analog_angle_aligned = self.normalize_angle(analog_angle_aligned)
-
-        # Apply smoothing filter to reduce noise
-        if len(time_clean) > 10:
-            window_length = min(21, len(time_clean))
-            if window_length % 2 == 0:
-                window_length -= 1
-            if window_length >= 5:
-                analog_angle_smooth = savgol_filter(analog_angle_aligned, window_length, 3)
-                imu_angle_smooth = savgol_filter(imu_angle, window_length, 3)
-            else:
-                analog_angle_smooth = analog_angle_aligned
-                imu_angle_smooth = imu_angle
-        else:
-            analog_angle_smooth = analog_angle_aligned
-            imu_angle_smooth = imu_angle
-
-        # Calculate correlation
-        correlation_coeff, p_value = pearsonr(analog_angle_smooth, imu_angle_smooth)
-
-        # Calculate angle differences
-        angle_diff = imu_angle_smooth - analog_angle_smooth
-        mean_diff = np.mean(angle_diff)
-        std_diff = np.std(angle_diff)
-
-        # Calculate range of motion for both sensors
-        analog_range = np.ptp(analog_angle_smooth)
-        imu_range = np.ptp(imu_angle_smooth)
+        # All numbers shown in the window (also used for batch reports)
+        comparison = self.compare_angles(value1_clean, value2_clean)
+        analog_angle_smooth = comparison['analog_angle']
+        imu_angle_smooth = comparison['imu_angle']
+        correlation_coeff = comparison['correlation']
+        p_value = comparison['p_value']
+        mean_diff = comparison['mean_diff']
+        std_diff = comparison['std_diff']
+        analog_range = comparison['analog_range']
+        imu_range = comparison['imu_range']
+        lag_ms = comparison['lag_ms']
 
         # Create visualization with 2 plots (1x2 grid)
         self.fig = plt.Figure(figsize=(15, 6))
@@ -171,11 +132,110 @@ class BradykinesiaComparison:
         ttk.Label(results_frame, text=f"{imu_range:.2f}°",
                   font=('Arial', 10, 'bold')).grid(row=1, column=5, sticky='w', padx=10, pady=2)
 
+        ttk.Label(results_frame, text="Analog Sensor Lag:").grid(row=0, column=6, sticky='w', padx=10, pady=2)
+        ttk.Label(results_frame, text=f"{lag_ms:.1f} ms",
+                  font=('Arial', 10, 'bold')).grid(row=1, column=6, sticky='w', padx=10, pady=2)
+
+        ttk.Label(results_frame, text="IMU Peak Velocity:").grid(row=0, column=7, sticky='w', padx=10, pady=2)
+        ttk.Label(results_frame, text=f"{comparison['imu_peak_velocity']:.1f}°/s",
+                  font=('Arial', 10, 'bold')).grid(row=1, column=7, sticky='w', padx=10, pady=2)
+
 
 
         # Log the analysis
         self.app.log(f"Bradykinesia angle comparison completed: r={correlation_coeff:.3f}, "
-                     f"mean_diff={mean_diff:.2f}°, std_diff={std_diff:.2f}°")
+                     f"mean_diff={mean_diff:.2f}°, std_diff={std_diff:.2f}°, lag={lag_ms:.1f} ms")
+
+    def compare_angles(self, value1_clean, value2_clean):
+        """
+        Convert, align, smooth and compare the analog and IMU angle signals without creating any widgets
+
+        Returns a dict with the smoothed aligned angles, correlation and p-value,
+        mean/std of the difference, both ranges of motion, the analog lag and the
+        angular velocities (degrees/s) with their peaks.
+        """
+        # Convert analog reading to degrees with the glove's calibration
+        analog_angle_raw = self.app.calibration.convert('analog_angle', value1_clean, 'degrees')
+        imu_angle = value2_clean.copy()
+
+        # Check if sensors move in opposite directions by looking at correlation
+        # Remove any DC offsets first for accurate correlation check
+        analog_detrended = analog_angle_raw - np.mean(analog_angle_raw)
+        imu_detrended = imu_angle - np.mean(imu_angle)
+
+        # Calculate initial correlation to detect inverse relationship
+        initial_correlation, _ = pearsonr(analog_detrended, imu_detrended)
+
+        # If correlation is negative, the sensors move in opposite directions
+        direction_inverted = False
+        if initial_correlation < -0.3:  # Threshold for detecting inverse correlation
+            # Invert the analog sensor direction
+            analog_angle_raw = 360.0 - analog_angle_raw
+            direction_inverted = True
+            self.app.log(
+                f"Detected inverse correlation ({initial_correlation:.3f}). Inverting analog sensor direction.")
+
+        # Align the starting angles by adjusting the analog sensor offset
+        analog_start = analog_angle_raw[0]
+        imu_start = imu_angle[0]
+        offset = imu_start - analog_start
+
+        # Adjust analog angle to start at the same point as IMU
+        analog_angle_aligned = analog_angle_raw + offset
+
+        # Handle angle wrapping for analog sensor (keep it in reasonable range)
+        analog_angle_aligned = self.normalize_angle(analog_angle_aligned)
+
+        # Apply smoothing filter to reduce noise; both channels and their angular
+        # velocities come from one batched filter pass
+        fs = self.app.sample_rate  # Uniform grid rate set when the recording was ingested
+        angles = np.vstack([analog_angle_aligned, imu_angle])
+        window_length = min(seconds_to_samples(SMOOTH_SECONDS, fs), len(value1_clean))
+        if window_length % 2 == 0:
+            window_length -= 1
+        if len(value1_clean) > 10 and window_length >= 5:
+            smoothed, velocities = savgol(angles, window_length, polyorder=3, derivs=(0, 1), delta=1.0 / fs)
+        else:
+            smoothed, velocities = angles, np.gradient(angles, 1.0 / fs, axis=-1)
+        analog_angle_smooth, imu_angle_smooth = smoothed
+        analog_velocity, imu_velocity = velocities
+
+        # Estimate the delay between the two sensors and shift the analog channel onto the IMU
+        lag = estimate_lag(imu_angle_smooth, analog_angle_smooth, fs, max_lag_seconds=self.max_lag_seconds)
+        lag_ms = lag['lag_seconds'] * 1000
+        analog_angle_smooth = shift_signal(analog_angle_smooth, lag['lag_samples'])
+        analog_velocity = shift_signal(analog_velocity, lag['lag_samples'])
+        self.app.log(f"Estimated analog sensor lag relative to IMU: {lag_ms:.1f} ms")
+
+        # Calculate correlation
+        correlation_coeff, p_value = pearsonr(analog_angle_smooth, imu_angle_smooth)
+
+        # Calculate angle differences
+        angle_diff = imu_angle_smooth - analog_angle_smooth
+        mean_diff = np.mean(angle_diff)
+        std_diff = np.std(angle_diff)
+
+        # Calculate range of motion for both sensors
+        analog_range = np.ptp(analog_angle_smooth)
+        imu_range = np.ptp(imu_angle_smooth)
+
+        return {
+            'analog_angle': analog_angle_smooth,
+            'imu_angle': imu_angle_smooth,
+            'direction_inverted': direction_inverted,
+            'correlation': correlation_coeff,
+            'p_value': p_value,
+            'mean_diff': mean_diff,
+            'std_diff': std_diff,
+            'analog_range': analog_range,
+            'imu_range': imu_range,
+            'lag_ms': lag_ms,
+            'analog_velocity': analog_velocity,
+            'imu_velocity': imu_velocity,
+            'analog_peak_velocity': np.max(np.abs(analog_velocity)),
+            'imu_peak_velocity': np.max(np.abs(imu_velocity)),
+            'imu_mean_speed': np.mean(np.abs(imu_velocity)),
+        }
 
     def normalize_angle(self, angles):
         """Normalize angles to a reasonable range, handling wrapping"""
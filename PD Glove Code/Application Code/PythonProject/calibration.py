@@ -0,0 +1,198 @@
+import os
+import glob
+import json
+
+import numpy as np
+
+from session_recorder import SessionRecording
+
+# One profile per glove: <glove_id>.json
+CALIBRATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calibration')
+
+# 12-bit ADC (analogRead on the ESP32): every possible reading has a table entry
+ADC_CODES = 4096
+
+# Force output units and their factor from kilograms-force
+FORCE_UNITS = {'kilograms-force': 1.0, 'grams-force': 1000.0, 'newtons': 9.81}
+FORCE_LABELS = {'kilograms-force': 'kgf', 'grams-force': 'gf', 'newtons': 'N'}
+
+# Force sensing resistor in a voltage divider: y = 153.18 * x^(-0.699), y in kgf, x in ohms
+DEFAULT_FSR = {'kind': 'fsr', 'vcc': 3.3, 'r_divider': 4700.0, 'coeff': 153.18, 'exponent': -0.699}
+
+# Potentiometer angle sensor: 0-4095 over 360 degrees on a finger of radius_cm
+DEFAULT_ANGLE = {'kind': 'angle', 'degrees_per_count': 360.0 / 4095.0, 'offset_degrees': 0.0, 'radius_cm': 7.5}
+
+# Profile of a glove without its own calibration (the values the analyses always used)
+DEFAULT_CHANNELS = {
+    'force1': DEFAULT_FSR,
+    'force2': DEFAULT_FSR,
+    'force3': DEFAULT_FSR,
+    'force4': DEFAULT_FSR,
+    'analog_angle': DEFAULT_ANGLE,
+}
+
+
+def fsr_table(spec, unit):
+    """Force of every ADC code for a force sensing resistor channel, in `unit`"""
+    if unit not in FORCE_UNITS:
+        raise ValueError("force unit must be one of " + ", ".join(FORCE_UNITS))
+    vcc = spec['vcc']
+    voltage = np.arange(ADC_CODES) / (ADC_CODES - 1) * vcc
+
+    # Vout = Vcc * R / (Rs + R), so Rs = R * (Vcc - Vout) / Vout; voltages within 10 mV of a
+    # rail are clamped (no contact / sensor resistance near zero)
+    voltage = np.clip(voltage, 0.01, vcc - 0.01)
+    resistance = spec['r_divider'] * (vcc - voltage) / voltage
+
+    force_kgf = np.maximum(spec['coeff'] * resistance ** spec['exponent'], 0.0)
+    return force_kgf * FORCE_UNITS[unit]
+
+
+def angle_table(spec, unit='degrees'):
+    """Angle of every ADC code for an angle sensor channel, in degrees or radians"""
+    degrees = spec['offset_degrees'] + np.arange(ADC_CODES) * spec['degrees_per_count']
+    if unit == 'radians':
+        return np.radians(degrees)
+    return degrees
+
+
+TABLE_BUILDERS = {'fsr': fsr_table, 'angle': angle_table}
+
+# Lookup tables per (channel parameters, unit), built once per process and shared by every
+# profile (and session) with the same sensor parameters
+_tables = {}
+
+
+class CalibrationProfile:
+    """
+    Conversion of one glove's raw ADC readings into physical units
+
+    Each channel has its own sensor parameters. The first conversion with a
+    channel's parameters into a unit builds a table with the value of every ADC
+    code, so converting a recording is a single indexing operation. Profiles are
+    versioned; `to_dict()` is stored with every session so it can be converted
+    again exactly as it was.
+    """
+
+    def __init__(self, glove_id='default', version=1, channels=None, created=''):
+        self.glove_id = glove_id
+        self.version = int(version)
+        self.channels = {name: dict(spec) for name, spec in (channels or DEFAULT_CHANNELS).items()}
+        self.created = created
+
+    def __str__(self):
+        return f"{self.glove_id} v{self.version}"
+
+    @classmethod
+    def from_dict(cls, profile):
+        return cls(profile.get('glove_id', 'default'), profile.get('version', 1),
+                   profile.get('channels'), profile.get('created', ''))
+
+    def to_dict(self):
+        return {'glove_id': self.glove_id, 'version': self.version, 'created': self.created,
+                'channels': self.channels}
+
+    def parameter(self, channel, name):
+        """One sensor parameter of a channel (e.g. the angle channel's radius_cm)"""
+        return self.channels[channel][name]
+
+    def table(self, channel, unit):
+        """Cached ADC_CODES-entry lookup table of a channel in `unit`"""
+        spec = self.channels[channel]
+        key = (json.dumps(spec, sort_keys=True), unit)
+        if key not in _tables:
+            table = TABLE_BUILDERS[spec['kind']](spec, unit)
+            table.flags.writeable = False
+            _tables[key] = table
+        return _tables[key]
+
+    def convert(self, channel, adc, unit):
+        """
+        Convert ADC readings of a channel to `unit` by table lookup
+
+        Readings are rounded to the nearest code (resampled recordings hold
+        interpolated values) and limited to the ADC range; NaNs stay NaN.
+        """
+        adc = np.asarray(adc, dtype=np.float64)
+        missing = np.isnan(adc)
+        codes = np.clip(np.rint(np.where(missing, 0.0, adc)), 0, ADC_CODES - 1).astype(np.intp)
+        values = self.table(channel, unit)[codes]
+        if missing.any():
+            values[missing] = np.nan
+        return values
+
+
+def profile_path(glove_id, calibration_dir=CALIBRATION_DIR):
+    return os.path.join(calibration_dir, f"{glove_id}.json")
+
+
+def list_profiles(calibration_dir=CALIBRATION_DIR):
+    """Glove IDs with a calibration file, plus the built-in 'default'"""
+    glove_ids = [os.path.basename(path)[:-len('.json')]
+                 for path in glob.glob(os.path.join(calibration_dir, '*.json'))]
+    return ['default'] + sorted(glove_id for glove_id in glove_ids if glove_id != 'default')
+
+
+def load_profile(glove_id='default', calibration_dir=CALIBRATION_DIR):
+    """
+    Load a glove's calibration profile
+
+    Channels missing from the file keep their default parameters; a glove
+    without a file gets the default profile under its own ID.
+    """
+    path = profile_path(glove_id, calibration_dir)
+    if not os.path.exists(path):
+        return CalibrationProfile(glove_id, version=0)
+
+    with open(path) as f:
+        profile = json.load(f)
+    channels = {name: dict(spec) for name, spec in DEFAULT_CHANNELS.items()}
+    for name, spec in profile.get('channels', {}).items():
+        channels[name] = {**channels.get(name, {}), **spec}
+    return CalibrationProfile(profile.get('glove_id', glove_id), profile.get('version', 1), channels,
+                              profile.get('created', ''))
+
+
+def save_profile(profile, calibration_dir=CALIBRATION_DIR):
+    """Write a profile as its glove's calibration file and return the path"""
+    os.makedirs(calibration_dir, exist_ok=True)
+    path = profile_path(profile.glove_id, calibration_dir)
+    with open(path, 'w') as f:
+        json.dump(profile.to_dict(), f, indent=2)
+    return path
+
+
+def recalibrate_sessions(session_paths, profile):
+    """
+    Apply a new profile to every session recorded with the same glove
+
+    The profile the session was recorded with stays in 'calibration'; the new
+    one is added to the session's 'calibration_history', whose last entry the
+    analyses then use. Updating the metadata makes the report out of date, so
+    the next batch run converts these sessions again with the new calibration.
+    Returns the number of sessions updated.
+    """
+    updated = 0
+    for session_path in session_paths:
+        recording = SessionRecording(session_path)
+        stored = session_profile(recording.metadata)
+        if stored.glove_id == profile.glove_id and stored.version != profile.version:
+            history = recording.metadata.get('calibration_history', [])
+            recording.update_metadata(calibration_history=history + [profile.to_dict()])
+            updated += 1
+    return updated
+
+
+def recorded_profile(metadata):
+    """The profile a session was recorded with (the default profile for older sessions)"""
+    if 'calibration' in metadata:
+        return CalibrationProfile.from_dict(metadata['calibration'])
+    return CalibrationProfile()
+
+
+def session_profile(metadata):
+    """The profile a session is analysed with: its latest re-calibration, else the one it was recorded with"""
+    history = metadata.get('calibration_history')
+    if history:
+        return CalibrationProfile.from_dict(history[-1])
+    return recorded_profile(metadata)
@@ -1,115 +1,369 @@
-import serial
+import asyncio
 import time
+import numpy as np
+
+# Raw lines buffered between reading the source and parsing them; when parsing or
+# recording falls behind, reading pauses instead of the buffer growing
+LINE_QUEUE_SIZE = 512
+
+# Seconds without a line after which a running transfer counts as finished (the receiver
+# sends its lines back to back, so only a lost last line makes the transfer go quiet)
+TRANSFER_GAP_TIMEOUT = 0.5
+
+# Retransmission rounds for missing indices, and how long each round waits for lines
+REPAIR_ROUNDS = 3
+REPAIR_TIMEOUT = 1.0
+
+# Abort: the receiver abandons the running measurement on STOP and confirms with STOPPED
+STOP_COMMAND = b"STOP\n"
+STOPPED_REPLY = b"STOPPED"
+
+# Seconds to wait for STOPPED while discarding the rest of an aborted transfer
+STOP_TIMEOUT = 0.5
+
+
+class IndexBitmap:
+    """Which sample indices 0 .. size - 1 of a transfer have arrived"""
+
+    def __init__(self, size=0):
+        self.received = np.zeros(size, dtype=bool)
+
+    def resize(self, size):
+        if size > len(self.received):
+            self.received = np.concatenate([self.received, np.zeros(size - len(self.received), dtype=bool)])
+
+    def add(self, index):
+        """Mark an index as received; returns False for duplicates and indices out of range"""
+        if not 0 <= index < len(self.received) or self.received[index]:
+            return False
+        self.received[index] = True
+        return True
+
+    @property
+    def count(self):
+        return int(np.count_nonzero(self.received))
+
+    @property
+    def complete(self):
+        return len(self.received) > 0 and bool(self.received.all())
+
+    def missing_ranges(self):
+        """Runs of missing indices as inclusive (first, last) pairs"""
+        edges = np.diff(np.concatenate([[0], (~self.received).astype(np.int8), [0]]))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1) - 1
+        return list(zip(starts.tolist(), ends.tolist()))
 
 
 class SerialDataCollector:
     def __init__(self, app):
         self.app = app
-        self.serial_port = None
+        self.last_max_index = None
+
+    def get_command(self, measure_type):
+        """Return the serial command and mode number for a measurement type"""
+        if measure_type == "Tremor":
+            return "TREM\n", 1
+        elif measure_type == "Bradykinesia":
+            return "BRAD\n", 2
+        elif measure_type == "Stiffness":
+            return "STIF\n", 3
+        else:
+            return "", 0
+
+    def parse_data_line(self, line, mode):
+        """
+        Parse a data line into a stored row [index, time_ms, mode, value1..value5]
+        Returns None if the line is not a data line
+        """
+        if not line.startswith("DATA"):
+            return None
+
+        # Parse data line with new format for 5 values:
+        # "DATAindex×max_index×time_ms×value1×value2×value3×value4×value5"
+        parts = line[4:].split('x')
+        if len(parts) < 6:  # Support both old (6 parts) and new (8 parts) formats
+            return None
+
+        index = int(parts[0])
+        self.last_max_index = int(parts[1])
+        time_ms = int(parts[2])
+        value1 = float(parts[3])
+        value2 = float(parts[4])
+        value3 = float(parts[5])
+
+        # Handle new format with 5 values (8 parts total)
+        if len(parts) >= 8:
+            value4 = float(parts[6])
+            value5 = float(parts[7])
+            # Store data with mode and all 5 values
+            return [index, time_ms, mode, value1, value2, value3, value4, value5]
+
+        # Backward compatibility: old format with 3 values
+        # Store data with mode and 3 values, pad with zeros for missing values
+        return [index, time_ms, mode, value1, value2, value3, 0.0, 0.0]
+
+    def ui(self, callback):
+        """Run a callback on the Tk thread"""
+        self.app.root.after(0, callback)
+
+    async def read_lines(self, transport, lines):
+        """Reader task: move raw lines from the transport into the bounded queue (None at end of stream)"""
+        while True:
+            line = await transport.readline()
+            if not line:
+                await lines.put(None)
+                return
+            await lines.put(line)
+
+    async def collect(self, transport, mode, timeout, on_row, gap_timeout=None):
+        """
+        Read and parse rows until on_row(row) returns True, the source closes or no row arrives in time
+
+        The timeout is a deadline on the event loop clock, reset by every valid row,
+        so it is enforced exactly no matter how the source delivers bytes. Once rows
+        are arriving, `gap_timeout` (if given) replaces it. Lines are parsed in
+        batches of everything already queued.
+
+        Returns 'complete', 'closed' or 'timeout'. Cancelling the calling task stops
+        the collection immediately.
+        """
+        loop = asyncio.get_running_loop()
+        lines = asyncio.Queue(maxsize=LINE_QUEUE_SIZE)
+        reader = asyncio.ensure_future(self.read_lines(transport, lines))
+        deadline = loop.time() + timeout
 
-    def collect_data(self, port, measure_type, timeout):
-        """Collect data from the ESP32 via serial port"""
         try:
-            # Connect to serial port
-            self.app.status_var.set("Connecting to device...")
-            self.app.log(f"Connecting to serial port {port}")
-            self.serial_port = serial.Serial(port, 115200, timeout=2)
-            time.sleep(1)  # Allow time for connection to establish
-
-            # Send command based on measurement type
-            self.app.status_var.set("Sending command...")
-            command = ""
-            if measure_type == "Tremor":
-                command = "TREM\n"
-                mode = 1
-            elif measure_type == "Bradykinesia":
-                command = "BRAD\n"
-                mode = 2
-            elif measure_type == "Stiffness":
-                command = "STIF\n"
-                mode = 3
-            else:
-                mode = 0
-
-            self.app.log(f"Sending command: {command.strip()}")
-            self.serial_port.write(command.encode())
-
-            # Wait for and collect data
-            self.app.status_var.set("Waiting for data...")
-            max_index = None
-            last_data_time = time.time()
-
-            while self.app.collecting:
-                if time.time() - last_data_time > timeout:
-                    # Timeout occurred - show a message but don't lose data
-                    self.app.root.after(0, lambda: self.app.status_var.set(f"Timeout - no data for {timeout} seconds"))
-                    self.app.log(f"Data collection timeout after {timeout} seconds")
-                    break
+            while True:
+                # asyncio.timeout_at, unlike wait_for, never swallows a cancellation
+                # that arrives together with the line
+                try:
+                    async with asyncio.timeout_at(deadline):
+                        batch = [await lines.get()]
+                except TimeoutError:
+                    return 'timeout'
+                while not lines.empty() and len(batch) < LINE_QUEUE_SIZE:
+                    batch.append(lines.get_nowait())
+
+                for raw_line in batch:
+                    if raw_line is None:
+                        return 'closed'
+                    try:
+                        row = self.parse_data_line(raw_line.decode().strip(), mode)
+                    except UnicodeDecodeError:
+                        continue  # Garbled data
+                    except ValueError as e:
+                        self.app.log(f"Error reading line: {e}")
+                        continue
+                    if row is None:
+                        continue
 
+                    deadline = loop.time() + (gap_timeout or timeout)
+                    if on_row(row):
+                        return 'complete'
+        finally:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+
+    async def collect_data(self, session, measure_type, timeout):
+        """Collect one measurement from the receiver of a DeviceSession into app.data"""
+        device_ready = False
+        try:
+            self.ui(lambda: self.app.status_var.set("Waiting for device..."))
+            async with session.exclusive():
+                device_ready = True
                 try:
-                    line = self.serial_port.readline().decode().strip()
-
-                    if line.startswith("DATA"):
-                        # Parse data line with new format for 5 values:
-                        # "DATAindex×max_index×time_ms×value1×value2×value3×value4×value5"
-                        parts = line[4:].split('x')
-                        if len(parts) >= 6:  # Support both old (6 parts) and new (8 parts) formats
-                            index = int(parts[0])
-                            max_index = int(parts[1])
-                            time_ms = int(parts[2])
-                            value1 = float(parts[3])
-                            value2 = float(parts[4])
-                            value3 = float(parts[5])
-
-                            # Handle new format with 5 values (8 parts total)
-                            if len(parts) >= 8:
-                                value4 = float(parts[6])
-                                value5 = float(parts[7])
-                                # Store data with mode and all 5 values
-                                self.app.data.append([index, time_ms, mode, value1, value2, value3, value4, value5])
-                            else:
-                                # Backward compatibility: old format with 3 values
-                                # Store data with mode and 3 values, pad with zeros for missing values
-                                self.app.data.append([index, time_ms, mode, value1, value2, value3, 0.0, 0.0])
-
-                            # Reset timeout timer
-                            last_data_time = time.time()
-
-                            # Update progress
-                            if max_index > 0:
-                                progress = (index / max_index) * 100
-                                self.app.root.after(0, lambda p=progress: self.app.progress_var.set(p))
-                                self.app.root.after(0, lambda i=index, m=max_index:
-                                self.app.status_var.set(f"Receiving data: {i + 1}/{m + 1} points"))
-
-                            # Check if we're done - allow for off-by-one errors
-                            if index >= max_index - 1:  # Consider "close enough" to be done
-                                self.app.log(
-                                    f"Data collection complete: {len(self.app.data)} of {max_index + 1} points received")
-                                self.app.root.after(0, lambda: self.app.status_var.set(
-                                    f"Measurement complete ({len(self.app.data)}/{max_index + 1} points)"))
-                                break
-                except UnicodeDecodeError:
-                    # Handle potential garbled data
-                    continue
-                except Exception as e:
-                    # Log other errors but keep trying
-                    self.app.log(f"Error reading line: {e}")
-                    continue
-
-            # Close serial port
-            try:
-                if self.serial_port and self.serial_port.is_open:
-                    self.serial_port.close()
-                    self.app.log("Serial port closed")
-            except Exception as e:
-                self.app.log(f"Error closing serial port: {e}")
-            self.serial_port = None
+                    await self.measure(session, measure_type, timeout)
+                except asyncio.CancelledError:
+                    # Aborted: show the data received so far right away, then stop the device
+                    # while still holding the session so the next measurement starts clean
+                    self.ui(self.app.measurement_aborted)
+                    await self.stop_device(session)
+                    raise
 
-            # Update UI in main thread
-            self.app.root.after(0, self.app.measurement_complete)
+        except asyncio.CancelledError:
+            if not device_ready:
+                self.ui(self.app.measurement_aborted)
+            raise
 
         except Exception as e:
             # Show error in main thread
             self.app.log(f"Collection error: {e}")
-            self.app.root.after(0, lambda: self.app.show_error(f"Error: {str(e)}"))
\ No newline at end of file
+            self.ui(lambda: self.app.show_error(f"Error: {str(e)}"))
+            return
+
+        # Update UI in main thread
+        self.ui(self.app.measurement_complete)
+
+    async def measure(self, session, measure_type, timeout, rows=None):
+        """Send the measurement command to a ready device and read its rows into `rows` (app.data if None)"""
+        if rows is None:
+            rows = self.app.data
+
+        # Send command based on measurement type
+        command, mode = self.get_command(measure_type)
+        self.app.log(f"Sending command: {command.strip()}")
+        await session.write(command.encode())
+
+        # Wait for and collect data
+        self.ui(lambda: self.app.status_var.set("Waiting for data..."))
+        self.last_max_index = None
+        bitmap = IndexBitmap()
+
+        def on_row(row):
+            index = int(row[0])
+            max_index = self.last_max_index
+            bitmap.resize(max_index)  # The receiver sends indices 0 .. max_index - 1
+            if not bitmap.add(index):
+                return False  # Duplicate
+            rows.append(row)
+
+            # Update progress
+            if max_index > 0:
+                progress = (index / max_index) * 100
+                self.ui(lambda p=progress: self.app.progress_var.set(p))
+                self.ui(lambda i=index, m=max_index:
+                        self.app.status_var.set(f"Receiving data: {i + 1}/{m} points"))
+
+            # The main pass ends with the last index; gaps are repaired afterwards
+            return bitmap.complete or index >= max_index - 1
+
+        result = await self.collect(session, mode, timeout, on_row, gap_timeout=TRANSFER_GAP_TIMEOUT)
+        if result == 'timeout' and bitmap.count == 0:
+            # Timeout occurred - show a message but don't lose data
+            self.ui(lambda: self.app.status_var.set(f"Timeout - no data for {timeout} seconds"))
+            self.app.log(f"Data collection timeout after {timeout} seconds")
+            return
+        if result == 'closed':
+            self.ui(lambda: self.app.status_var.set("Connection lost"))
+            return
+
+        if not bitmap.complete:
+            await self.repair(session, mode, bitmap, on_row)
+            rows.sort(key=lambda row: row[0])
+
+        max_index = self.last_max_index
+        self.app.log(f"Data collection complete: {len(rows)} of {max_index} points received")
+        self.ui(lambda: self.app.status_var.set(
+            f"Measurement complete ({len(rows)}/{max_index} points)"))
+
+    async def stop_device(self, session):
+        """
+        Tell the receiver to abandon the running measurement and discard what it still sends
+
+        Reads until the receiver confirms with STOPPED; a receiver without STOP
+        support is given STOP_TIMEOUT, and whatever it sends later is discarded by
+        the ready handshake of the next measurement.
+        """
+        start = time.time()
+        try:
+            await session.write(STOP_COMMAND)
+            discarded = 0
+            try:
+                async with asyncio.timeout(STOP_TIMEOUT):
+                    while True:
+                        line = await session.readline()
+                        if not line or line.strip() == STOPPED_REPLY:
+                            break
+                        discarded += 1
+            except TimeoutError:
+                pass
+            self.app.log(f"Device stopped in {(time.time() - start) * 1000:.0f} ms "
+                         f"({discarded} stale lines discarded)")
+        except (ConnectionError, OSError) as e:
+            self.app.log(f"Could not stop the device: {e}")
+
+    async def repair(self, session, mode, bitmap, on_row):
+        """
+        Request the missing index ranges again until the transfer is complete
+
+        The receiver keeps the last measurement and resends any range with
+        "RSND first last", so a few lost lines cost a fraction of a second
+        instead of a new measurement.
+        """
+        def on_repaired_row(row):
+            on_row(row)
+            return bitmap.complete
+
+        start = time.time()
+        missing_before = len(bitmap.received) - bitmap.count
+        for attempt in range(REPAIR_ROUNDS):
+            ranges = bitmap.missing_ranges()
+            if not ranges:
+                break
+            self.ui(lambda n=len(bitmap.received) - bitmap.count:
+                    self.app.status_var.set(f"Requesting {n} missing points..."))
+            for first, last in ranges:
+                await session.write(f"RSND {first} {last}\n".encode())
+
+            result = await self.collect(session, mode, REPAIR_TIMEOUT, on_repaired_row,
+                                        gap_timeout=TRANSFER_GAP_TIMEOUT)
+            if result == 'closed':
+                break
+
+        missing = len(bitmap.received) - bitmap.count
+        repaired = missing_before - missing
+        self.app.log(f"Retransmission: {repaired} of {missing_before} missing points recovered "
+                     f"in {(time.time() - start) * 1000:.0f} ms")
+        if missing:
+            self.app.log(f"{missing} points still missing after {REPAIR_ROUNDS} retransmission rounds")
+
+    async def collect_continuous(self, session, measure_type, timeout, recorder):
+        """
+        Record a streaming data source until aborted, spilling rows to a session file
+
+        Rows go to the SessionRecorder instead of app.data, so memory stays at one
+        chunk no matter how long the recording runs.
+        """
+        start_time = time.time()
+        last_status_time = 0
+
+        def on_row(row):
+            nonlocal last_status_time
+            recorder.append(row)
+
+            # Status updates once per second are plenty for long recordings
+            now = time.time()
+            if now - last_status_time >= 1.0:
+                last_status_time = now
+                elapsed = now - start_time
+                self.ui(lambda n=len(recorder), e=elapsed: self.app.status_var.set(
+                    f"Recording: {n} points, {int(e // 60)}:{int(e % 60):02d}"))
+            return False
+
+        try:
+            self.ui(lambda: self.app.status_var.set("Waiting for device..."))
+            async with session.exclusive():
+                command, mode = self.get_command(measure_type)
+                self.app.log(f"Sending command: {command.strip()}")
+                await session.write(command.encode())
+
+                self.ui(lambda: self.app.status_var.set("Recording..."))
+                start_time = time.time()
+                try:
+                    result = await self.collect(session, mode, timeout, on_row)
+                except asyncio.CancelledError:
+                    # Stopped by the user: open the recording right away, then stop the device
+                    self.finish_recording(recorder)
+                    await self.stop_device(session)
+                    return
+            if result == 'timeout':
+                self.ui(lambda: self.app.status_var.set(f"Timeout - no data for {timeout} seconds"))
+                self.app.log(f"Continuous recording timeout after {timeout} seconds")
+
+        except asyncio.CancelledError:
+            pass  # Stopped by the user before the device was ready
+
+        except Exception as e:
+            recorder.close()
+            self.app.log(f"Collection error: {e}")
+            self.ui(lambda: self.app.show_error(f"Error: {str(e)}"))
+            return
+
+        self.finish_recording(recorder)
+
+    def finish_recording(self, recorder):
+        """Close a continuous recording and open it in the app"""
+        recorder.close()
+        self.app.log(f"Continuous recording stopped: {len(recorder)} points saved to {recorder.data_path}")
+        self.ui(self.app.recording_complete)
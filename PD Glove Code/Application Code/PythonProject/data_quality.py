@@ -0,0 +1,151 @@
+import numpy as np
+
+# Rate the glove firmware samples at (SAMPLING_RATE_HZ in sampling.h), in Hz
+DEVICE_SAMPLE_RATE = 100.0
+
+# Relative deviation of the measured rate from the target that is reported
+RATE_TOLERANCE = 0.02
+
+# 12-bit ADC rails (analogRead on the ESP32)
+ADC_MIN = 0
+ADC_MAX = 4095
+
+# The accelerometer runs at +/-2 g (raw / 16384), so readings at the limit are clipped
+ACCEL_CLIP_G = 1.999
+
+# Seconds a continuously sampled channel (IMU) may repeat the same value before it
+# counts as flatlined (converted with the measured rate); ADC and contact channels only
+# count when constant throughout
+FLATLINE_SECONDS = 1.0
+
+# Fraction of samples at an ADC rail or the accelerometer limit that is reported
+SATURATION_TOLERANCE = 0.005
+
+# Value channels per mode: (name, column, kind)
+CHANNELS = {
+    1: [("Accel X", 3, 'accel'), ("Accel Y", 4, 'accel'), ("Accel Z", 5, 'accel')],
+    2: [("Contact", 3, 'contact'), ("Roll 1", 4, 'angle'), ("Roll 2", 5, 'angle')],
+    3: [("Force 1", 3, 'adc'), ("Force 2", 4, 'adc'), ("Roll 2", 5, 'angle'),
+        ("Force 3", 6, 'adc'), ("Force 4", 7, 'adc')],
+}
+
+
+def longest_constant_run(values):
+    """Length of the longest run of identical consecutive values (NaN runs included)"""
+    if len(values) == 0:
+        return 0
+    same = (values[1:] == values[:-1]) | (np.isnan(values[1:]) & np.isnan(values[:-1]))
+    # Positions where a run starts; run lengths are the distances between them
+    starts = np.flatnonzero(np.concatenate([[True], ~same, [True]]))
+    return int(np.max(np.diff(starts)))
+
+
+def screen_recording(data, target_fs=DEVICE_SAMPLE_RATE):
+    """
+    Check a raw recording for acquisition and sensor problems
+
+    Every check is a vectorized pass over a column of the (rows, columns)
+    array: dropped, duplicate and out-of-order indices, time stamps that go
+    backwards, NaNs, ADC values at the 0/4095 rails, accelerometer clipping
+    at +/-2 g, flatlined channels and the measured against the target
+    sampling rate. Channels are interpreted by the mode column.
+
+    Parameters:
+    data: list of rows or (rows, N_COLUMNS) array, as received
+    target_fs: sampling rate the device was set to, in Hz (see
+        Transport.sample_rate); None leaves out the rate check
+
+    Returns a JSON-serializable report dict; report['issues'] lists the
+    problems found in words (empty if the recording is clean).
+    """
+    data = np.asarray(data, dtype=np.float64)
+    issues = []
+    if data.ndim != 2 or len(data) < 2:
+        return {'samples': len(data), 'issues': ["Too few samples to check"]}
+
+    n = len(data)
+    index = data[:, 0]
+    time_ms = data[:, 1]
+    mode = int(data[0, 2])
+
+    # Transfer: indices and time stamps as sent by the device
+    unique_index = np.unique(index)
+    duplicate_indices = n - len(unique_index)
+    dropped_indices = int(unique_index[-1] - unique_index[0] + 1 - len(unique_index))
+    out_of_order = int(np.count_nonzero(np.diff(index) < 0))
+    # Millisecond stamps repeat (and, jittered, step back by one) at rates near 1 kHz;
+    # resample_uniform then times the samples by their index, so only larger steps back
+    # are a problem
+    step = np.diff(time_ms)
+    shared_time_stamps = int(np.count_nonzero((step == 0) & (np.diff(index) != 0)))
+    index_timing = shared_time_stamps > 0 and len(unique_index) > 2
+    non_monotonic_time = int(np.count_nonzero(step < (-1.0 if index_timing else 0.0)))
+    if dropped_indices:
+        issues.append(f"{dropped_indices} dropped samples")
+    if duplicate_indices:
+        issues.append(f"{duplicate_indices} duplicate samples")
+    if out_of_order:
+        issues.append(f"{out_of_order} out-of-order samples")
+    if non_monotonic_time:
+        issues.append(f"{non_monotonic_time} time stamps going backwards")
+
+    # Sampling rate over the whole recording
+    duration_ms = float(np.max(time_ms) - np.min(time_ms))
+    actual_fs = 1000.0 * (len(unique_index) - 1) / duration_ms if duration_ms > 0 else 0.0
+    rate_error = None
+    if target_fs:
+        rate_error = (actual_fs - target_fs) / target_fs
+        if abs(rate_error) > RATE_TOLERANCE:
+            issues.append(f"Sampling rate {actual_fs:.1f} Hz instead of {target_fs:.1f} Hz")
+
+    # Sensor channels
+    channels = {}
+    measured_fs = actual_fs if actual_fs > 0 else (target_fs or 1.0)
+    flat_limit = max(2, int(round(FLATLINE_SECONDS * measured_fs)))
+    for name, column, kind in CHANNELS.get(mode, []):
+        values = data[:, column]
+        finite = values[~np.isnan(values)]
+        check = {'nan': int(n - len(finite))}
+        if check['nan']:
+            issues.append(f"{name}: {check['nan']} missing values")
+
+        if kind == 'adc':
+            check['at_min'] = int(np.count_nonzero(finite <= ADC_MIN))
+            check['at_max'] = int(np.count_nonzero(finite >= ADC_MAX))
+            if check['at_min'] > SATURATION_TOLERANCE * n:
+                issues.append(f"{name}: at the {ADC_MIN} rail in {check['at_min']} samples")
+            if check['at_max'] > SATURATION_TOLERANCE * n:
+                issues.append(f"{name}: saturated at {ADC_MAX} in {check['at_max']} samples")
+        elif kind == 'accel':
+            check['clipped'] = int(np.count_nonzero(np.abs(finite) >= ACCEL_CLIP_G))
+            if check['clipped'] > SATURATION_TOLERANCE * n:
+                issues.append(f"{name}: clipped at +/-2 g in {check['clipped']} samples")
+
+        run = longest_constant_run(values)
+        check['longest_flat_s'] = run / measured_fs
+        check['flatline'] = bool(run >= n if kind in ('adc', 'contact') else run >= flat_limit)
+        if check['flatline']:
+            issues.append(f"{name}: flatlined for {run / measured_fs:.1f} s")
+        channels[name] = check
+
+    return {
+        'samples': int(n),
+        'mode': mode,
+        'dropped_indices': dropped_indices,
+        'duplicate_indices': int(duplicate_indices),
+        'out_of_order': out_of_order,
+        'non_monotonic_time': non_monotonic_time,
+        'shared_time_stamps': shared_time_stamps,
+        'target_fs': float(target_fs) if target_fs else None,
+        'actual_fs': actual_fs,
+        'rate_error': rate_error,
+        'channels': channels,
+        'issues': issues,
+    }
+
+
+def format_quality_report(report):
+    """One-line summary of a quality report for the activity log"""
+    if not report['issues']:
+        return f"Quality: {report['samples']} samples, no problems found"
+    return f"Quality: {len(report['issues'])} problems - " + "; ".join(report['issues'])
@@ -1,7 +1,13 @@
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.widgets import SpanSelector
 import numpy as np
 import tkinter as tk
+from tkinter import ttk
+
+# Statistics shown per channel for a selected time range: (key, heading)
+RANGE_STATISTICS = (('mean', "Mean"), ('rms', "RMS"), ('std', "Std"), ('min', "Min"), ('max', "Max"),
+                    ('ptp', "Peak-peak"), ('band_power', "Band power"))
 
 
 class DataVisualizer:
@@ -9,10 +15,14 @@ class DataVisualizer:
         self.app = app
         self.canvas = None
         self.fig = None
+        self.axes = []
+        self.selectors = []
+        self.selection_spans = []
+        self.stats_tree = None
 
     def plot_raw_data(self, parent_frame, data, measure_type):
         """Plot the raw sensor data"""
-        if not data:
+        if data is None or len(data) == 0:
             return
 
         # Clear parent frame
@@ -75,8 +85,10 @@ class DataVisualizer:
         colors = ['green', 'blue', 'purple', 'red', 'orange']
 
         # Create subplots
+        self.axes = []
         for i in range(num_plots):
             ax = self.fig.add_subplot(num_plots, 1, i + 1)
+            self.axes.append(ax)
 
             # Select data for this subplot
             if i == 0:
@@ -112,6 +124,12 @@ class DataVisualizer:
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(fill='both', expand=True, padx=10, pady=10)
 
+        # Dragging across any plot selects a time range for the statistics and analyses
+        self.selection_spans = []
+        self.selectors = [SpanSelector(ax, self.range_selected, 'horizontal', useblit=True, minspan=0.05,
+                                       props=dict(alpha=0.2, facecolor='grey')) for ax in self.axes]
+        self.create_selection_panel(parent_frame)
+
         # Add sensor labels with explanations based on test type
         info_frame = tk.Frame(parent_frame)
         info_frame.pack(fill='x', padx=10, pady=5)
@@ -152,4 +170,49 @@ class DataVisualizer:
             if i < len(colors):
                 tk.Label(info_frame, text=desc, fg=colors[i]).pack(anchor='w')
             else:
-                tk.Label(info_frame, text=desc).pack(anchor='w')
\ No newline at end of file
+                tk.Label(info_frame, text=desc).pack(anchor='w')
+
+    def create_selection_panel(self, parent_frame):
+        """Table of statistics of the selected time range, one row per channel"""
+        selection_frame = ttk.LabelFrame(parent_frame, text="Selected Range", padding=5)
+        selection_frame.pack(fill='x', padx=10, pady=5)
+
+        top = ttk.Frame(selection_frame)
+        top.pack(fill='x')
+        self.selection_var = tk.StringVar(value="Drag across a plot to select a time range "
+                                                "(the analyses then use only that range)")
+        ttk.Label(top, textvariable=self.selection_var).pack(side='left', padx=5)
+        ttk.Button(top, text="Clear Selection", command=self.app.clear_range).pack(side='right', padx=5)
+
+        columns = [key for key, heading in RANGE_STATISTICS]
+        self.stats_tree = ttk.Treeview(selection_frame, columns=columns, height=5)
+        self.stats_tree.heading('#0', text="Channel")
+        self.stats_tree.column('#0', width=110)
+        for key, heading in RANGE_STATISTICS:
+            self.stats_tree.heading(key, text=heading)
+            self.stats_tree.column(key, width=90, anchor='e')
+        self.stats_tree.pack(fill='x', pady=5)
+
+    def range_selected(self, start_seconds, stop_seconds):
+        self.app.select_range(start_seconds, stop_seconds)
+
+    def show_selection(self, start_seconds, stop_seconds, statistics):
+        """Shade the selected range on every plot and list its statistics (no selection: None)"""
+        for span in self.selection_spans:
+            span.remove()
+        self.selection_spans = []
+        if self.stats_tree is None:
+            return
+        self.stats_tree.delete(*self.stats_tree.get_children())
+
+        if start_seconds is None:
+            self.selection_var.set("Whole recording")
+        else:
+            self.selection_spans = [ax.axvspan(start_seconds, stop_seconds, color='grey', alpha=0.2)
+                                    for ax in self.axes]
+            self.selection_var.set(f"{start_seconds:.2f} - {stop_seconds:.2f} s "
+                                   f"({stop_seconds - start_seconds:.2f} s)")
+        for channel in statistics:
+            values = ["-" if channel[key] is None else f"{channel[key]:.4g}" for key, heading in RANGE_STATISTICS]
+            self.stats_tree.insert('', 'end', text=channel['name'], values=values)
+        self.canvas.draw_idle()
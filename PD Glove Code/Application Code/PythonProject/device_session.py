@@ -0,0 +1,196 @@
+import asyncio
+
+from acquisition import open_transport
+
+# Ready handshake understood by the ESP32 receiver: it answers PING with READY once it
+# is waiting for a command, i.e. after booting and after sending a measurement
+PING_COMMAND = b"PING\n"
+READY_REPLY = b"READY"
+
+# Seconds between repeated pings while waiting for READY (the first may be lost while the
+# board boots after the reset on open)
+PING_INTERVAL = 0.25
+
+# Seconds to wait for READY after opening the port (ESP32 reset and boot)
+CONNECT_TIMEOUT = 5.0
+
+# Seconds to wait for READY from a connected device that is still busy with an earlier
+# measurement (glove measurement, drawing the graphs and sending the data)
+READY_TIMEOUT = 15.0
+
+# Seconds between keepalive handshakes while no measurement is running
+KEEPALIVE_INTERVAL = 2.0
+
+# Seconds between attempts to reopen a lost connection
+RECONNECT_INTERVAL = 1.0
+
+
+class DeviceSession:
+    """
+    Connection to one receiver that stays open across measurements
+
+    The port is opened once and checked with the ready handshake instead of a
+    fixed sleep. While idle, a keepalive handshake notices a disconnected
+    device; the session then reopens the port in the background until it
+    answers again. Measurements take the session with `exclusive()`, which
+    waits for the device to be ready and discards anything left over from an
+    earlier (e.g. aborted) transfer. All methods run on the acquisition loop.
+    """
+
+    def __init__(self, spec, log=None, on_status=None):
+        self.spec = spec
+        self.log = log or (lambda message: None)
+        self.on_status = on_status or (lambda connected: None)
+        self.transport = None
+        # Rate the connected device samples at (Transport.sample_rate), None until connected
+        self.sample_rate = None
+        self.connected = None
+        self.lock = None
+        self._supervisor = None
+        self._closing = False
+        self._failure_logged = False
+
+    def __str__(self):
+        return self.spec
+
+    def start(self):
+        """Start connecting and supervising the connection in the background"""
+        if self._supervisor is None:
+            self.lock = asyncio.Lock()
+            self.connected = asyncio.Event()
+            self._supervisor = asyncio.ensure_future(self._supervise())
+
+    async def _supervise(self):
+        while not self._closing:
+            if not self.connected.is_set():
+                try:
+                    await self._connect()
+                except Exception as e:
+                    await self._drop(f"Cannot connect to {self.spec}: {e}", quiet=self._failure_logged)
+                    self._failure_logged = True
+                    await asyncio.sleep(RECONNECT_INTERVAL)
+                    continue
+
+            await asyncio.sleep(KEEPALIVE_INTERVAL)
+            if self.lock.locked() or not self.connected.is_set():
+                continue
+            async with self.lock:
+                try:
+                    await self._handshake(READY_TIMEOUT)
+                except Exception as e:
+                    await self._drop(f"Lost connection to {self.spec}: {e}")
+
+    async def _connect(self):
+        self.transport = open_transport(self.spec)
+        self.sample_rate = self.transport.sample_rate
+        await self.transport.open()
+        async with self.lock:
+            await self._handshake(CONNECT_TIMEOUT)
+        self.connected.set()
+        self._failure_logged = False
+        self.log(f"Connected to {self.spec}")
+        self.on_status(True)
+
+    async def _drop(self, reason, quiet=False):
+        """Close a failed connection; the supervisor reopens it"""
+        was_connected = self.connected.is_set()
+        self.connected.clear()
+        if self.transport is not None:
+            try:
+                await self.transport.close()
+            except Exception:
+                pass
+            self.transport = None
+        if was_connected or not quiet:
+            self.log(reason)
+        if was_connected:
+            self.on_status(False)
+
+    async def _handshake(self, timeout):
+        """
+        Ping until the device answers READY, discarding every line before it
+
+        Transports that cannot answer (replays) pass immediately.
+        """
+        if not getattr(self.transport, 'handshake', True):
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            await self.transport.write(PING_COMMAND)
+            try:
+                async with asyncio.timeout_at(min(deadline, loop.time() + PING_INTERVAL)):
+                    while True:
+                        line = await self.transport.readline()
+                        if not line:
+                            raise ConnectionError("connection closed")
+                        if line.strip() == READY_REPLY:
+                            return
+            except TimeoutError:
+                pass  # Ping again
+        raise TimeoutError(f"no READY within {timeout:g} seconds")
+
+    def exclusive(self):
+        """Context manager giving one measurement sole use of a ready device"""
+        return _ExclusiveUse(self)
+
+    async def readline(self):
+        """Read a line; a failed connection reads as end of stream and is reopened in the background"""
+        try:
+            line = await self.transport.readline()
+        except (OSError, AttributeError) as e:  # AttributeError: transport already dropped
+            line = b''
+            reason = e
+        else:
+            reason = "connection closed"
+        if not line:
+            await self._drop(f"Lost connection to {self.spec}: {reason}")
+        return line
+
+    async def write(self, data):
+        try:
+            await self.transport.write(data)
+        except (OSError, AttributeError) as e:
+            await self._drop(f"Lost connection to {self.spec}: {e}")
+            raise ConnectionError(f"{self.spec} is not connected") from e
+
+    async def close(self):
+        self._closing = True
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        if self.transport is not None:
+            await self.transport.close()
+            self.transport = None
+            self.log(f"{self.spec} closed")
+
+
+class _ExclusiveUse:
+    def __init__(self, session):
+        self.session = session
+
+    async def __aenter__(self):
+        session = self.session
+        session.start()
+        try:
+            async with asyncio.timeout(CONNECT_TIMEOUT):
+                await session.connected.wait()
+        except TimeoutError:
+            raise ConnectionError(f"{session.spec} is not connected") from None
+
+        await session.lock.acquire()
+        try:
+            await session._handshake(READY_TIMEOUT)
+        except asyncio.CancelledError:
+            session.lock.release()  # Aborted while waiting for the device
+            raise
+        except Exception as e:
+            session.lock.release()
+            await session._drop(f"Lost connection to {session.spec}: {e}")
+            raise ConnectionError(f"{session.spec} did not become ready: {e}") from e
+        return session
+
+    async def __aexit__(self, *exc_info):
+        self.session.lock.release()
+        return False
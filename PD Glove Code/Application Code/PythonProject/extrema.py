@@ -0,0 +1,95 @@
+import numpy as np
+from scipy.signal import find_peaks
+
+from resampling import sample_rate_of, seconds_to_samples
+
+# Default minimum time between two peaks (or two troughs) when detecting displacement extrema
+DEFAULT_DISTANCE_SECONDS = 0.5
+
+
+def find_extrema(signal, time_data=None, height=None, distance=None, prominence=None, fs=None):
+    """
+    Find alternating peaks and troughs of a signal and the metrics between them
+
+    Peaks and troughs are detected with find_peaks, merged into one time-ordered
+    array and reduced so that they strictly alternate (of several consecutive
+    extrema of the same kind only the most extreme one is kept). Ranges, periods
+    and amplitudes are then computed with array differences.
+
+    Parameters:
+    signal: 1-D signal array
+    time_data: time array in seconds (sample numbers are used if None)
+    height, distance, prominence: find_peaks parameters, applied to peaks and troughs
+        (distance in samples; prominence defaults to 10% of the signal range)
+    fs: sampling rate in Hz for the default distance of DEFAULT_DISTANCE_SECONDS (taken
+        from time_data if None; without either, the distance defaults to 5% of the length)
+
+    Returns a dict with:
+    'peaks', 'troughs': indices of the alternating peaks and troughs
+    'indices', 'is_peak': all extrema in time order and their kind
+    'values', 'times': signal value and time at each extremum
+    'ranges', 'range_times': |difference| between consecutive extrema and their midpoint times
+    'peak_periods', 'period_times': time between consecutive peaks and their midpoint times
+    """
+    signal = np.asarray(signal, dtype=float)
+    if time_data is None:
+        time_data = np.arange(len(signal), dtype=float)
+    else:
+        time_data = np.asarray(time_data, dtype=float)
+        if fs is None and len(time_data) > 1:
+            fs = sample_rate_of(time_data)
+
+    # Default detection settings used for displacement signals
+    if prominence is None:
+        prominence = np.ptp(signal) * 0.1 if len(signal) > 0 else 0  # 10% of signal range
+    if distance is None:
+        if fs is not None:
+            distance = seconds_to_samples(DEFAULT_DISTANCE_SECONDS, fs)
+        else:
+            distance = max(10, len(signal) // 20)  # At least 10 samples or 5% of signal length
+
+    peaks, _ = find_peaks(signal, height=height, distance=int(distance), prominence=prominence)
+    troughs, _ = find_peaks(-signal, height=height, distance=int(distance), prominence=prominence)
+    return merge_extrema(signal, time_data, peaks, troughs)
+
+
+def merge_extrema(signal, time_data, peaks, troughs):
+    """
+    Merge detected peak and trough indices into alternating extrema and their metrics
+
+    The second half of find_extrema, for callers that detect the peaks
+    themselves; returns the same dict.
+    """
+    # Merge both index arrays in time order
+    indices = np.concatenate([peaks, troughs])
+    is_peak = np.concatenate([np.ones(len(peaks), dtype=bool), np.zeros(len(troughs), dtype=bool)])
+    order = np.argsort(indices, kind='stable')
+    indices = indices[order]
+    is_peak = is_peak[order]
+
+    # Enforce alternation: label runs of the same kind and keep the most extreme of each run
+    if len(indices) > 1:
+        run_id = np.concatenate([[0], np.cumsum(is_peak[1:] != is_peak[:-1])])
+        signed_values = np.where(is_peak, signal[indices], -signal[indices])
+        by_run = np.lexsort((-signed_values, run_id))
+        first_of_run = np.concatenate([[True], run_id[by_run][1:] != run_id[by_run][:-1]])
+        keep = np.sort(by_run[first_of_run])
+        indices = indices[keep]
+        is_peak = is_peak[keep]
+
+    values = signal[indices]
+    times = time_data[indices]
+    peak_times = times[is_peak]
+
+    return {
+        'peaks': indices[is_peak],
+        'troughs': indices[~is_peak],
+        'indices': indices,
+        'is_peak': is_peak,
+        'values': values,
+        'times': times,
+        'ranges': np.abs(np.diff(values)),
+        'range_times': (times[:-1] + times[1:]) / 2,
+        'peak_periods': np.diff(peak_times),
+        'period_times': (peak_times[:-1] + peak_times[1:]) / 2,
+    }
@@ -4,6 +4,21 @@ from tkinter import ttk, messagebox
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+from calibration import FORCE_LABELS
+from resampling import seconds_to_samples
+
+# Interval over which force and angle changes (force rate, work) are measured; one sample at
+# the firmware's 100 Hz. Faster recordings are averaged over each interval, so their extra
+# samples do not add up more sensor noise
+FORCE_STEP_SECONDS = 0.01
+
+
+def step_means(values, step):
+    """Means of consecutive blocks of `step` samples (an incomplete last block is dropped)"""
+    values = np.asarray(values, dtype=np.float64)
+    usable = len(values) // step * step
+    return values[:usable].reshape(-1, step).mean(axis=1)
+
 
 class ForceAnalyzer:
     def __init__(self, app):
@@ -11,91 +26,28 @@ class ForceAnalyzer:
         self.canvas = None
         self.fig = None
 
-        # Sensor conversion parameters
-        self.VCC = 3.3  # ESP32 supply voltage
-        self.R_DIVIDER = 4700  # 4.7kΩ resistor in voltage divider
-        self.ADC_MAX = 4095  # 12-bit ADC maximum value
-
-        # Force-resistance equation parameters: y = 153.18 * x^(-0.699)
-        # Where y is force in KILOGRAMS-FORCE (kgf) and x is resistance in OHMS
-        self.FORCE_COEFF = 153.18
-        self.FORCE_EXPONENT = -0.699
-
         # Choose output unit: 'kilograms-force', 'grams-force', or 'newtons'
         self.force_unit = 'newtons'  # Convert to Newtons for display
+        self.force_label = FORCE_LABELS[self.force_unit]
 
-        # Set appropriate label based on unit
-        if self.force_unit == 'kilograms-force':
-            self.force_label = 'kgf'
-        elif self.force_unit == 'grams-force':
-            self.force_label = 'gf'
-        else:  # newtons
-            self.force_label = 'N'
-
-    def adc_to_force(self, adc_reading, output_unit='newtons'):
+    def adc_to_force(self, adc_reading, output_unit='newtons', channel='force1'):
         """
-        Convert 12-bit ADC reading to force using the sensor characteristics
+        Convert 12-bit ADC readings to force with the glove's calibration profile
 
-        Conversion steps:
-        1. ADC reading → Voltage
-        2. Voltage → Sensor resistance (using voltage divider)
-        3. Resistance → Force in kilograms-force (using given equation: y = 153.18 * x^(-0.699))
-        4. Convert to desired output unit (default: Newtons)
+        The profile holds each sensor's voltage divider and force-resistance
+        equation (y = coeff * R^exponent in kilograms-force) and converts through a
+        lookup table with the force of every ADC code.
 
         Args:
-            adc_reading: 12-bit ADC value (0-4095)
+            adc_reading: 12-bit ADC value(s) (0-4095)
             output_unit: 'kilograms-force', 'grams-force', or 'newtons'
+            channel: force sensor ('force1' .. 'force4')
         """
-        # Step 1: Convert ADC reading to voltage
-        voltage = (adc_reading / self.ADC_MAX) * self.VCC
-
-        # Step 2: Convert voltage to sensor resistance using voltage divider equation
-        # Vout = Vcc * R / (Rs + R)
-        # Solving for Rs: Rs = R * (Vcc - Vout) / Vout
-        # Handle edge cases where voltage is too close to VCC or 0
-        if voltage <= 0.01:  # Prevent division by zero
-            voltage = 0.01
-        elif voltage >= self.VCC - 0.01:  # Sensor resistance near zero
-            voltage = self.VCC - 0.01
-
-        sensor_resistance = self.R_DIVIDER * (self.VCC - voltage) / voltage
-
-        # Step 3: Convert resistance to force using y = 153.18 * x^(-0.699)
-        # This gives force directly in KILOGRAMS-FORCE (kgf)
-        if sensor_resistance <= 0:
-            return 0
-
-        # Apply sensor equation to get force in kilograms-force
-        force_kgf = self.FORCE_COEFF * (sensor_resistance ** self.FORCE_EXPONENT)
-        force_kgf = max(0, force_kgf)  # Ensure force is never negative
-
-        # Step 4: Convert to desired unit if needed
-        if output_unit == 'kilograms-force':
-            return force_kgf
-        elif output_unit == 'grams-force':
-            # Convert kilograms-force to grams-force (1 kgf = 1000 gf)
-            return force_kgf * 1000.0
-        elif output_unit == 'newtons':
-            # Convert kilograms-force to Newtons (1 kgf = 9.81 N)
-            return force_kgf * 9.81
-        else:
-            raise ValueError("output_unit must be 'kilograms-force', 'grams-force', or 'newtons'")
-
-    def adc_to_force_kgf(self, adc_reading):
-        """Convenience method to get force in kilograms-force"""
-        return self.adc_to_force(adc_reading, output_unit='kilograms-force')
-
-    def adc_to_force_gf(self, adc_reading):
-        """Convenience method to get force in grams-force"""
-        return self.adc_to_force(adc_reading, output_unit='grams-force')
-
-    def adc_to_force_newtons(self, adc_reading):
-        """Convenience method to get force in Newtons"""
-        return self.adc_to_force(adc_reading, output_unit='newtons')
+        return self.app.calibration.convert(channel, adc_reading, output_unit)
 
     def analyze(self, data, measure_type):
         """Analyze force data from sensors and convert to actual force units"""
-        if not data or len(data) < 10:
+        if data is None or len(data) < 10:
             self.app.show_error("Not enough data for force analysis")
             return
 
@@ -110,43 +62,19 @@ class ForceAnalyzer:
         force_window.title("Force Analysis")
         force_window.geometry("1200x900")
 
-        # Extract relevant data
-        time_data = np.array([item[1] / 1000.0 for item in data])  # Convert to seconds
-
-        # Check if we have the new 6-element format or old 5-element format
-        if len(data[0]) >= 6:  # New format with 6+ elements
-            force1_adc = np.array([item[3] for item in data])  # value1 (Force sensor 1)
-            force2_adc = np.array([item[4] for item in data])  # value2 (Force sensor 2)
-            angle_data = np.array([item[5] for item in data])  # value3 (Angle)
-
-            # Convert ADC readings to force values
-            force1_values = np.array([self.adc_to_force(adc, self.force_unit) for adc in force1_adc])
-            force2_values = np.array([self.adc_to_force(adc, self.force_unit) for adc in force2_adc])
-
-            self.app.log(f"Using new data format with ADC to force conversion (output: {self.force_unit})")
-        else:  # Old format - assume already converted values
-            force1_values = np.array([item[3] for item in data])  # Already in force units
-            force2_values = np.array([item[4] for item in data])  # Already in force units
-            angle_data = np.array([item[5] for item in data]) if len(data[0]) > 5 else np.zeros(len(data))
-
-            self.app.log("Using old data format - assuming values already in force units")
-
-        # Calculate metrics
-        max_force1 = np.max(force1_values)
-        max_force2 = np.max(force2_values)
-        avg_force1 = np.mean(force1_values)
-        avg_force2 = np.mean(force2_values)
-        total_force = np.max(force1_values + force2_values)
-
-        # Calculate combined force over time
-        combined_force = force1_values + force2_values
-
-        # Work calculation using force and angle
-        work_done = self.calculate_work(force1_values, force2_values, angle_data, time_data)
-
-        # Calculate force rate (how quickly force changes)
-        force_rate1 = np.max(np.abs(np.diff(force1_values))) / np.mean(np.diff(time_data))
-        force_rate2 = np.max(np.abs(np.diff(force2_values))) / np.mean(np.diff(time_data))
+        # All numbers shown in the window (also used for batch reports)
+        metrics = self.compute_force_metrics(data)
+        time_data = metrics['time']
+        force1_values = metrics['force1']
+        force2_values = metrics['force2']
+        max_force1 = metrics['max_force1']
+        max_force2 = metrics['max_force2']
+        avg_force1 = metrics['avg_force1']
+        avg_force2 = metrics['avg_force2']
+        total_force = metrics['peak_combined_force']
+        work_done = metrics['work']
+        force_rate1 = metrics['max_force_rate1']
+        force_rate2 = metrics['max_force_rate2']
 
         # Create results frame
         results_frame = ttk.LabelFrame(force_window, text="Force Metrics", padding=10)
@@ -217,13 +145,87 @@ class ForceAnalyzer:
         self.app.log(
             f"Force range: Sensor1={max_force1:.2f}{self.force_label}, Sensor2={max_force2:.2f}{self.force_label}")
 
+    def compute_force_metrics(self, data):
+        """
+        Convert the force sensor readings and calculate the force metrics without creating any widgets
+
+        Returns a dict with the time, force and angle arrays and the scalar metrics
+        (maximum/average force per sensor, peak combined force, work and maximum force rates).
+        """
+        # Extract relevant data
+        time_data = np.array([item[1] / 1000.0 for item in data])  # Convert to seconds
+
+        # Check if we have the new 6-element format or old 5-element format
+        if len(data[0]) >= 6:  # New format with 6+ elements
+            force1_adc = np.array([item[3] for item in data])  # value1 (Force sensor 1)
+            force2_adc = np.array([item[4] for item in data])  # value2 (Force sensor 2)
+            angle_data = np.array([item[5] for item in data])  # value3 (Angle)
+
+            # Convert ADC readings to force values
+            force1_values = self.adc_to_force(force1_adc, self.force_unit, 'force1')
+            force2_values = self.adc_to_force(force2_adc, self.force_unit, 'force2')
+
+            self.app.log(f"Using new data format with ADC to force conversion (output: {self.force_unit}, "
+                         f"calibration: {self.app.calibration})")
+        else:  # Old format - assume already converted values
+            force1_values = np.array([item[3] for item in data])  # Already in force units
+            force2_values = np.array([item[4] for item in data])  # Already in force units
+            angle_data = np.array([item[5] for item in data]) if len(data[0]) > 5 else np.zeros(len(data))
+
+            self.app.log("Using old data format - assuming values already in force units")
+
+        # Calculate metrics; peaks are taken over FORCE_STEP_SECONDS means
+        step = min(seconds_to_samples(FORCE_STEP_SECONDS, self.app.sample_rate), len(force1_values))
+        max_force1 = np.max(step_means(force1_values, step))
+        max_force2 = np.max(step_means(force2_values, step))
+        avg_force1 = np.mean(force1_values)
+        avg_force2 = np.mean(force2_values)
+        total_force = np.max(step_means(force1_values + force2_values, step))
+
+        # Calculate combined force over time
+        combined_force = force1_values + force2_values
+
+        # Work calculation using force and angle
+        work_done = self.calculate_work(force1_values, force2_values, angle_data, time_data)
+
+        # Calculate force rate (how quickly force changes)
+        force_rate1 = self.max_force_rate(force1_values)
+        force_rate2 = self.max_force_rate(force2_values)
+
+        return {
+            'time': time_data,
+            'force1': force1_values,
+            'force2': force2_values,
+            'angle': angle_data,
+            'combined_force': combined_force,
+            'max_force1': max_force1,
+            'max_force2': max_force2,
+            'avg_force1': avg_force1,
+            'avg_force2': avg_force2,
+            'peak_combined_force': total_force,
+            'work': work_done,
+            'max_force_rate1': force_rate1,
+            'max_force_rate2': force_rate2,
+        }
+
+    def max_force_rate(self, force_values):
+        """Largest change of force per second, measured over FORCE_STEP_SECONDS"""
+        fs = self.app.sample_rate
+        step = seconds_to_samples(FORCE_STEP_SECONDS, fs)
+        if len(force_values) < 2 * step:
+            return 0.0
+        return np.max(np.abs(np.diff(step_means(force_values, step)))) * fs / step
+
     def calculate_work(self, force1_values, force2_values, angle_data, time_data):
         """
         Calculate work done using force and either angle or time data
         Work = Force × distance, always output in Joules (N⋅m)
         """
         try:
-            total_force = force1_values + force2_values
+            # Changes are taken over FORCE_STEP_SECONDS
+            step = seconds_to_samples(FORCE_STEP_SECONDS, self.app.sample_rate)
+            total_force = step_means(force1_values + force2_values, step)
+            angle_data = step_means(angle_data, step)
 
             if np.any(angle_data != 0):
                 # If we have angle data, use it to estimate displacement
@@ -253,7 +255,7 @@ class ForceAnalyzer:
             else:
                 # Estimate work from force-time curve (power integration)
                 # This is a rough approximation
-                dt = np.mean(np.diff(time_data))
+                dt = step / self.app.sample_rate
                 force_changes = np.abs(np.diff(total_force))
 
                 # Rough estimate: assume movement velocity proportional to force change
@@ -2,13 +2,27 @@ import numpy as np
 from scipy import signal
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from extrema import find_extrema
+from integration import integrate_displacement
+from resampling import seconds_to_samples
+from range_statistics import band_pass
+from spectral_peak import TREMOR_BAND, dominant_frequency
+from tremor_classifier import classify_signals, describe
+from ui_components import DebouncedUpdate
 import tkinter as tk
 from tkinter import ttk
 
-try:
-    from scipy.integrate import cumulative_trapezoid
-except ImportError:
-    from scipy.integrate import cumtrapz as cumulative_trapezoid
+# Bandpass filter cut-offs (Hz) and the ranges of their sliders, apart so the low cut-off
+# stays below the high one
+DEFAULT_BAND = (1.0, 20.0)
+LOW_CUT_RANGE = (0.2, 5.0)
+HIGH_CUT_RANGE = (5.5, 45.0)
+
+# Coherence segment length (256 samples at the firmware's 100 Hz, about 0.4 Hz resolution)
+COHERENCE_SEGMENT_SECONDS = 2.56
+
+# Filtered spectra kept per data set (one per filter setting explored with the sliders)
+MAX_CACHED_SPECTRA = 8
 
 
 class FrequencyAnalyzer:
@@ -18,10 +32,15 @@ class FrequencyAnalyzer:
         self.fig = None
         self.sensor_var = None
         self.filter_var = None
+        self.live_update = None
+
+        # Spectra of all channels, computed together and cached per data set and filter setting
+        self._spectra_data = None
+        self._spectra_cache = {}
 
     def analyse(self, parent_frame, data, measure_type):
         """Perform frequency analysis on the data"""
-        if not data or len(data) < 10:
+        if data is None or len(data) < 10:
             self.app.show_error("Not enough data for frequency analysis")
             return
 
@@ -33,23 +52,36 @@ class FrequencyAnalyzer:
         control_frame = ttk.Frame(parent_frame)
         control_frame.pack(fill='x', padx=10, pady=5)
 
-        # Sensor selection
+        # Sensor selection (all channels are transformed together, so switching is a lookup)
         ttk.Label(control_frame, text="Analyse Sensor:").pack(side='left', padx=5)
         self.sensor_var = tk.StringVar(value="Sensor 1")
         sensor_combo = ttk.Combobox(control_frame, textvariable=self.sensor_var,
-                                    values=["Sensor 1", "Sensor 2", "Sensor 3"], width=10)
+                                    values=self.get_channel_names(data), width=16)
         sensor_combo.pack(side='left', padx=5)
+        sensor_combo.bind('<<ComboboxSelected>>', lambda event: self.request_update(data))
 
-        # Filter option
+        # Filter option and cut-offs; every change recomputes in the background once the
+        # controls stop moving and only redraws the plotted lines
         self.filter_var = tk.BooleanVar(value=True)
-        filter_check = ttk.Checkbutton(control_frame, text="Apply Bandpass Filter (1-20 Hz)",
-                                       variable=self.filter_var)
-        filter_check.pack(side='left', padx=20)
-
-        # Update button
-        update_btn = ttk.Button(control_frame, text="Update Analysis",
-                                command=lambda: self.update_analysis(data, measure_type))
-        update_btn.pack(side='left', padx=5)
+        filter_check = ttk.Checkbutton(control_frame, text="Apply Bandpass Filter",
+                                       variable=self.filter_var, command=lambda: self.request_update(data))
+        filter_check.pack(side='left', padx=(20, 5))
+
+        nyquist = 0.5 * self.app.sample_rate
+        self.band_vars = []
+        self.band_label = ttk.Label(control_frame, width=14)
+        for low, high, value in ((*LOW_CUT_RANGE, DEFAULT_BAND[0]),
+                                 (HIGH_CUT_RANGE[0], min(HIGH_CUT_RANGE[1], 0.95 * nyquist), DEFAULT_BAND[1])):
+            variable = tk.DoubleVar(value=value)
+            ttk.Scale(control_frame, from_=low, to=high, variable=variable, length=110,
+                      command=lambda text: self.request_update(data)).pack(side='left', padx=2)
+            self.band_vars.append(variable)
+        self.band_label.pack(side='left', padx=5)
+
+        live_update = DebouncedUpdate(self.app.root, self.compute_view,
+                                      lambda view: self.show_view(live_update, view, measure_type),
+                                      on_error=lambda e: self.app.log(f"Frequency analysis update error: {str(e)}"))
+        self.live_update = live_update
 
         # Results frame
         results_frame = ttk.LabelFrame(parent_frame, text="Analysis Results", padding=5)
@@ -59,6 +91,7 @@ class FrequencyAnalyzer:
         self.dominant_freq_var = tk.StringVar(value="-")
         self.interpretation_var = tk.StringVar(value="-")
         self.displacement_amplitude_var = tk.StringVar(value="-")
+        self.coherence_var = tk.StringVar(value="-")
 
         # Results display
         ttk.Label(results_frame, text="Dominant Frequency:").grid(row=0, column=0, sticky='w', padx=5, pady=2)
@@ -70,6 +103,11 @@ class FrequencyAnalyzer:
         ttk.Label(results_frame, textvariable=self.displacement_amplitude_var, font=('Arial', 10, 'bold')).grid(
             row=0, column=4, sticky='w', padx=5, pady=2)
 
+        ttk.Label(results_frame, text="Coherence (Sensor 1 - Sensor 2):").grid(row=0, column=5, sticky='w',
+                                                                              padx=15, pady=2)
+        ttk.Label(results_frame, textvariable=self.coherence_var, font=('Arial', 10, 'bold')).grid(
+            row=0, column=6, sticky='w', padx=5, pady=2)
+
         ttk.Label(results_frame, text="Interpretation:").grid(row=1, column=0, sticky='w', padx=5, pady=2)
         ttk.Label(results_frame, textvariable=self.interpretation_var, font=('Arial', 10, 'bold')).grid(
             row=1, column=1, columnspan=4, sticky='w', padx=5, pady=2)
@@ -86,6 +124,20 @@ class FrequencyAnalyzer:
         self.freq_plot = self.fig.add_subplot(312)
         self.displacement_plot = self.fig.add_subplot(313)
 
+        # Lines updated in place when the settings change
+        self.time_line, = self.time_plot.plot([], [])
+        self.time_plot.set_xlabel("Time (s)")
+        self.time_plot.set_ylabel("Amplitude")
+        self.time_plot.grid(True)
+
+        self.spectrum_line, = self.freq_plot.plot([], [])
+        self.dominant_marker, = self.freq_plot.plot([], [], 'ro')
+        self.dominant_annotation = self.freq_plot.annotate("", xy=(0, 0), xytext=(5, 5), textcoords='offset points')
+        self.freq_plot.set_title("Frequency Spectrum")
+        self.freq_plot.set_xlabel("Frequency (Hz)")
+        self.freq_plot.set_ylabel("Amplitude")
+        self.freq_plot.grid(True)
+
         self.fig.tight_layout()
 
         # Create canvas
@@ -96,125 +148,215 @@ class FrequencyAnalyzer:
         # Initial analysis
         self.update_analysis(data, measure_type)
 
+    def get_channel_names(self, data):
+        """Return the selectable channel names for this data set"""
+        mode = data[0][2]
+        if mode == 3 and len(data[0]) >= 8:  # Stiffness with 5 sensors
+            return [f"Sensor {i + 1}" for i in range(5)]
+        elif mode == 1:  # Tremor - the three accelerometer axes can be combined
+            return ["Sensor 1", "Sensor 2", "Sensor 3", "Vector Magnitude"]
+        return ["Sensor 1", "Sensor 2", "Sensor 3"]
+
+    def compute_channel_spectra(self, data, apply_filter, band=DEFAULT_BAND):
+        """
+        Detrend, filter and transform all channels of the data together as one 2-D array
+
+        Results are cached per data set and filter setting (on/off and band), so
+        switching between sensors or back to a band already shown does not
+        recompute anything. A band the sampling rate cannot hold (band_pass keeps
+        the high cut-off below Nyquist) is left unfiltered.
+        """
+        # Sampling rate of the uniform grid the recording was resampled onto at ingest
+        fs = self.app.sample_rate
+        if apply_filter and band[0] >= min(band[1], 0.95 * 0.5 * fs):
+            apply_filter = False
+
+        if self._spectra_data is not data:
+            self._spectra_data = data
+            self._spectra_cache = {}
+        key = (apply_filter, tuple(band)) if apply_filter else False
+        if key in self._spectra_cache:
+            return self._spectra_cache[key]
+
+        data_array = np.asarray(data, dtype=float)
+        time_data = data_array[:, 1] / 1000.0  # Convert to seconds
+        channel_names = self.get_channel_names(data)
+
+        # One row per channel: value1..value3 (or value1..value5)
+        n_sensors = sum(1 for name in channel_names if name.startswith("Sensor"))
+        channels = data_array[:, 3:3 + n_sensors].T
+        if "Vector Magnitude" in channel_names:
+            channels = np.vstack([channels, np.sqrt(np.sum(channels[:3] ** 2, axis=0))])
+
+        # Remove DC component (mean) of every channel in one pass
+        channels = signal.detrend(channels, axis=-1, type='constant')
+
+        # Apply bandpass filter if requested - one SOS pass over all channels
+        filtered = channels
+        statistics = self.app.range_statistics
+        window = statistics.window_of(data) if statistics is not None else None
+        if apply_filter and window is not None:
+            # A range of the recording: slice its band-passed sensors (filtered once per band),
+            # which also keeps filter transients away from the edges of the range
+            start, stop = window
+            filtered = statistics.band_passed(band)[:n_sensors, start:stop]
+            if len(filtered) < len(channels):
+                filtered = np.vstack([filtered, band_pass(channels[n_sensors:], fs, band)])
+        elif apply_filter:
+            filtered = band_pass(channels, fs, band)
+
+        # FFT of all channels at once
+        n = filtered.shape[-1]
+        fft_freq = np.fft.rfftfreq(n, d=1.0 / fs)
+        fft_magnitude = np.abs(np.fft.rfft(filtered, axis=-1)) * 2.0 / n
+
+        # Dominant tremor-band frequency of every channel, resolved between the FFT bins
+        dominant = dominant_frequency(filtered, fs, TREMOR_BAND)
+
+        # Coherence between the first two channels (analog sensor and accelerometer in tremor tests)
+        coherence_freq, coherence = signal.coherence(filtered[0], filtered[1], fs=fs,
+                                                     nperseg=min(seconds_to_samples(COHERENCE_SEGMENT_SECONDS, fs), n))
+
+        # Tremor type of every channel of a tremor recording, classified together
+        classifications = None
+        if int(data_array[0, 2]) == 1:
+            features, (names, probabilities) = classify_signals(filtered, fs)
+            classifications = [describe(name, probability) for name, probability in zip(names, probabilities)]
+
+        spectra = {
+            'time': time_data,
+            'fs': fs,
+            'names': channel_names,
+            'filtered': filtered,
+            'freqs': fft_freq,
+            'magnitude': fft_magnitude,
+            'dominant_freqs': dominant['frequency'],
+            'coherence_freqs': coherence_freq,
+            'coherence': coherence,
+            'classifications': classifications,
+        }
+        if len(self._spectra_cache) >= MAX_CACHED_SPECTRA:
+            del self._spectra_cache[next(iter(self._spectra_cache))]
+        self._spectra_cache[key] = spectra
+        return spectra
+
+    def view_settings(self, data):
+        """Current control settings: (data, filter on, band, sensor name) - read on the Tk thread"""
+        band = (round(self.band_vars[0].get(), 1), round(self.band_vars[1].get(), 1))
+        self.band_label.configure(text=f"{band[0]:.1f}-{band[1]:.1f} Hz")
+        return data, self.filter_var.get(), band, self.sensor_var.get()
+
+    def request_update(self, data):
+        """Recompute with the current settings in the background once the controls stop changing"""
+        self.live_update.request(self.view_settings(data))
+
     def update_analysis(self, data, measure_type):
         """Update the frequency analysis based on current settings"""
-        # Extract time data
-        time_data = np.array([item[1] / 1000.0 for item in data])  # Convert to seconds
+        self.show_view(self.live_update, self.compute_view(self.view_settings(data)), measure_type)
+
+    def compute_view(self, settings):
+        """
+        Everything one sensor's view shows, without touching any widget
+
+        Returns a dict with the channel spectra, the selected channel, its dominant
+        frequency and coherence (None outside the 1-20 Hz tremor range) and, for
+        accelerometer channels of tremor recordings, the displacement.
+        """
+        data, apply_filter, band, sensor_name = settings
         mode = data[0][2]  # Get the mode from the data
+        spectra = self.compute_channel_spectra(data, apply_filter, band)
 
-        # Select sensor data
-        if self.sensor_var.get() == "Sensor 1":
-            sensor_data = np.array([item[3] for item in data])  # value1
-            sensor_name = "Sensor 1"
-        elif self.sensor_var.get() == "Sensor 2":
-            sensor_data = np.array([item[4] for item in data])  # value2
-            sensor_name = "Sensor 2"
-        else:
-            sensor_data = np.array([item[5] for item in data])  # value3
-            sensor_name = "Sensor 3"
+        # Select sensor data (a lookup into the precomputed channel spectra)
+        if sensor_name not in spectra['names']:
+            sensor_name = spectra['names'][0]
+        channel = spectra['names'].index(sensor_name)
+        fft_freq = spectra['freqs']
+        fft_magnitude = spectra['magnitude'][channel]
 
-        # Remove DC component (mean)
-        sensor_data = sensor_data - np.mean(sensor_data)
+        view = {'mode': mode, 'spectra': spectra, 'channel': channel, 'sensor_name': sensor_name,
+                'dominant_freq': None, 'coherence': None, 'displacement': None}
 
-        # Calculate sampling rate
-        if len(time_data) > 1:
-            # Calculate average time step
-            dt = np.mean(np.diff(time_data))
-            fs = 1.0 / dt  # Sampling frequency in Hz
-        else:
-            fs = 100  # Default sampling rate
-
-        # Apply bandpass filter if requested
-        filtered_data = sensor_data.copy()
-        if self.filter_var.get():
-            # Bandpass filter (1-20 Hz)
-            nyquist = 0.5 * fs
-            low = 1.0 / nyquist
-            high = 20.0 / nyquist
-            b, a = signal.butter(4, [low, high], btype='band')
-            filtered_data = signal.filtfilt(b, a, sensor_data)
-
-        # Clear plots
-        self.time_plot.clear()
-        self.freq_plot.clear()
-        self.displacement_plot.clear()
+        # Dominant frequency (estimated in compute_channel_spectra)
+        # Only consider 1-20 Hz range for tremor analysis
+        mask = (fft_freq >= TREMOR_BAND[0]) & (fft_freq <= TREMOR_BAND[1])
+        if np.any(mask):
+            view['dominant_freq'] = spectra['dominant_freqs'][channel]
+            view['dominant_magnitude'] = np.interp(view['dominant_freq'], fft_freq, fft_magnitude)
+
+            # Coherence between sensors 1 and 2 at the dominant frequency
+            coherence_idx = np.argmin(np.abs(spectra['coherence_freqs'] - view['dominant_freq']))
+            view['coherence'] = spectra['coherence'][coherence_idx]
+
+        # Displacement from acceleration (tremor mode, accelerometer axes only)
+        if mode == 1 and sensor_name in ["Sensor 1", "Sensor 2", "Sensor 3"]:
+            view['displacement'] = self.calculate_displacement_from_acceleration(
+                spectra['filtered'][channel], spectra['time'])
+        return view
+
+    def show_view(self, live_update, view, measure_type):
+        """Show a computed view, updating the existing lines (Tk thread)"""
+        if live_update is not self.live_update or not self.canvas.get_tk_widget().winfo_exists():
+            return  # Analysis was closed or replaced meanwhile
+
+        spectra = view['spectra']
+        sensor_name = view['sensor_name']
+        time_data = spectra['time']
+        fs = spectra['fs']
+        filtered_data = spectra['filtered'][view['channel']]
 
         # Time domain plot
-        self.time_plot.plot(time_data, filtered_data)
+        self.time_line.set_data(time_data, filtered_data)
         self.time_plot.set_title(f"{sensor_name} - Time Domain")
-        self.time_plot.set_xlabel("Time (s)")
-        self.time_plot.set_ylabel("Amplitude")
-        self.time_plot.grid(True)
-
-        # FFT analysis
-        n = len(filtered_data)
-        fft_result = np.fft.rfft(filtered_data)
-        fft_freq = np.fft.rfftfreq(n, d=1.0 / fs)
-        fft_magnitude = np.abs(fft_result) * 2.0 / n
 
         # FFT plot
-        self.freq_plot.plot(fft_freq, fft_magnitude)
-        self.freq_plot.set_title("Frequency Spectrum")
-        self.freq_plot.set_xlabel("Frequency (Hz)")
-        self.freq_plot.set_ylabel("Amplitude")
+        self.spectrum_line.set_data(spectra['freqs'], spectra['magnitude'][view['channel']])
+        for plot in (self.time_plot, self.freq_plot):
+            plot.relim(visible_only=True)
+            plot.autoscale_view()
         self.freq_plot.set_xlim(0, min(20, fs / 2))  # Limit to relevant frequencies
-        self.freq_plot.grid(True)
 
-        # Find dominant frequency
-        # Only consider 1-20 Hz range for tremor analysis
-        mask = (fft_freq >= 1.0) & (fft_freq <= 20.0)
-        if np.any(mask):
-            tremor_freqs = fft_freq[mask]
-            tremor_mags = fft_magnitude[mask]
-
-            if len(tremor_mags) > 0:
-                # Find peak frequency
-                peak_idx = np.argmax(tremor_mags)
-                dominant_freq = tremor_freqs[peak_idx]
-
-                # Mark the dominant frequency
-                self.freq_plot.plot(dominant_freq, tremor_mags[peak_idx], 'ro')
-                self.freq_plot.annotate(f"{dominant_freq:.2f} Hz",
-                                        xy=(dominant_freq, tremor_mags[peak_idx]),
-                                        xytext=(5, 5), textcoords='offset points')
-
-                # Update results display
-                self.dominant_freq_var.set(f"{dominant_freq:.2f}")
-
-                # Interpret based on measurement type
-                if measure_type == "Tremor":
-                    if 3.0 <= dominant_freq <= 7.0:
-                        interpretation = "Consistent with Parkinsonian tremor (3-7 Hz)"
-                    elif 7.0 < dominant_freq <= 12.0:
-                        interpretation = "Consistent with essential/physiological tremor (7-12 Hz)"
-                    else:
-                        interpretation = "Outside typical tremor ranges"
-                else:
-                    interpretation = f"Dominant frequency: {dominant_freq:.2f} Hz"
-
-                self.interpretation_var.set(interpretation)
-                self.app.log(f"Dominant frequency: {dominant_freq:.2f} Hz - {interpretation}")
+        dominant_freq = view['dominant_freq']
+        self.dominant_marker.set_visible(dominant_freq is not None)
+        self.dominant_annotation.set_visible(dominant_freq is not None)
+        if dominant_freq is not None:
+            # Mark the dominant frequency
+            self.dominant_marker.set_data([dominant_freq], [view['dominant_magnitude']])
+            self.dominant_annotation.xy = (dominant_freq, view['dominant_magnitude'])
+            self.dominant_annotation.set_text(f"{dominant_freq:.2f} Hz")
+
+            # Update results display
+            self.dominant_freq_var.set(f"{dominant_freq:.2f}")
+            self.coherence_var.set(f"{view['coherence']:.2f}")
+
+            # Interpret based on measurement type
+            if measure_type == "Tremor" and spectra['classifications'] is not None:
+                interpretation = spectra['classifications'][view['channel']]
             else:
-                self.dominant_freq_var.set("N/A")
-                self.interpretation_var.set("No significant frequency components detected")
+                interpretation = f"Dominant frequency: {dominant_freq:.2f} Hz"
+
+            self.interpretation_var.set(interpretation)
+            self.app.log(f"Dominant frequency: {dominant_freq:.2f} Hz - {interpretation}")
         else:
             self.dominant_freq_var.set("N/A")
+            self.coherence_var.set("N/A")
             self.interpretation_var.set("No data in relevant frequency range")
 
-        # Displacement analysis (only for accelerometer data)
-        displacement_amplitude = self.calculate_displacement_analysis(filtered_data, time_data, mode)
+        # Displacement analysis (only for accelerometer data); the only plot that is redrawn
+        self.displacement_plot.clear()
+        displacement_amplitude = self.calculate_displacement_analysis(filtered_data, time_data, view['mode'],
+                                                                      view['displacement'], sensor_name)
 
         if displacement_amplitude is not None:
             self.displacement_amplitude_var.set(f"{displacement_amplitude:.2f} mm")
         else:
             self.displacement_amplitude_var.set("N/A")
 
-        # Update the layout and redraw
-        self.fig.tight_layout()
-        self.canvas.draw()
+        # Redraw once Tk is idle
+        self.canvas.draw_idle()
 
-    def calculate_displacement_analysis(self, acceleration_data, time_data, mode):
-        """Calculate displacement from acceleration and create displacement plot"""
+    def calculate_displacement_analysis(self, acceleration_data, time_data, mode, displacement_data=None,
+                                        sensor_name=None):
+        """Calculate displacement from acceleration (unless already calculated) and create displacement plot"""
         try:
             # Only calculate displacement for tremor mode (mode 1) and accelerometer sensors
             if mode != 1:
@@ -225,7 +367,8 @@ class FrequencyAnalyzer:
                 return None
 
             # Check if this is an accelerometer sensor (for tremor mode, sensors 1-3 are accelerometer X, Y, Z)
-            sensor_name = self.sensor_var.get()
+            if sensor_name is None:
+                sensor_name = self.sensor_var.get()
             if sensor_name not in ["Sensor 1", "Sensor 2", "Sensor 3"]:
                 self.displacement_plot.text(0.5, 0.5, 'Displacement analysis only available for accelerometer sensors',
                                             transform=self.displacement_plot.transAxes, ha='center', va='center',
@@ -234,7 +377,8 @@ class FrequencyAnalyzer:
                 return None
 
             # Calculate displacement from acceleration using double integration
-            displacement_data = self.calculate_displacement_from_acceleration(acceleration_data, time_data)
+            if displacement_data is None:
+                displacement_data = self.calculate_displacement_from_acceleration(acceleration_data, time_data)
 
             if len(displacement_data['displacement']) == 0:
                 self.displacement_plot.text(0.5, 0.5, 'Unable to calculate displacement',
@@ -255,7 +399,8 @@ class FrequencyAnalyzer:
             amplitude_mm = np.ptp(displacement_mm) / 2  # Peak-to-peak to amplitude
 
             # Mark peaks and troughs for visual reference
-            self.mark_displacement_extrema(displacement_data['time'], displacement_mm)
+            extrema = find_extrema(displacement_mm, displacement_data['time'])
+            self.mark_displacement_extrema(displacement_data['time'], displacement_mm, extrema)
 
             # Add amplitude text to plot
             self.displacement_plot.text(0.02, 0.98, f'Amplitude: {amplitude_mm:.2f} mm',
@@ -281,23 +426,8 @@ class FrequencyAnalyzer:
         Returns time and displacement arrays for plotting
         """
         try:
-            # Remove DC component
-            accel_centered = acceleration_signal - np.mean(acceleration_signal)
-
-            # Convert acceleration from g to m/s² (1g = 9.81 m/s²)
-            accel_ms2 = accel_centered * 9.81
-
-            # First integration: acceleration -> velocity
-            velocity = cumulative_trapezoid(accel_ms2, time_data, initial=0)
-
-            # Remove any DC drift in velocity
-            velocity = velocity - np.mean(velocity)
-
-            # Second integration: velocity -> displacement
-            displacement = cumulative_trapezoid(velocity, time_data, initial=0)
-
-            # Remove any DC drift in displacement
-            displacement = displacement - np.mean(displacement)
+            # Drift-robust double integration (frequency domain, 1-20 Hz tremor band)
+            displacement = integrate_displacement(acceleration_signal, self.app.sample_rate)
 
             return {
                 'time': time_data,
@@ -308,21 +438,14 @@ class FrequencyAnalyzer:
             self.app.log(f"Displacement calculation error: {str(e)}")
             return {'time': [], 'displacement': []}
 
-    def mark_displacement_extrema(self, time_data, displacement_mm):
+    def mark_displacement_extrema(self, time_data, displacement_mm, extrema=None):
         """Mark peaks and troughs on the displacement plot for visual reference"""
         try:
-            from scipy.signal import find_peaks
-
-            # Calculate minimum prominence for peak detection
-            signal_range = np.ptp(displacement_mm)
-            min_prominence = signal_range * 0.1  # 10% of signal range
-            min_distance = max(10, len(displacement_mm) // 20)  # Minimum distance between peaks
-
-            # Find peaks
-            peaks, _ = find_peaks(displacement_mm, prominence=min_prominence, distance=min_distance)
+            if extrema is None:
+                extrema = find_extrema(displacement_mm, time_data)
 
-            # Find troughs (peaks of inverted signal)
-            troughs, _ = find_peaks(-displacement_mm, prominence=min_prominence, distance=min_distance)
+            peaks = extrema['peaks']
+            troughs = extrema['troughs']
 
             # Mark peaks with upward triangles
             if len(peaks) > 0:
@@ -339,4 +462,4 @@ class FrequencyAnalyzer:
         except Exception as e:
             # Don't fail the entire analysis if peak marking fails
             self.app.log(f"Peak marking error: {str(e)}")
-            pass
\ No newline at end of file
+            pass
@@ -0,0 +1,71 @@
+import numpy as np
+from scipy import signal
+
+try:
+    from scipy.integrate import cumulative_trapezoid
+except ImportError:
+    from scipy.integrate import cumtrapz as cumulative_trapezoid
+
+GRAVITY = 9.81  # 1 g in m/s²
+
+
+def integrate_displacement(acceleration_g, fs, method='frequency', band=(1.0, 20.0), axis=-1):
+    """
+    Convert acceleration (g) to displacement (m) by double integration
+
+    Works on any number of channels or windows at once: every 1-D slice along
+    `axis` is integrated independently in one vectorized call. Linear trends
+    (sensor offset and slow drift) are removed before integrating.
+
+    Methods:
+    'frequency' - divide the spectrum by -(2πf)² inside the band and zero it
+                  outside; the slices are tapered and zero-padded first so the
+                  FFT does not wrap the ends into each other. No drift can build up.
+    'highpass'  - integrate twice in the time domain, high-pass filtering the
+                  acceleration, velocity and displacement at band[0]
+    """
+    accel = np.moveaxis(np.asarray(acceleration_g, dtype=float), axis, -1)
+    accel = signal.detrend(accel, axis=-1, type='linear') * GRAVITY
+    n = accel.shape[-1]
+    low, high = band
+    high = min(high, 0.95 * 0.5 * fs)  # Stay below Nyquist
+
+    if method == 'frequency':
+        accel = accel * signal.windows.tukey(n, 0.1)
+        n_fft = 2 * n
+        freqs = np.fft.rfftfreq(n_fft, d=1.0 / fs)
+        in_band = (freqs >= low) & (freqs <= high)
+
+        # -1/(2πf)² inside the band, 0 elsewhere (including DC)
+        gain = np.zeros_like(freqs)
+        gain[in_band] = -1.0 / (2 * np.pi * freqs[in_band]) ** 2
+
+        spectrum = np.fft.rfft(accel, n=n_fft, axis=-1) * gain
+        displacement = np.fft.irfft(spectrum, n=n_fft, axis=-1)[..., :n]
+
+    elif method == 'highpass':
+        sos = signal.butter(4, low, btype='high', fs=fs, output='sos')
+
+        def highpass(x):
+            return signal.sosfiltfilt(sos, x, axis=-1, padtype='even', padlen=n - 1)
+
+        velocity = cumulative_trapezoid(highpass(accel), dx=1.0 / fs, axis=-1, initial=0)
+        displacement = cumulative_trapezoid(highpass(velocity), dx=1.0 / fs, axis=-1, initial=0)
+        displacement = highpass(displacement)
+
+    else:
+        raise ValueError("method must be 'frequency' or 'highpass'")
+
+    return np.moveaxis(displacement, -1, axis)
+
+
+def sliding_windows(x, window_samples, step_samples, axis=-1):
+    """Return a (..., n_windows, window_samples) view of overlapping windows along `axis`"""
+    x = np.moveaxis(np.asarray(x, dtype=float), axis, -1)
+    windows = np.lib.stride_tricks.sliding_window_view(x, window_samples, axis=-1)
+    return windows[..., ::step_samples, :]
+
+
+def displacement_amplitude(displacement, axis=-1):
+    """Amplitude (half of peak-to-peak) of each displacement slice along `axis`"""
+    return np.ptp(displacement, axis=axis) / 2
@@ -1,18 +1,83 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+import threading
+import time
 import numpy as np
-from scipy.signal import find_peaks, savgol_filter
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from extrema import find_extrema
+from smoothing import savgol
+from pipeline import Pipeline
+from resampling import sample_rate_of, seconds_to_samples
+from ui_components import DebouncedUpdate
+
+# Default smoothing window and minimum time between two peaks (21 and 30 samples at the
+# firmware's 100 Hz); converted to samples with the recording's rate
+SMOOTH_SECONDS = 0.21
+PEAK_DISTANCE_SECONDS = 0.3
+
+# Ranges of the smoothing window and peak distance sliders (seconds)
+SMOOTH_SECONDS_RANGE = (0.05, 1.0)
+PEAK_DISTANCE_SECONDS_RANGE = (0.01, 2.0)
+
+# Movement metrics panel: (row, column, metric, label)
+METRIC_LABELS = (
+    (0, 0, 'movement_count', "Movement Count:"),
+    (1, 0, 'avg_range', "Average Range of Motion:"),
+    (2, 0, 'movement_frequency', "Movement Frequency:"),
+    (0, 2, 'data_range', "Data Range ({unit}):"),
+    (1, 2, 'peaks', "Peaks Found:"),
+    (2, 2, 'troughs', "Troughs Found:"),
+    (0, 4, 'peak_velocity', "Peak Angular Velocity:"),
+    (1, 4, 'mean_speed', "Mean Angular Speed:"),
+)
+
+
+def smooth_angle(angle_data, smooth_window):
+    """Remove the DC offset of an angle signal and smooth it with a cubic Savitzky-Golay filter"""
+    return smooth_angle_derivatives(angle_data, smooth_window, derivs=(0,))[0]
+
+
+def smooth_angle_derivatives(angle_data, smooth_window, delta=1.0, derivs=(0, 1, 2)):
+    """
+    Smoothed angle and its derivatives (angular velocity, acceleration) from one filter pass
+
+    delta is the sample spacing in seconds. Returns one array per derivative order.
+    """
+    # Remove DC offset
+    angle_data_centered = angle_data - np.mean(angle_data)
+
+    # Apply Savitzky-Golay filter to smooth the data
+    # Ensure window_length is odd
+    if smooth_window % 2 == 0:
+        smooth_window += 1
+
+    # Ensure window is valid for the data length
+    smooth_window = min(smooth_window, len(angle_data) - 3)
+    if smooth_window < 5:
+        smooth_window = 5
+    if smooth_window % 2 == 0:
+        smooth_window -= 1
+
+    # Apply the filter (coefficients are cached per window)
+    return savgol(angle_data_centered, smooth_window, polyorder=3, derivs=derivs, delta=delta)
 
 
 class MovementAnalyzer:
     def __init__(self, app):
         self.app = app
+        self.tuning_pool = None
+
+        # Detection stages, cached between parameter changes; background recomputes and the
+        # Tk thread share it one at a time
+        self.pipeline = self.build_pipeline()
+        self.pipeline_lock = threading.Lock()
+        self.live_update = None
+        self.canvas = None
 
     def analyze(self, parent_frame, data, measure_type):
         """Analyze movement metrics (count and range)"""
-        if not data or len(data) < 10:
+        if data is None or len(data) < 10:
             messagebox.showinfo("Info", "Not enough data to analyze movements")
             return
 
@@ -68,34 +133,14 @@ class MovementAnalyzer:
             self.app.log(f"Valid data points: {len(clean_angles)}")
             self.app.log(f"Angle range: {np.min(clean_angles):.2f} to {np.max(clean_angles):.2f}")
 
-            # Clear parent frame
-            for widget in parent_frame.winfo_children():
-                widget.destroy()
-
-            # Set proper parameter ranges based on data values
-            data_range = np.max(clean_angles) - np.min(clean_angles)
-
-            # Set default parameters based on data range
-            # For degrees, use 10% of range for height and 5% for prominence
-            if np.max(abs(clean_angles)) < 500:  # Likely degrees or normalized values
-                default_height = max(5, data_range * 0.1)  # 10% of range
-                default_prominence = max(3, data_range * 0.05)  # 5% of range
-                unit_label = "degrees"
-            else:  # Old 0-4095 range
-                default_height = max(100, data_range * 0.1)
-                default_prominence = max(50, data_range * 0.05)
-                unit_label = "units"
-
             # Use default parameters for analysis
-            smooth_window = 21
-            peak_height = default_height
-            peak_distance = 30
-            peak_prominence = default_prominence
+            smooth_seconds, peak_height, peak_distance_seconds, peak_prominence, unit_label = \
+                self.default_parameters(clean_angles)
 
             # Run analysis with default parameters
-            self.update_movement_analysis(
+            self.show_analysis(
                 parent_frame, clean_time, clean_angles, measure_type,
-                smooth_window, peak_height, peak_distance, peak_prominence,
+                smooth_seconds, peak_height, peak_distance_seconds, peak_prominence,
                 unit_label)
 
         except Exception as e:
@@ -104,174 +149,252 @@ class MovementAnalyzer:
             self.app.log(f"Traceback: {traceback.format_exc()}")
             messagebox.showerror("Error", f"Movement analysis failed: {str(e)}")
 
+    def show_analysis(self, parent_frame, time_data, angle_data, measure_type,
+                      smooth_seconds, peak_height, peak_distance_seconds, peak_prominence, unit_label):
+        """Clear the frame and show the analysis below the detection parameter sliders and the Auto-tune button"""
+        for widget in parent_frame.winfo_children():
+            widget.destroy()
+
+        parameter_frame = ttk.Frame(parent_frame)
+        parameter_frame.pack(fill='x', padx=10, pady=(10, 0))
+        tune_button = ttk.Button(parameter_frame, text="Auto-tune Parameters")
+        tune_button.configure(command=lambda: self.auto_tune(parent_frame, time_data, angle_data, measure_type,
+                                                             unit_label, tune_button))
+        tune_button.pack(side='left', padx=5)
+
+        # Sliders recompute in the background once they stop moving; smoothing is only redone
+        # when the window changes, threshold changes reuse the smoothed signal
+        data_range = np.ptp(angle_data)
+        sliders = (
+            ('smooth_seconds', "Smoothing", *SMOOTH_SECONDS_RANGE, smooth_seconds, "{:.2f} s"),
+            ('peak_height', "Height", 0.0, max(data_range, 2 * peak_height), peak_height, "{:.2f}"),
+            ('peak_distance_seconds', "Distance", *PEAK_DISTANCE_SECONDS_RANGE, peak_distance_seconds, "{:.2f} s"),
+            ('peak_prominence', "Prominence", 0.0, max(data_range, 2 * peak_prominence), peak_prominence, "{:.2f}"),
+        )
+        self.parameter_vars = {}
+        for name, label, low, high, value, fmt in sliders:
+            ttk.Label(parameter_frame, text=f"{label}:").pack(side='left', padx=(10, 2))
+            variable = tk.DoubleVar(value=value)
+            value_label = ttk.Label(parameter_frame, text=fmt.format(value), width=7)
+            ttk.Scale(parameter_frame, from_=low, to=high, variable=variable, length=120,
+                      command=lambda text, l=value_label, f=fmt: self.parameter_changed(l, f, float(text))).pack(
+                side='left')
+            value_label.pack(side='left')
+            self.parameter_vars[name] = variable
+
+        live_update = DebouncedUpdate(
+            self.app.root, lambda params: self.compute_movement_metrics(time_data, angle_data, *params),
+            lambda metrics: self.show_metrics(live_update, metrics),
+            on_error=lambda e: self.app.log(f"Movement analysis update error: {str(e)}"))
+        self.live_update = live_update
+
+        self.update_movement_analysis(
+            parent_frame, time_data, angle_data, measure_type,
+            smooth_seconds, peak_height, peak_distance_seconds, peak_prominence,
+            unit_label)
+
+    def parameter_changed(self, value_label, fmt, value):
+        """Slider moved: show its value and schedule a recompute with the current parameters"""
+        value_label.configure(text=fmt.format(value))
+        self.live_update.request(tuple(self.parameter_vars[name].get() for name in
+                                       ('smooth_seconds', 'peak_height', 'peak_distance_seconds', 'peak_prominence')))
+
+    def auto_tune(self, parent_frame, time_data, angle_data, measure_type, unit_label, tune_button):
+        """Search the detection parameters in the background and show the analysis with the best set"""
+        from peak_tuning import (tune_peak_parameters, create_tuning_pool, search_work, SMOOTH_WINDOWS,
+                                 PARALLEL_MIN_WORK)
+
+        tune_button.configure(state='disabled')
+        self.app.status_var.set("Auto-tuning movement detection...")
+        # Workers only for searches long enough to use them; the pool then stays up
+        if self.tuning_pool is None and search_work(len(SMOOTH_WINDOWS), len(angle_data)) >= PARALLEL_MIN_WORK:
+            self.tuning_pool = create_tuning_pool()
+
+        def run():
+            start = time.time()
+            try:
+                tuned = tune_peak_parameters(time_data, angle_data, self.tuning_pool)
+            except Exception as e:
+                self.app.log(f"Auto-tune failed: {str(e)}")
+                tuned = None
+            self.app.root.after(0, lambda: finish(tuned, time.time() - start))
+
+        def finish(tuned, elapsed):
+            if not tune_button.winfo_exists():
+                return  # Analysis was replaced meanwhile
+            if tuned is None:
+                tune_button.configure(state='normal')
+                self.app.status_var.set("Auto-tune found no regular movement pattern")
+                return
+            self.app.log(f"Auto-tune: {tuned['evaluated']} parameter sets in {elapsed * 1000:.0f} ms, "
+                         f"period variation {tuned['period_cv']:.3f}")
+            self.app.status_var.set("Auto-tune complete")
+            self.show_analysis(parent_frame, time_data, angle_data, measure_type,
+                               tuned['smooth_seconds'], tuned['peak_height'], tuned['peak_distance_seconds'],
+                               tuned['peak_prominence'], unit_label)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def close(self):
+        """Stop the auto-tune workers"""
+        if self.tuning_pool is not None:
+            self.tuning_pool.shutdown(wait=False, cancel_futures=True)
+            self.tuning_pool = None
+
+    def default_parameters(self, angle_data):
+        """
+        Default detection parameters for an angle signal
+
+        Returns (smooth_seconds, peak_height, peak_distance_seconds, peak_prominence, unit_label)
+        """
+        # Set proper parameter ranges based on data values
+        data_range = np.max(angle_data) - np.min(angle_data)
+
+        # Set default parameters based on data range
+        # For degrees, use 10% of range for height and 5% for prominence
+        if np.max(abs(angle_data)) < 500:  # Likely degrees or normalized values
+            default_height = max(5, data_range * 0.1)  # 10% of range
+            default_prominence = max(3, data_range * 0.05)  # 5% of range
+            unit_label = "degrees"
+        else:  # Old 0-4095 range
+            default_height = max(100, data_range * 0.1)
+            default_prominence = max(50, data_range * 0.05)
+            unit_label = "units"
+
+        return SMOOTH_SECONDS, default_height, PEAK_DISTANCE_SECONDS, default_prominence, unit_label
+
+    def build_pipeline(self):
+        """
+        Movement detection as pipeline stages
+
+        Smoothing depends only on the signal and the window, so changing the
+        peak thresholds reruns peak detection and the metrics but reuses the
+        smoothed signal and its velocity. Windows and distances are given in
+        seconds and converted with the rate of the time axis.
+        """
+        pipeline = Pipeline()
+        pipeline.input('time', 'angle', 'smooth_seconds', 'peak_height', 'peak_distance_seconds', 'peak_prominence')
+        pipeline.node('fs', sample_rate_of, 'time')
+        pipeline.node('smoothed', lambda angle_data, fs, smooth_seconds: smooth_angle_derivatives(
+            angle_data, seconds_to_samples(smooth_seconds, fs), 1.0 / fs, derivs=(0, 1)),
+                      'angle', 'fs', 'smooth_seconds')
+
+        # Alternating peaks and troughs (movements in each direction) and the ranges and
+        # periods between them in one pass
+        pipeline.node('extrema', lambda smoothed, time_data, fs, height, distance_seconds, prominence: find_extrema(
+            smoothed[0], time_data, height=height, distance=seconds_to_samples(distance_seconds, fs),
+            prominence=prominence),
+                      'smoothed', 'time', 'fs', 'peak_height', 'peak_distance_seconds', 'peak_prominence')
+        pipeline.node('metrics', self.movement_metrics, 'time', 'smoothed', 'extrema')
+        return pipeline
+
+    def compute_movement_metrics(self, time_data, angle_data, smooth_seconds, peak_height, peak_distance_seconds,
+                                 peak_prominence):
+        """
+        Smooth the angle signal, detect movements and calculate the movement metrics without creating any widgets
+
+        Returns a dict with the smoothed signal, the find_extrema result, movement count,
+        average range, movement frequency, the range of the smoothed data and the angular
+        velocity with its peak and mean absolute value (per second). Stages whose inputs
+        are unchanged since the last call (same arrays, same parameters) are reused.
+        """
+        with self.pipeline_lock:
+            self.pipeline.set(time=time_data, angle=angle_data, smooth_seconds=smooth_seconds, peak_height=peak_height,
+                              peak_distance_seconds=peak_distance_seconds, peak_prominence=peak_prominence)
+            metrics = dict(self.pipeline.get('metrics'))
+
+        # Log detection results
+        extrema = metrics['extrema']
+        self.app.log(f"Peaks found: {len(extrema['peaks'])}, Troughs found: {len(extrema['troughs'])}")
+        return metrics
+
+    def movement_metrics(self, time_data, smoothed, extrema):
+        """Movement count, range, frequency and velocity metrics of one detection"""
+        angle_smooth, angular_velocity = smoothed
+        data_range = np.max(angle_smooth) - np.min(angle_smooth)
+        all_extrema = extrema['indices']
+
+        # Calculate movement count (a movement is considered a transition between extrema)
+        if len(all_extrema) >= 2:
+            movement_count = len(all_extrema) - 1
+        else:
+            movement_count = 0
+
+        # Ranges between consecutive extrema
+        ranges = extrema['ranges']
+
+        # Calculate average range
+        if len(ranges) > 0:
+            avg_range = np.mean(ranges)
+        else:
+            avg_range = 0
+
+        # Calculate frequency (movements per second)
+        if movement_count > 0 and len(time_data) > 1:
+            duration = time_data[-1] - time_data[0]
+            movement_frequency = movement_count / duration if duration > 0 else 0
+        else:
+            movement_frequency = 0
+
+        return {
+            'angle_smooth': angle_smooth,
+            'extrema': extrema,
+            'movement_count': movement_count,
+            'avg_range': avg_range,
+            'movement_frequency': movement_frequency,
+            'data_range': data_range,
+            'angular_velocity': angular_velocity,
+            'peak_velocity': np.max(np.abs(angular_velocity)),
+            'mean_speed': np.mean(np.abs(angular_velocity)),
+        }
+
     def update_movement_analysis(self, parent_frame, time_data, angle_data, measure_type,
-                                 smooth_window, peak_height, peak_distance, peak_prominence,
+                                 smooth_seconds, peak_height, peak_distance_seconds, peak_prominence,
                                  unit_label="degrees"):
-        """Update the movement analysis with new parameters"""
+        """Show the movement metrics and plots; later parameter changes only update their values and artists"""
         try:
             # Log parameters
-            self.app.log(f"Analysis parameters: smooth={smooth_window}, height={peak_height}, "
-                         f"distance={peak_distance}, prominence={peak_prominence}")
-
-            # Remove DC offset
-            angle_data_centered = angle_data - np.mean(angle_data)
-
-            # Apply Savitzky-Golay filter to smooth the data
-            # Ensure window_length is odd
-            if smooth_window % 2 == 0:
-                smooth_window += 1
-
-            # Ensure window is valid for the data length
-            smooth_window = min(smooth_window, len(angle_data) - 3)
-            if smooth_window < 5:
-                smooth_window = 5
-            if smooth_window % 2 == 0:
-                smooth_window -= 1
-
-            # Apply the filter
-            angle_smooth = savgol_filter(angle_data_centered, window_length=smooth_window, polyorder=3)
-
-            # Calculate the peak detection parameters
-            data_range = np.max(angle_smooth) - np.min(angle_smooth)
-            height_threshold = peak_height
-
-            # Find peaks (movements in one direction)
-            peaks, peak_props = find_peaks(
-                angle_smooth,
-                height=height_threshold,
-                distance=int(peak_distance),  # Use int for distance
-                prominence=peak_prominence
-            )
-
-            # Find troughs (movements in opposite direction)
-            troughs, trough_props = find_peaks(
-                -angle_smooth,
-                height=height_threshold,
-                distance=int(peak_distance),  # Use int for distance
-                prominence=peak_prominence
-            )
-
-            # Log detection results
-            self.app.log(f"Peaks found: {len(peaks)}, Troughs found: {len(troughs)}")
-
-            # Combine and sort all extrema points
-            if len(peaks) > 0 or len(troughs) > 0:
-                # Convert to lists before concatenating
-                peaks_list = peaks.tolist() if len(peaks) > 0 else []
-                troughs_list = troughs.tolist() if len(troughs) > 0 else []
-                all_extrema_list = sorted(peaks_list + troughs_list)
-                all_extrema = np.array(all_extrema_list)
-            else:
-                all_extrema = np.array([])
-
-            # Calculate movement count (a movement is considered a transition between extrema)
-            if len(all_extrema) >= 2:
-                movement_count = len(all_extrema) - 1
-            else:
-                movement_count = 0
-
-            # Calculate ranges between consecutive extrema
-            ranges = []
-            for i in range(len(all_extrema) - 1):
-                idx1 = all_extrema[i]
-                idx2 = all_extrema[i + 1]
-                range_value = abs(angle_smooth[idx1] - angle_smooth[idx2])
-                ranges.append(range_value)
-
-            # Calculate average range
-            if ranges:
-                avg_range = np.mean(ranges)
-            else:
-                avg_range = 0
+            self.app.log(f"Analysis parameters: smooth={smooth_seconds:.2f}s, height={peak_height}, "
+                         f"distance={peak_distance_seconds:.2f}s, prominence={peak_prominence}")
 
-            # Calculate frequency (movements per second)
-            if movement_count > 0 and len(time_data) > 1:
-                duration = time_data[-1] - time_data[0]
-                movement_frequency = movement_count / duration if duration > 0 else 0
-            else:
-                movement_frequency = 0
+            metrics = self.compute_movement_metrics(time_data, angle_data, smooth_seconds, peak_height,
+                                                    peak_distance_seconds, peak_prominence)
+            self.unit_label = unit_label
+            self.time_data = time_data
 
-            # Results frame
+            # Results frame; the values are variables so updates do not rebuild the widgets
             results_frame = ttk.LabelFrame(parent_frame, text="Movement Metrics", padding=10)
             results_frame.pack(fill='x', padx=10, pady=10)
 
-            # Display results
-            ttk.Label(results_frame, text="Movement Count:").grid(row=0, column=0, sticky='w', padx=5, pady=5)
-            ttk.Label(results_frame, text=f"{movement_count}", font=('Arial', 10, 'bold')).grid(
-                row=0, column=1, sticky='w', padx=5, pady=5)
-
-            ttk.Label(results_frame, text="Average Range of Motion:").grid(row=1, column=0, sticky='w', padx=5, pady=5)
-            ttk.Label(results_frame, text=f"{avg_range:.2f} {unit_label}", font=('Arial', 10, 'bold')).grid(
-                row=1, column=1, sticky='w', padx=5, pady=5)
-
-            ttk.Label(results_frame, text="Movement Frequency:").grid(row=2, column=0, sticky='w', padx=5, pady=5)
-            ttk.Label(results_frame, text=f"{movement_frequency:.2f} Hz", font=('Arial', 10, 'bold')).grid(
-                row=2, column=1, sticky='w', padx=5, pady=5)
-
-            # Raw Data Stats
-            ttk.Label(results_frame, text=f"Data Range ({unit_label}):").grid(row=0, column=2, sticky='w', padx=5,
-                                                                              pady=5)
-            ttk.Label(results_frame, text=f"{data_range:.2f}", font=('Arial', 10, 'bold')).grid(
-                row=0, column=3, sticky='w', padx=5, pady=5)
-
-            ttk.Label(results_frame, text="Peaks Found:").grid(row=1, column=2, sticky='w', padx=5, pady=5)
-            ttk.Label(results_frame, text=f"{len(peaks)}", font=('Arial', 10, 'bold')).grid(
-                row=1, column=3, sticky='w', padx=5, pady=5)
-
-            ttk.Label(results_frame, text="Troughs Found:").grid(row=2, column=2, sticky='w', padx=5, pady=5)
-            ttk.Label(results_frame, text=f"{len(troughs)}", font=('Arial', 10, 'bold')).grid(
-                row=2, column=3, sticky='w', padx=5, pady=5)
-
-            # Calculate period changes between peaks
-            peak_periods = []
-            peak_times_for_period = []
-            if len(peaks) > 1:
-                for i in range(len(peaks) - 1):
-                    period = time_data[peaks[i + 1]] - time_data[peaks[i]]
-                    peak_periods.append(period)
-                    # Use the middle time point between the two peaks
-                    peak_times_for_period.append((time_data[peaks[i]] + time_data[peaks[i + 1]]) / 2)
-
-            # Calculate amplitude changes over time
-            amplitude_values = []
-            amplitude_times = []
-            if len(all_extrema) > 1:
-                for i in range(len(all_extrema) - 1):
-                    idx1 = int(all_extrema[i])
-                    idx2 = int(all_extrema[i + 1])
-                    amplitude = abs(angle_smooth[idx1] - angle_smooth[idx2])
-                    amplitude_values.append(amplitude)
-                    # Use the middle time point between the two extrema
-                    amplitude_times.append((time_data[idx1] + time_data[idx2]) / 2)
-
-            # Create visualization with 4 plots (2x2 grid)
+            self.metric_vars = {}
+            for row, column, key, label in METRIC_LABELS:
+                ttk.Label(results_frame, text=label.format(unit=unit_label)).grid(
+                    row=row, column=column, sticky='w', padx=5, pady=5)
+                self.metric_vars[key] = tk.StringVar(value="-")
+                ttk.Label(results_frame, textvariable=self.metric_vars[key], font=('Arial', 10, 'bold')).grid(
+                    row=row, column=column + 1, sticky='w', padx=5, pady=5)
+
+            # Create visualization with 4 plots (2x2 grid); the artists are created empty and
+            # filled by show_metrics
             fig = plt.Figure(figsize=(12, 10))
+            artists = {}
 
             # Top left: Raw and filtered data
             ax1 = fig.add_subplot(221)
             ax1.plot(time_data, angle_data, 'k-', alpha=0.3, label='Raw Data')
-            ax1.plot(time_data, angle_smooth, 'b-', label='Filtered Data')
+            artists['smooth'], = ax1.plot(time_data, metrics['angle_smooth'], 'b-', label='Filtered Data')
             ax1.set_title(f"Angle Data ({unit_label})")
             ax1.set_xlabel("Time (s)")
             ax1.set_ylabel(f"Angle ({unit_label})")
             ax1.legend()
             ax1.grid(True)
 
-            # Top right: Movement detection
+            # Top right: Movement detection, with lines connecting the extrema
             ax2 = fig.add_subplot(222)
-            ax2.plot(time_data, angle_smooth, 'b-', label='Filtered Data')
-            if len(peaks) > 0:
-                ax2.plot(time_data[peaks], angle_smooth[peaks], 'ro', label='Peaks')
-            if len(troughs) > 0:
-                ax2.plot(time_data[troughs], angle_smooth[troughs], 'go', label='Troughs')
-
-            # Add lines connecting the extrema
-            for i in range(len(all_extrema) - 1):
-                idx1 = int(all_extrema[i])
-                idx2 = int(all_extrema[i + 1])
-                ax2.plot([time_data[idx1], time_data[idx2]],
-                         [angle_smooth[idx1], angle_smooth[idx2]], 'r--', alpha=0.5)
-
+            artists['detection_smooth'], = ax2.plot(time_data, metrics['angle_smooth'], 'b-', label='Filtered Data')
+            artists['peaks'], = ax2.plot([], [], 'ro', label='Peaks')
+            artists['troughs'], = ax2.plot([], [], 'go', label='Troughs')
+            artists['extrema'], = ax2.plot([], [], 'r--', alpha=0.5)
             ax2.set_title("Movement Detection")
             ax2.set_xlabel("Time (s)")
             ax2.set_ylabel(f"Angle ({unit_label})")
@@ -280,70 +403,130 @@ class MovementAnalyzer:
 
             # Bottom left: Period between peaks over time
             ax3 = fig.add_subplot(223)
-            if peak_periods:
-                ax3.plot(peak_times_for_period, peak_periods, 'ro-', linewidth=2, markersize=6)
-                ax3.set_title("Period Between Peaks Over Time")
-                ax3.set_xlabel("Time (s)")
-                ax3.set_ylabel("Period (s)")
-                ax3.grid(True)
-
-                # Add average period line
-                avg_period = np.mean(peak_periods)
-                ax3.axhline(y=avg_period, color='g', linestyle='--', alpha=0.7,
-                            label=f'Avg: {avg_period:.3f}s')
-                ax3.legend()
-            else:
-                ax3.text(0.5, 0.5, 'Not enough peaks for period analysis',
-                         transform=ax3.transAxes, ha='center', va='center', fontsize=12)
-                ax3.set_title("Period Between Peaks Over Time")
+            artists['periods'] = self.create_series_artists(
+                ax3, 'ro-', "Period Between Peaks Over Time", "Period (s)", 'Not enough peaks for period analysis')
 
             # Bottom right: Amplitude changes over time
             ax4 = fig.add_subplot(224)
-            if amplitude_values:
-                ax4.plot(amplitude_times, amplitude_values, 'mo-', linewidth=2, markersize=6)
-                ax4.set_title("Amplitude Changes Over Time")
-                ax4.set_xlabel("Time (s)")
-                ax4.set_ylabel(f"Amplitude ({unit_label})")
-                ax4.grid(True)
-
-                # Add average amplitude line
-                avg_amplitude = np.mean(amplitude_values)
-                ax4.axhline(y=avg_amplitude, color='g', linestyle='--', alpha=0.7,
-                            label=f'Avg: {avg_amplitude:.2f}{unit_label}')
-                ax4.legend()
-            else:
-                ax4.text(0.5, 0.5, 'Not enough data for amplitude analysis',
-                         transform=ax4.transAxes, ha='center', va='center', fontsize=12)
-                ax4.set_title("Amplitude Changes Over Time")
-
+            artists['amplitudes'] = self.create_series_artists(
+                ax4, 'mo-', "Amplitude Changes Over Time", f"Amplitude ({unit_label})",
+                'Not enough data for amplitude analysis')
+
+            self.artists = artists
+            self.axes = (ax1, ax2, ax3, ax4)
+            self.shown_smooth = metrics['angle_smooth']
+            self.update_artists(metrics)
             fig.tight_layout()
 
             # Add to parent frame
             figure_frame = ttk.Frame(parent_frame)
             figure_frame.pack(fill='both', expand=True, padx=10, pady=10)
 
-            canvas = FigureCanvasTkAgg(fig, master=figure_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill='both', expand=True)
-
-            # Log the analysis
-            self.app.log(f"Movement analysis updated: {movement_count} movements, "
-                         f"{avg_range:.2f} {unit_label} average range, {movement_frequency:.2f} Hz")
-
-            # Log period and amplitude statistics
-            if peak_periods:
-                avg_period = np.mean(peak_periods)
-                std_period = np.std(peak_periods)
-                self.app.log(f"Period analysis: Average={avg_period:.3f}s, Std={std_period:.3f}s")
+            self.canvas = FigureCanvasTkAgg(fig, master=figure_frame)
+            self.canvas.draw()
+            self.canvas.get_tk_widget().pack(fill='both', expand=True)
 
-            if amplitude_values:
-                avg_amplitude = np.mean(amplitude_values)
-                std_amplitude = np.std(amplitude_values)
-                self.app.log(
-                    f"Amplitude analysis: Average={avg_amplitude:.2f}{unit_label}, Std={std_amplitude:.2f}{unit_label}")
+            self.log_movement_metrics(metrics)
 
         except Exception as e:
             self.app.log(f"Movement analysis update error: {str(e)}")
             import traceback
             self.app.log(f"Traceback: {traceback.format_exc()}")
-            messagebox.showerror("Error", f"Movement analysis update failed: {str(e)}")
\ No newline at end of file
+            messagebox.showerror("Error", f"Movement analysis update failed: {str(e)}")
+
+    def create_series_artists(self, ax, style, title, ylabel, empty_message):
+        """Empty line, average line and 'not enough data' message of a per-movement series plot"""
+        line, = ax.plot([], [], style, linewidth=2, markersize=6)
+        average = ax.axhline(y=0, color='g', linestyle='--', alpha=0.7)
+        empty = ax.text(0.5, 0.5, empty_message, transform=ax.transAxes, ha='center', va='center', fontsize=12)
+        ax.set_title(title)
+        ax.set_xlabel("Time (s)")
+        ax.set_ylabel(ylabel)
+        return ax, line, average, empty
+
+    def show_metrics(self, live_update, metrics):
+        """Show the metrics of a background recompute (Tk thread)"""
+        if live_update is not self.live_update or not self.canvas.get_tk_widget().winfo_exists():
+            return  # Analysis was closed or replaced meanwhile
+        self.update_artists(metrics)
+        self.canvas.draw_idle()
+        self.log_movement_metrics(metrics)
+
+    def update_artists(self, metrics):
+        """Put one detection's values into the metric labels and plots, touching only what changed"""
+        unit_label = self.unit_label
+        extrema = metrics['extrema']
+        values = {
+            'movement_count': f"{metrics['movement_count']}",
+            'avg_range': f"{metrics['avg_range']:.2f} {unit_label}",
+            'movement_frequency': f"{metrics['movement_frequency']:.2f} Hz",
+            'data_range': f"{metrics['data_range']:.2f}",
+            'peaks': f"{len(extrema['peaks'])}",
+            'troughs': f"{len(extrema['troughs'])}",
+            'peak_velocity': f"{metrics['peak_velocity']:.1f} {unit_label}/s",
+            'mean_speed': f"{metrics['mean_speed']:.1f} {unit_label}/s",
+        }
+        for key, value in values.items():
+            self.metric_vars[key].set(value)
+
+        # The smoothed traces only change with the smoothing window (the pipeline returns the same array otherwise)
+        angle_smooth = metrics['angle_smooth']
+        if angle_smooth is not self.shown_smooth:
+            self.artists['smooth'].set_ydata(angle_smooth)
+            self.artists['detection_smooth'].set_ydata(angle_smooth)
+            self.shown_smooth = angle_smooth
+            for ax in self.axes[:2]:
+                ax.relim()
+                ax.autoscale_view()
+
+        time_data = self.time_data
+        self.artists['peaks'].set_data(time_data[extrema['peaks']], angle_smooth[extrema['peaks']])
+        self.artists['troughs'].set_data(time_data[extrema['troughs']], angle_smooth[extrema['troughs']])
+        self.artists['extrema'].set_data(extrema['times'], extrema['values'])
+
+        # Period between consecutive peaks and amplitude of each movement, placed at the middle
+        # time point between the extrema
+        self.update_series(self.artists['periods'], extrema['period_times'], extrema['peak_periods'], "{:.3f}s")
+        self.update_series(self.artists['amplitudes'], extrema['range_times'], extrema['ranges'],
+                           "{:.2f}" + unit_label)
+
+    def update_series(self, artists, times, values, average_format):
+        """Show a series with its average line, or the 'not enough data' message if it is empty"""
+        ax, line, average, empty = artists
+        has_values = len(values) > 0
+        line.set_data(times, values)
+        for artist in (line, average):
+            artist.set_visible(has_values)
+        empty.set_visible(not has_values)
+        ax.grid(has_values)
+
+        if has_values:
+            average_value = np.mean(values)
+            average.set_ydata([average_value, average_value])
+            average.set_label(f"Avg: {average_format.format(average_value)}")
+            ax.legend(handles=[average])
+            ax.relim(visible_only=True)
+            ax.autoscale_view()
+        elif ax.get_legend() is not None:
+            ax.get_legend().remove()
+
+    def log_movement_metrics(self, metrics):
+        """Log the analysis, with period and amplitude statistics"""
+        unit_label = self.unit_label
+        extrema = metrics['extrema']
+        self.app.log(f"Movement analysis updated: {metrics['movement_count']} movements, "
+                     f"{metrics['avg_range']:.2f} {unit_label} average range, "
+                     f"{metrics['movement_frequency']:.2f} Hz")
+
+        peak_periods = extrema['peak_periods']
+        if len(peak_periods) > 0:
+            avg_period = np.mean(peak_periods)
+            std_period = np.std(peak_periods)
+            self.app.log(f"Period analysis: Average={avg_period:.3f}s, Std={std_period:.3f}s")
+
+        amplitude_values = extrema['ranges']
+        if len(amplitude_values) > 0:
+            avg_amplitude = np.mean(amplitude_values)
+            std_amplitude = np.std(amplitude_values)
+            self.app.log(
+                f"Amplitude analysis: Average={avg_amplitude:.2f}{unit_label}, Std={std_amplitude:.2f}{unit_label}")
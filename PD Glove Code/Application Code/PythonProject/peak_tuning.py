@@ -0,0 +1,163 @@
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.signal import find_peaks, peak_prominences
+
+from extrema import merge_extrema
+from movement_analysis import smooth_angle
+from resampling import sample_rate_of, seconds_to_samples
+from shared_recording import SharedRecording, attached, prepare_workers
+
+# Search grids; windows and distances in seconds (converted with the recording's rate),
+# prominence and height as fractions of the smoothed signal's range
+SMOOTH_WINDOWS = (0.07, 0.11, 0.15, 0.21, 0.31, 0.41)
+PEAK_DISTANCES = (0.1, 0.15, 0.2, 0.3, 0.4, 0.6)
+PROMINENCE_FRACTIONS = (0.02, 0.05, 0.1, 0.15, 0.2, 0.3)
+HEIGHT_FRACTIONS = (0.0, 0.05, 0.1)
+
+# Fewest inter-tap periods a parameter set must produce to be considered
+MIN_PERIODS = 3
+
+# Movements smaller than this fraction of the median movement count as spurious detections
+SPURIOUS_RANGE_FRACTION = 0.3
+
+# Grid points times samples below which the search runs in this process: a search of
+# 20 million takes about 0.2 s on one core; below that, handing the windows to workers (sharing
+# the signal, collecting the results) costs about as much as it saves
+PARALLEL_MIN_WORK = 20_000_000
+
+
+def stability_score(extrema, duration):
+    """
+    Score how plausible a detection is as regular tapping (lower is better, None if unusable)
+
+    Sums the variation of the inter-tap period, the variation of the movement
+    ranges, the share of tiny movements between extrema (noise detected as taps)
+    and the share of the recording not covered by detected taps.
+    """
+    periods = extrema['peak_periods']
+    ranges = extrema['ranges']
+    if len(periods) < MIN_PERIODS or duration <= 0:
+        return None
+
+    period_cv = np.std(periods) / np.mean(periods)
+    range_cv = np.std(ranges) / np.mean(ranges) if np.mean(ranges) > 0 else 1.0
+    spurious = np.count_nonzero(ranges < SPURIOUS_RANGE_FRACTION * np.median(ranges)) / len(ranges)
+    times = extrema['times']
+    coverage = (times[-1] - times[0]) / duration
+    return float(period_cv + 0.5 * range_cv + spurious + (1.0 - coverage))
+
+
+def score_window(time_data, angle_data, smooth_seconds):
+    """
+    Evaluate every distance/prominence/height combination for one smoothing window
+
+    The signal is smoothed once and shared by all combinations, and peaks are
+    detected once per distance and height. Returns a list of (score,
+    smooth_seconds, height, distance_seconds, prominence, movement_count, period_cv).
+    """
+    fs = sample_rate_of(time_data)
+    angle_smooth = smooth_angle(angle_data, seconds_to_samples(smooth_seconds, fs))
+    data_range = np.ptp(angle_smooth)
+    duration = time_data[-1] - time_data[0]
+
+    results = []
+    for distance, height_fraction in itertools.product(PEAK_DISTANCES, HEIGHT_FRACTIONS):
+        height = height_fraction * data_range
+        peaks, _ = find_peaks(angle_smooth, height=height, distance=seconds_to_samples(distance, fs))
+        troughs, _ = find_peaks(-angle_smooth, height=height, distance=seconds_to_samples(distance, fs))
+
+        # A peak's prominence does not depend on the other peaks, so it is computed once and
+        # every prominence threshold becomes a mask (same result as find_peaks(prominence=...))
+        peak_prominence = peak_prominences(angle_smooth, peaks)[0]
+        trough_prominence = peak_prominences(-angle_smooth, troughs)[0]
+
+        # Thresholds are increasing, so equal counts mean the same extrema as the previous threshold
+        kept_counts = None
+        for prominence_fraction in PROMINENCE_FRACTIONS:
+            prominence = prominence_fraction * data_range
+            kept_peaks = peaks[peak_prominence >= prominence]
+            kept_troughs = troughs[trough_prominence >= prominence]
+            if (len(kept_peaks), len(kept_troughs)) != kept_counts:
+                kept_counts = (len(kept_peaks), len(kept_troughs))
+                extrema = merge_extrema(angle_smooth, time_data, kept_peaks, kept_troughs)
+                score = stability_score(extrema, duration)
+            if score is None:
+                continue
+            periods = extrema['peak_periods']
+            results.append((score, smooth_seconds, float(height), distance, float(prominence),
+                            len(extrema['indices']) - 1, float(np.std(periods) / np.mean(periods))))
+    return results
+
+
+def score_shared_window(handle, smooth_seconds):
+    """score_window for a worker process, on a shared (samples, 2) block of time and angle"""
+    with attached(handle) as signal:
+        return score_window(signal[:, 0], signal[:, 1], smooth_seconds)
+
+
+def search_work(windows, samples):
+    """Grid points times samples of a search over `windows` smoothing windows"""
+    return windows * len(PEAK_DISTANCES) * len(PROMINENCE_FRACTIONS) * len(HEIGHT_FRACTIONS) * samples
+
+
+def tune_peak_parameters(time_data, angle_data, executor=None):
+    """
+    Search the detection parameters that give the most stable tapping pattern
+
+    Each smoothing window is one task; with an executor (and a large enough
+    grid) the windows are scored in parallel worker processes, which all read
+    the signal from one shared memory block.
+
+    Returns a dict with smooth_seconds, peak_height, peak_distance_seconds, peak_prominence,
+    score, movement_count, period_cv and the number of combinations evaluated, or
+    None if no combination found enough regular taps.
+    """
+    time_data = np.asarray(time_data, dtype=float)
+    angle_data = np.asarray(angle_data, dtype=float)
+    fs = sample_rate_of(time_data)
+    windows = [window for window in SMOOTH_WINDOWS if seconds_to_samples(window, fs) < len(angle_data) - 3]
+
+    if executor is not None and search_work(len(windows), len(angle_data)) >= PARALLEL_MIN_WORK:
+        shared = SharedRecording.from_array(np.column_stack([time_data, angle_data]))
+        try:
+            futures = [executor.submit(score_shared_window, shared.handle, window) for window in windows]
+            results = [result for future in futures for result in future.result()]
+        finally:
+            shared.close()
+    else:
+        results = [result for window in windows for result in score_window(time_data, angle_data, window)]
+
+    if not results:
+        return None
+    score, smooth_seconds, height, distance, prominence, movement_count, period_cv = min(results)
+    return {
+        'smooth_seconds': smooth_seconds,
+        'peak_height': height,
+        'peak_distance_seconds': distance,
+        'peak_prominence': prominence,
+        'score': score,
+        'movement_count': movement_count,
+        'period_cv': period_cv,
+        'evaluated': len(results),
+    }
+
+
+def create_tuning_pool(max_workers=None):
+    """
+    Worker pool for tune_peak_parameters, kept for the lifetime of the analyzer
+
+    The workers are started right away, so only the first search waits for
+    them. Returns None on a single core, where workers cannot beat searching
+    in this process.
+    """
+    max_workers = max_workers or min(len(SMOOTH_WINDOWS), os.cpu_count() or 1)
+    if max_workers < 2:
+        return None
+    prepare_workers()
+    pool = ProcessPoolExecutor(max_workers=max_workers)
+    for worker in range(max_workers):
+        pool.submit(int)
+    return pool
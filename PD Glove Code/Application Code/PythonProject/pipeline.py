@@ -0,0 +1,133 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+# Threads shared by every pipeline; NumPy/SciPy stages release the GIL for most of their work
+_executor = None
+
+
+def stage_executor():
+    """Thread pool that runs independent pipeline stages concurrently, created on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1),
+                                       thread_name_prefix='pipeline')
+    return _executor
+
+
+def same_value(a, b):
+    """True if an input did not change (arrays are compared by identity, everything else by value)"""
+    if a is b:
+        return True
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return False
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+class Pipeline:
+    """
+    Analysis stages as a graph of memoized nodes
+
+    Inputs (signals, sampling rate, parameters) are set with `set()`; nodes
+    are functions of inputs and other nodes. A node's result is kept until
+    something upstream of it changes, so `get()` after changing one
+    parameter only recomputes the nodes that depend on it. Nodes whose
+    inputs are ready run concurrently on the executor (in order on the
+    calling thread without one). Node functions must not modify their
+    arguments.
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self.inputs = set()
+        self.nodes = {}
+        self.values = {}
+        self.downstream = {}
+        self.runs = {}
+
+    def input(self, *names):
+        """Declare inputs"""
+        for name in names:
+            self.inputs.add(name)
+            self.downstream.setdefault(name, set())
+        return self
+
+    def node(self, name, func, *inputs):
+        """Declare node `name` computed as func(*values of inputs)"""
+        for dependency in inputs:
+            if dependency not in self.inputs and dependency not in self.nodes:
+                raise KeyError(f"unknown pipeline input or node '{dependency}'")
+            self.downstream[dependency].add(name)
+        self.nodes[name] = (func, inputs)
+        self.downstream.setdefault(name, set())
+        self.runs[name] = 0
+        return self
+
+    def set(self, **values):
+        """Set inputs; results downstream of every changed input are discarded"""
+        for name, value in values.items():
+            if name not in self.inputs:
+                raise KeyError(f"unknown pipeline input '{name}'")
+            if name in self.values and same_value(self.values[name], value):
+                continue
+            self.values[name] = value
+            self.invalidate(name)
+
+    def invalidate(self, name):
+        """Discard the results of every node downstream of `name`"""
+        pending = list(self.downstream[name])
+        while pending:
+            node = pending.pop()
+            if node in self.values:
+                del self.values[node]
+                pending.extend(self.downstream[node])
+
+    def get(self, *names):
+        """Value of one node or input (a tuple for several), computing what is missing"""
+        self.compute(names)
+        if len(names) == 1:
+            return self.values[names[0]]
+        return tuple(self.values[name] for name in names)
+
+    def compute(self, names):
+        """Compute the missing nodes needed for `names`, independent ones concurrently"""
+        missing = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name in self.values or name in missing:
+                continue
+            if name in self.inputs:
+                raise KeyError(f"pipeline input '{name}' has not been set")
+            missing.add(name)
+            pending.extend(self.nodes[name][1])
+
+        running = {}
+        while missing or running:
+            ready = [name for name in missing if all(dependency in self.values for dependency in self.nodes[name][1])]
+            for name in ready:
+                missing.discard(name)
+                func, inputs = self.nodes[name]
+                arguments = [self.values[dependency] for dependency in inputs]
+                self.runs[name] += 1
+                if self.executor is None:
+                    self.values[name] = func(*arguments)
+                else:
+                    running[self.executor.submit(func, *arguments)] = name
+
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.values[running.pop(future)] = future.result()
+            elif missing and not ready:
+                raise ValueError("pipeline has a cycle through " + ", ".join(sorted(missing)))
+
+    def results(self, *names):
+        """Dict of the values of `names` (every node if none are given), computing what is missing"""
+        names = names or tuple(self.nodes)
+        self.compute(names)
+        return {name: self.values[name] for name in names}
@@ -0,0 +1,170 @@
+import os
+import re
+import json
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from session_recorder import SESSION_DIR, SessionRecording, save_session
+from data_quality import screen_recording, format_quality_report
+from session_analysis import summary_metrics
+from session_index import write_thumbnail
+from report_generator import REPORT_DIR, render_report, _init_worker, _html_report
+
+# One record per protocol run (visit), next to the sessions
+VISIT_DIR = os.path.join(SESSION_DIR, 'visits')
+
+# Standard visit, as typed in the protocol field
+DEFAULT_PROTOCOL = "Tremor, Bradykinesia, Stiffness"
+
+# Seconds the patient rests between two tests
+DEFAULT_REST_SECONDS = 5
+
+TEST_TYPES = ("Tremor", "Bradykinesia", "Stiffness")
+
+
+def parse_protocol(text, repeats=1):
+    """
+    Expand a protocol such as "Tremor x2, Bradykinesia, Stiffness" into the list of tests
+
+    "x<n>" repeats one test; `repeats` repeats the whole sequence.
+    """
+    tests = []
+    for item in text.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        match = re.fullmatch(r'(\w+)(?:\s*[x*]\s*(\d+))?', item, flags=re.IGNORECASE)
+        name = match.group(1).capitalize() if match else item
+        if name not in TEST_TYPES:
+            raise ValueError(f"unknown test '{item}' (expected {', '.join(TEST_TYPES)})")
+        tests += [name] * int(match.group(2) or 1)
+    if not tests:
+        raise ValueError("the protocol contains no tests")
+    return tests * max(1, int(repeats))
+
+
+def process_test(session_path, fmt='html', report_dir=REPORT_DIR):
+    """
+    Worker process: analyze one protocol test, render its report and store its key metrics
+    and thumbnail for the session index; returns (report path, key metrics)
+    """
+    path, results = render_report(session_path, fmt, report_dir, return_results=True)
+    metrics = summary_metrics(results)
+    SessionRecording(session_path).update_metadata(metrics=metrics)
+    write_thumbnail(session_path)
+    return path, metrics
+
+
+def create_protocol_pool(max_workers=1):
+    """Worker processes analysing the finished tests of a protocol"""
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker)
+
+
+class ProtocolRunner:
+    """
+    Run a sequence of tests on one device connection
+
+    Each test is acquired, screened and saved as a session of its own. Its
+    analysis and report are then handed to a worker process while the next
+    test is acquired, so a visit takes about as long as its acquisitions and
+    rests. The visit record combines every test's session, quality problems,
+    key metrics and report.
+    """
+
+    def __init__(self, app, collector):
+        self.app = app
+        self.collector = collector
+
+    async def run(self, session, tests, rest_seconds, timeout, executor, metadata=None):
+        """
+        Acquire `tests` one after the other and return the visit record
+
+        Aborting (cancelling the task) stops the device; tests finished before
+        are still analyzed and recorded. `metadata` is stored with every session.
+        The record is also handed to app.protocol_complete on the Tk thread.
+        """
+        ui = self.collector.ui
+        started = time.strftime("%Y-%m-%d %H:%M:%S")
+        visit = {'started': started, 'tests': [], 'status': 'complete'}
+        pending = []
+
+        try:
+            for number, measure_type in enumerate(tests, 1):
+                if number > 1 and rest_seconds > 0:
+                    for remaining in range(int(rest_seconds), 0, -1):
+                        ui(lambda r=remaining, n=number: self.app.status_var.set(
+                            f"Protocol: rest, test {n}/{len(tests)} starts in {r} s"))
+                        await asyncio.sleep(1.0)
+
+                ui(lambda n=number, m=measure_type: self.app.status_var.set(
+                    f"Protocol: test {n}/{len(tests)} - {m}, waiting for device..."))
+                self.app.log(f"Protocol test {number}/{len(tests)}: {measure_type}")
+                rows = []
+                async with session.exclusive():
+                    try:
+                        await self.collector.measure(session, measure_type, timeout, rows)
+                    except asyncio.CancelledError:
+                        await self.collector.stop_device(session)
+                        raise
+
+                test = {'number': number, 'measure_type': measure_type, 'samples': len(rows)}
+                visit['tests'].append(test)
+                if not rows:
+                    test['error'] = "no data received"
+                    continue
+
+                # Screen and save here (fast); analysis and report go to the worker
+                quality_report = screen_recording(rows, session.sample_rate)
+                self.app.log(format_quality_report(quality_report))
+                recording = save_session(rows, measure_type)
+                recording.update_metadata(quality_report=quality_report, device_sample_rate=session.sample_rate,
+                                          protocol_test=number, protocol_started=started, **(metadata or {}))
+                test.update({'session': recording.path, 'started': recording.metadata.get('started', ''),
+                             'quality_issues': quality_report['issues']})
+                future = asyncio.wrap_future(executor.submit(process_test, recording.path))
+                pending.append((test, future))
+
+        except asyncio.CancelledError:
+            visit['status'] = 'aborted'
+        except Exception as e:
+            visit['status'] = f"failed: {e}"
+            self.app.log(f"Protocol error: {e}")
+
+        # Usually only the last test is still being analyzed
+        ui(lambda: self.app.status_var.set("Protocol: finishing analyses..."))
+        for test, future in pending:
+            try:
+                test['report'], test['metrics'] = await future
+            except Exception as e:
+                test['error'] = f"analysis failed: {e}"
+
+        visit['finished'] = time.strftime("%Y-%m-%d %H:%M:%S")
+        visit['path'], visit['report'] = save_visit(visit)
+        ui(lambda: self.app.protocol_complete(visit))
+        return visit
+
+
+def save_visit(visit, visit_dir=VISIT_DIR, report_dir=REPORT_DIR):
+    """Write the visit record and its HTML summary; returns both paths"""
+    os.makedirs(visit_dir, exist_ok=True)
+    os.makedirs(report_dir, exist_ok=True)
+    name = "visit_" + visit['started'].replace('-', '').replace(':', '').replace(' ', '_')
+    path = os.path.join(visit_dir, name + '.json')
+    report = os.path.join(report_dir, name + '.html')
+    with open(path, 'w') as f:
+        json.dump(visit, f, indent=2)
+
+    tables = []
+    for test in visit['tests']:
+        rows = [("Samples", str(test['samples']))]
+        if 'error' in test:
+            rows.append(("Error", test['error']))
+        rows += [("Quality", issue) for issue in test.get('quality_issues', [])]
+        rows += [(label, f"{value:.3f}") for label, value in test.get('metrics', {}).items()]
+        if 'report' in test:
+            rows.append(("Report", os.path.basename(test['report'])))
+        tables.append((f"Test {test['number']}: {test['measure_type']}", rows))
+    with open(report, 'w', encoding='utf-8') as f:
+        f.write(_html_report(f"Visit {visit['started']} ({visit['status']})", visit['started'], tables, []))
+    return path, report
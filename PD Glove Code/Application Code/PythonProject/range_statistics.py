@@ -0,0 +1,187 @@
+import numpy as np
+from scipy import signal
+
+from data_quality import CHANNELS
+from resampling import filter_padding
+from session_recorder import N_COLUMNS
+
+# Band whose power is reported for a selected range (the analyzers' default band-pass)
+POWER_BAND = (1.0, 20.0)
+
+# Samples per block of the min/max sparse table; the partial blocks at the ends of a
+# range (fewer than two blocks) are scanned directly
+BLOCK = 16
+
+# Shortest recording that is band-pass filtered
+MIN_FILTER_SAMPLES = 10
+
+# Band-passed copies of the recording kept for other bands than the statistics' own (each
+# is a full-length copy of the value columns, so only the latest bands of a slider drag)
+MAX_CACHED_BANDS = 2
+
+
+def band_pass(channels, fs, band=POWER_BAND):
+    """Zero-phase 4th order band-pass of (channels, samples), kept below Nyquist"""
+    low, high = band
+    high = min(high, 0.95 * 0.5 * fs)
+    sos = signal.butter(4, [low, high], btype='band', fs=fs, output='sos')
+    return signal.sosfiltfilt(sos, channels, axis=-1, padlen=filter_padding(fs, channels.shape[-1]))
+
+
+def prefix_sums(values):
+    """Cumulative sums along the last axis with a leading zero, so sum(values[i:j]) = s[j] - s[i]"""
+    sums = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,))
+    np.cumsum(values, axis=-1, out=sums[..., 1:])
+    return sums
+
+
+def sparse_table(values, reduce):
+    """
+    Levels of a sparse table along the last axis: level k holds reduce over 2**k consecutive values
+
+    Any range is covered by two (overlapping) entries of one level, so its
+    minimum or maximum is found in O(1).
+    """
+    levels = [values]
+    width = 1
+    while 2 * width <= values.shape[-1]:
+        previous = levels[-1]
+        levels.append(reduce(previous[..., :-width], previous[..., width:]))
+        width *= 2
+    return levels
+
+
+def table_query(levels, start, stop, reduce):
+    """reduce over entries start..stop-1 (stop > start) of a sparse table"""
+    level = (stop - start).bit_length() - 1
+    return reduce(levels[level][..., start], levels[level][..., stop - (1 << level)])
+
+
+class RecordingStatistics:
+    """
+    Statistics of any time range of a recording in constant time
+
+    Built once per (trimmed, resampled) recording: prefix sums of every channel
+    and its square give the mean, RMS and standard deviation of a range,
+    prefix sums of the squared band-passed channels give its band power, and
+    sparse tables over blocks of BLOCK samples give its minimum and maximum.
+    Channels are centred on their mean first so the sums of squares keep
+    their precision. The band-passed channels are kept for the analyzers, so
+    analysing a selected range reuses them instead of filtering again.
+    """
+
+    def __init__(self, data, fs, band=POWER_BAND):
+        self.data = data
+        self.fs = fs
+        self.band = band
+        self.time = data[:, 1] / 1000.0
+        mode = int(data[0, 2]) if len(data) > 0 else 0
+        self.channels = [(name, column) for name, column, kind in CHANNELS.get(mode, [])] or \
+            [(f"Sensor {column - 2}", column) for column in range(3, N_COLUMNS)]
+
+        values = np.asarray(data[:, [column for name, column in self.channels]], dtype=np.float64).T
+        self.values = values
+        self.offset = np.mean(values, axis=-1, keepdims=True)
+        centred = values - self.offset
+        self.sums = prefix_sums(centred)
+        self.square_sums = prefix_sums(centred ** 2)
+
+        # Band-passed value columns (all of them, in column order) for the analyzers
+        self._band_passed = {}
+        self.power_sums = None
+        if len(data) >= MIN_FILTER_SAMPLES:
+            filtered = self.band_passed(band)[[column - 3 for name, column in self.channels]]
+            self.power_sums = prefix_sums(filtered ** 2)
+
+        # Minimum and maximum of every block, then sparse tables over the blocks
+        blocks = len(data) // BLOCK
+        block_values = values[:, :blocks * BLOCK].reshape(len(self.channels), blocks, BLOCK)
+        self.min_table = sparse_table(block_values.min(axis=-1), np.minimum)
+        self.max_table = sparse_table(block_values.max(axis=-1), np.maximum)
+
+    def __len__(self):
+        return len(self.data)
+
+    def band_passed(self, band):
+        """
+        Band-passed value columns 3..N_COLUMNS-1 of the whole recording, (columns, samples)
+
+        Cached for the statistics' band and the last MAX_CACHED_BANDS other bands.
+        """
+        band = tuple(band)
+        if band not in self._band_passed:
+            others = [key for key in self._band_passed if key != tuple(self.band)]
+            if len(others) >= MAX_CACHED_BANDS:
+                del self._band_passed[others[0]]
+            values = np.asarray(self.data[:, 3:], dtype=np.float64).T
+            centred = values - np.mean(values, axis=-1, keepdims=True)
+            self._band_passed[band] = band_pass(centred, self.fs, band)
+        return self._band_passed[band]
+
+    def window_of(self, data):
+        """(start, stop) rows if `data` is the recording or a row slice of it, else None"""
+        if data is self.data:
+            return 0, len(self.data)
+        if not isinstance(data, np.ndarray) or data.base is not self.data or data.strides != self.data.strides:
+            return None
+        start = (data.__array_interface__['data'][0] - self.data.__array_interface__['data'][0]) // self.data.strides[0]
+        return int(start), int(start + len(data))
+
+    def index_range(self, start_seconds, stop_seconds):
+        """Rows (start, stop) covering a time range in seconds"""
+        start = int(np.searchsorted(self.time, min(start_seconds, stop_seconds), side='left'))
+        stop = int(np.searchsorted(self.time, max(start_seconds, stop_seconds), side='right'))
+        return start, stop
+
+    def extremes(self, start, stop):
+        """(minimum, maximum) of every channel over rows start..stop-1"""
+        first_block = -(-start // BLOCK)
+        last_block = stop // BLOCK
+        if last_block - first_block < 2:
+            segment = self.values[:, start:stop]
+            return segment.min(axis=-1), segment.max(axis=-1)
+
+        # Whole blocks from the sparse tables, the partial blocks at both ends directly
+        low = table_query(self.min_table, first_block, last_block, np.minimum)
+        high = table_query(self.max_table, first_block, last_block, np.maximum)
+        for segment in (self.values[:, start:first_block * BLOCK], self.values[:, last_block * BLOCK:stop]):
+            if segment.shape[-1] > 0:
+                low = np.minimum(low, segment.min(axis=-1))
+                high = np.maximum(high, segment.max(axis=-1))
+        return low, high
+
+    def range_statistics(self, start, stop):
+        """
+        Statistics of every channel over rows start..stop-1
+
+        Returns a list of dicts (one per channel) with name, mean, rms, std,
+        min, max, ptp and band_power (mean square in `band`, None for
+        recordings too short to filter), or an empty list for an empty range.
+        """
+        start, stop = max(0, int(start)), min(len(self.data), int(stop))
+        if stop <= start:
+            return []
+        count = stop - start
+        centred_mean = (self.sums[:, stop] - self.sums[:, start]) / count
+        mean_square = (self.square_sums[:, stop] - self.square_sums[:, start]) / count
+        variance = np.maximum(mean_square - centred_mean ** 2, 0.0)
+        mean = self.offset[:, 0] + centred_mean
+        low, high = self.extremes(start, stop)
+        power = None
+        if self.power_sums is not None:
+            power = (self.power_sums[:, stop] - self.power_sums[:, start]) / count
+
+        return [{
+            'name': name,
+            'mean': float(mean[i]),
+            'rms': float(np.sqrt(variance[i] + mean[i] ** 2)),
+            'std': float(np.sqrt(variance[i])),
+            'min': float(low[i]),
+            'max': float(high[i]),
+            'ptp': float(high[i] - low[i]),
+            'band_power': float(power[i]) if power is not None else None,
+        } for i, (name, column) in enumerate(self.channels)]
+
+    def time_statistics(self, start_seconds, stop_seconds):
+        """range_statistics of a time range in seconds"""
+        return self.range_statistics(*self.index_range(start_seconds, stop_seconds))
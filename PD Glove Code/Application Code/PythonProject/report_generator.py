@@ -0,0 +1,517 @@
+import os
+import io
+import glob
+import base64
+import html
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+
+from session_recorder import SESSION_DIR
+from session_analysis import MODE_NAMES, load_session_data, analyze_session
+from calibration import session_profile
+
+# Reports are written next to the sessions they describe
+REPORT_DIR = os.path.join(SESSION_DIR, 'reports')
+
+SENSOR_COLORS = ['green', 'blue', 'purple', 'red', 'orange']
+
+
+class FigureTemplate:
+    """
+    A figure whose axes and line artists are created once and refilled for every session
+
+    Rendering many reports in one process then only updates the line data,
+    instead of building the figure, axes, ticks and legends from scratch.
+    """
+
+    def __init__(self, n_axes, layout, figsize):
+        self.fig = Figure(figsize=figsize)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.axes = [self.fig.add_subplot(*layout, i + 1) for i in range(n_axes)]
+        self.artists = {}
+
+    def line(self, ax_index, key, style='-', **kwargs):
+        """Return a named Line2D of an axis, creating it on first use"""
+        if (ax_index, key) not in self.artists:
+            self.artists[ax_index, key], = self.axes[ax_index].plot([], [], style, **kwargs)
+        return self.artists[ax_index, key]
+
+    def text(self, ax_index, key, **kwargs):
+        """Return a named text box of an axis (axes coordinates), creating it on first use"""
+        if (ax_index, key) not in self.artists:
+            self.artists[ax_index, key] = self.axes[ax_index].text(
+                0.02, 0.98, '', transform=self.axes[ax_index].transAxes, verticalalignment='top', fontsize=9,
+                bbox=dict(boxstyle='round', facecolor='white', alpha=0.9), **kwargs)
+        return self.artists[ax_index, key]
+
+    def begin(self):
+        """Hide every artist; the render function shows the ones this session uses"""
+        for artist in self.artists.values():
+            artist.set_visible(False)
+
+    def plot(self, ax_index, key, x, y, style='-', **kwargs):
+        """Show x, y on a named line, with this session's label and properties"""
+        line = self.line(ax_index, key, style, **kwargs)
+        # A reused line still has the label (e.g. measured values) of the session that created it
+        line.update(kwargs)
+        line.set_data(x, y)
+        line.set_visible(True)
+        return line
+
+    def write(self, ax_index, key, content):
+        text = self.text(ax_index, key)
+        text.set_text(content)
+        text.set_visible(True)
+        return text
+
+    def finish(self, legends=True):
+        """Rescale every axis to its visible lines and rebuild the legends"""
+        for ax_index, ax in enumerate(self.axes):
+            ax.relim(visible_only=True)
+            ax.autoscale_view()
+            if legends:
+                handles = [artist for (index, key), artist in self.artists.items()
+                           if index == ax_index and artist.get_visible() and hasattr(artist, 'get_xdata')
+                           and not artist.get_label().startswith('_')]
+                legend = ax.get_legend()
+                if handles:
+                    ax.legend(handles=handles, fontsize=8)
+                elif legend is not None:
+                    legend.remove()
+        self.fig.tight_layout()
+        return self.fig
+
+
+# Templates of the current process, keyed by figure name and layout
+_templates = {}
+
+
+def get_template(name, n_axes, layout, figsize, setup):
+    """Return the cached template for a figure, creating and labelling it with `setup` the first time"""
+    key = (name, n_axes)
+    if key not in _templates:
+        template = FigureTemplate(n_axes, layout, figsize)
+        setup(template)
+        _templates[key] = template
+    template = _templates[key]
+    template.begin()
+    return template
+
+
+def render_raw_figure(data):
+    """Raw sensor channels over time (same layout as the Raw Data tab)"""
+    mode = int(data[0, 2])
+    n_plots = 5 if mode == 3 else 3
+
+    if mode == 1:
+        titles = ["X Acceleration", "Y Acceleration", "Z Acceleration"]
+        y_labels = ["Acceleration (g)"] * 3
+    elif mode == 2:
+        titles = ["Contact State", "Angle 1 (roll1)", "Angle 2 (roll2)"]
+        y_labels = ["State (0/1)", "Angle (degrees)", "Angle (degrees)"]
+    elif mode == 3:
+        titles = ["Force Sensor 1", "Force Sensor 2", "Angle (roll2)", "Force Sensor 3", "Force Sensor 4"]
+        y_labels = ["Force (ADC)", "Force (ADC)", "Angle (degrees)", "Force (ADC)", "Force (ADC)"]
+    else:
+        titles = [f"Sensor {i + 1}" for i in range(n_plots)]
+        y_labels = ["Value"] * n_plots
+
+    def setup(template):
+        for i, ax in enumerate(template.axes):
+            ax.grid(True)
+        template.axes[-1].set_xlabel("Time (s)")
+
+    template = get_template('raw', n_plots, (n_plots, 1), (9, 2.4 * n_plots), setup)
+    time_data = data[:, 1] / 1000.0
+    for i, ax in enumerate(template.axes):
+        ax.set_title(titles[i])
+        ax.set_ylabel(y_labels[i])
+        template.plot(i, 'value', time_data, data[:, 3 + i], color=SENSOR_COLORS[i], linewidth=1)
+    return template.finish(legends=False)
+
+
+def render_spectra_figure(spectra):
+    """Filtered signals and FFT magnitude of every channel"""
+    names = spectra['names']
+
+    def setup(template):
+        template.axes[0].set_title("Filtered Signals (1-20 Hz)")
+        template.axes[0].set_xlabel("Time (s)")
+        template.axes[0].grid(True, alpha=0.3)
+        template.axes[1].set_title("Frequency Spectrum")
+        template.axes[1].set_xlabel("Frequency (Hz)")
+        template.axes[1].set_ylabel("Magnitude")
+        template.axes[1].grid(True, alpha=0.3)
+
+    template = get_template('spectra', 2, (1, 2), (14, 5), setup)
+    for i, name in enumerate(names):
+        color = SENSOR_COLORS[i % len(SENSOR_COLORS)]
+        template.plot(0, name, spectra['time'], spectra['filtered'][i], color=color, linewidth=1, label=name)
+        template.plot(1, name, spectra['freqs'], spectra['magnitude'][i], color=color, linewidth=1.5, label=name)
+    fig = template.finish()
+    template.axes[1].set_xlim(0, 20)
+    return fig
+
+
+def _plot_extrema(template, ax_index, key, time_data, signal, extrema, color):
+    """Peak (^) and trough (v) markers of a displacement trace, as in the comparison window"""
+    if extrema is None:
+        return
+    for kind, marker in (('peaks', '^'), ('troughs', 'v')):
+        indices = extrema[kind]
+        template.plot(ax_index, f'{key}_{kind}', time_data[indices], signal[indices], marker, color=color,
+                      linestyle='none', markersize=6, alpha=0.6, label=f'_{key}_{kind}')
+
+
+def render_tremor_figure(tremor):
+    """Tremor sensor comparison: spectra of both sensors and the aligned displacements"""
+    def setup(template):
+        titles = ["Raw Data - Analog Sensor (Pin 4)", "Accelerometer Y-axis - Raw vs Filtered",
+                  "Frequency Spectrums", "Displacement Comparison"]
+        y_labels = ["Analog Reading", "Acceleration (g)", "Magnitude", "Displacement (mm)"]
+        for ax, title, y_label in zip(template.axes, titles, y_labels):
+            ax.set_title(title)
+            ax.set_ylabel(y_label)
+            ax.set_xlabel("Time (s)")
+            ax.grid(True, alpha=0.3)
+        template.axes[2].set_xlabel("Frequency (Hz)")
+
+    template = get_template('tremor', 4, (2, 2), (14, 9), setup)
+    template.plot(0, 'analog', tremor['time'], tremor['analog'], 'b-', linewidth=1)
+    template.plot(1, 'raw', tremor['time'], tremor['accel'], 'r-', linewidth=1, alpha=0.5, label='Raw')
+    template.plot(1, 'filtered', tremor['time'], tremor['accel_filtered'], 'k-', linewidth=1.5,
+                  label='Bandpass Filtered (1-20 Hz)')
+
+    freq_analog = tremor['freq_analog']
+    freq_accel = tremor['freq_accel']
+    template.plot(2, 'analog', freq_analog['freqs'], freq_analog['magnitude'], 'b-', linewidth=1.5,
+                  label=f"Analog Sensor ({freq_analog['dominant_freq']:.2f} Hz)")
+    template.plot(2, 'accel', freq_accel['freqs'], freq_accel['magnitude'], 'r-', linewidth=1.5,
+                  label=f"Accelerometer ({freq_accel['dominant_freq']:.2f} Hz)")
+
+    if tremor['analog_displacement'] is not None:
+        time_final = tremor['displacement_time']
+        template.plot(3, 'analog', time_final, tremor['analog_displacement'], 'b-', linewidth=1.5,
+                      label='Analog Sensor')
+        _plot_extrema(template, 3, 'analog', time_final, tremor['analog_displacement'],
+                      tremor['analog_extrema'], 'blue')
+    if tremor['accel_displacement'] is not None:
+        accel_time = tremor['accel_displacement_time']
+        template.plot(3, 'accel', accel_time, tremor['accel_displacement'], 'r-', linewidth=1.5,
+                      label='Accelerometer (Double Integration)')
+        _plot_extrema(template, 3, 'accel', accel_time, tremor['accel_displacement'],
+                      tremor['accel_extrema'], 'red')
+    if tremor['correlation'] is not None:
+        template.write(3, 'stats', f"r = {tremor['correlation']:.3f}\n"
+                                   f"Δ = {tremor['avg_diff']:.2f}±{tremor['std_diff']:.2f} mm\n"
+                                   f"Lag: {tremor['lag_ms']:.1f} ms")
+
+    fig = template.finish()
+    template.axes[2].set_xlim(0, 20)
+    return fig
+
+
+def render_movement_figure(movement):
+    """Movement detection and the amplitude of every movement"""
+    def setup(template):
+        template.axes[0].set_title("Movement Detection")
+        template.axes[0].set_xlabel("Time (s)")
+        template.axes[0].grid(True)
+        template.axes[1].set_title("Amplitude Changes Over Time")
+        template.axes[1].set_xlabel("Time (s)")
+        template.axes[1].grid(True)
+
+    template = get_template('movement', 2, (1, 2), (14, 5), setup)
+    extrema = movement['extrema']
+    unit_label = movement['unit_label']
+    template.axes[0].set_ylabel(f"Angle ({unit_label})")
+    template.axes[1].set_ylabel(f"Amplitude ({unit_label})")
+
+    time_data = movement['time']
+    template.plot(0, 'filtered', time_data, movement['angle_smooth'], 'b-', label='Filtered Data')
+    template.plot(0, 'peaks', time_data[extrema['peaks']], movement['angle_smooth'][extrema['peaks']], 'ro',
+                  label='Peaks')
+    template.plot(0, 'troughs', time_data[extrema['troughs']], movement['angle_smooth'][extrema['troughs']], 'go',
+                  label='Troughs')
+    template.plot(1, 'ranges', extrema['range_times'], extrema['ranges'], 'mo-', linewidth=2, markersize=6,
+                  label='Range between extrema')
+    return template.finish()
+
+
+def render_bradykinesia_figure(bradykinesia):
+    """Analog and IMU angles over time and against each other"""
+    def setup(template):
+        template.axes[0].set_title('Angle Comparison Over Time')
+        template.axes[0].set_xlabel('Time (s)')
+        template.axes[0].set_ylabel('Angle (degrees)')
+        template.axes[0].grid(True, alpha=0.3)
+        template.axes[1].set_xlabel('Analog Sensor Angle (degrees)')
+        template.axes[1].set_ylabel('IMU Sensor Angle (degrees)')
+        template.axes[1].grid(True, alpha=0.3)
+
+    template = get_template('bradykinesia', 2, (1, 2), (14, 5), setup)
+    analog = bradykinesia['analog_angle']
+    imu = bradykinesia['imu_angle']
+    template.plot(0, 'analog', bradykinesia['time'], analog, 'b-', linewidth=2, alpha=0.8,
+                  label='Analog Sensor (Aligned)')
+    template.plot(0, 'imu', bradykinesia['time'], imu, 'r-', linewidth=2, alpha=0.8, label='IMU Sensor')
+
+    fit = np.poly1d(np.polyfit(analog, imu, 1))
+    fit_x = np.array([np.min(analog), np.max(analog)])
+    template.plot(1, 'points', analog, imu, 'o', color='blue', markersize=4, alpha=0.6, label='Data Points')
+    template.plot(1, 'fit', fit_x, fit(fit_x), 'r-', linewidth=2, alpha=0.8, label='Correlation Line')
+    template.axes[1].set_title(f"Sensor Correlation (r = {bradykinesia['correlation']:.3f})")
+    return template.finish()
+
+
+def render_force_figure(force):
+    """Force of both sensors over time"""
+    def setup(template):
+        template.axes[0].set_title("Individual Sensor Forces")
+        template.axes[0].set_xlabel("Time (s)")
+        template.axes[0].grid(True, alpha=0.3)
+
+    template = get_template('force', 1, (1, 1), (12, 5), setup)
+    unit_label = force['unit_label']
+    template.axes[0].set_ylabel(f"Force ({unit_label})")
+    template.plot(0, 'force1', force['time'], force['force1'], 'r-', linewidth=2,
+                  label=f"Sensor 1 (Max: {force['max_force1']:.2f}{unit_label})")
+    template.plot(0, 'force2', force['time'], force['force2'], 'b-', linewidth=2,
+                  label=f"Sensor 2 (Max: {force['max_force2']:.2f}{unit_label})")
+    return template.finish()
+
+
+def metric_tables(results):
+    """Return [(section title, [(label, formatted value), ...]), ...] for the analyses in `results`"""
+    tables = []
+
+    spectra = results.get('spectra')
+    if spectra is not None:
+        in_band = (spectra['freqs'] >= 1.0) & (spectra['freqs'] <= 20.0)
+        rows = []
+        if np.any(in_band):
+            dominant = spectra['freqs'][in_band][np.argmax(spectra['magnitude'][:, in_band], axis=-1)]
+            rows = [(f"{name} Dominant Frequency", f"{freq:.2f} Hz") for name, freq in zip(spectra['names'], dominant)]
+        rows.append(("Sampling Rate", f"{spectra['fs']:.1f} Hz"))
+        tables.append(("Frequency Analysis", rows))
+
+    tremor = results.get('tremor')
+    if tremor is not None:
+        rows = [
+            ("Analog Sensor Dominant Frequency", f"{tremor['freq_analog']['dominant_freq']:.2f} Hz"),
+            ("Accelerometer Dominant Frequency", f"{tremor['freq_accel']['dominant_freq']:.2f} Hz"),
+            ("Analog Sensor Tremor Amplitude", f"{tremor['analog_amplitude']:.2f} mm"),
+            ("Accelerometer Tremor Amplitude", f"{tremor['accel_amplitude']:.2f} mm"),
+            ("Tremor Classification", tremor['classification']),
+        ]
+        if tremor['correlation'] is not None:
+            rows += [
+                ("Displacement Correlation", f"{tremor['correlation']:.3f}"),
+                ("Average Difference", f"{tremor['avg_diff']:.3f} mm"),
+                ("RMS Difference", f"{tremor['rms_diff']:.3f} mm"),
+                ("Accelerometer Lag", f"{tremor['lag_ms']:.1f} ms"),
+            ]
+        for label, key in (("Analog Sensor Avg P-T Distance", 'analog_peak_to_trough'),
+                           ("Accelerometer Avg P-T Distance", 'accel_peak_to_trough')):
+            value = tremor[key]
+            rows.append((label, f"{value:.3f} mm" if value is not None else "N/A"))
+        tables.append(("Tremor Comparison", rows))
+
+    movement = results.get('movement')
+    if movement is not None:
+        unit_label = movement['unit_label']
+        tables.append(("Movement Metrics", [
+            ("Movement Count", f"{movement['movement_count']}"),
+            ("Average Range of Motion", f"{movement['avg_range']:.2f} {unit_label}"),
+            ("Movement Frequency", f"{movement['movement_frequency']:.2f} Hz"),
+            ("Peaks Found", f"{len(movement['extrema']['peaks'])}"),
+            ("Troughs Found", f"{len(movement['extrema']['troughs'])}"),
+            ("Peak Angular Velocity", f"{movement['peak_velocity']:.1f} {unit_label}/s"),
+            ("Mean Angular Speed", f"{movement['mean_speed']:.1f} {unit_label}/s"),
+        ]))
+
+    bradykinesia = results.get('bradykinesia')
+    if bradykinesia is not None:
+        tables.append(("Bradykinesia Sensor Comparison", [
+            ("Correlation Coefficient", f"{bradykinesia['correlation']:.3f}"),
+            ("P-value", f"{bradykinesia['p_value']:.4f}"),
+            ("Mean Angle Difference", f"{bradykinesia['mean_diff']:.2f}°"),
+            ("Std Dev of Difference", f"{bradykinesia['std_diff']:.2f}°"),
+            ("Analog Range of Motion", f"{bradykinesia['analog_range']:.2f}°"),
+            ("IMU Range of Motion", f"{bradykinesia['imu_range']:.2f}°"),
+            ("Analog Sensor Lag", f"{bradykinesia['lag_ms']:.1f} ms"),
+            ("Analog Peak Velocity", f"{bradykinesia['analog_peak_velocity']:.1f}°/s"),
+            ("IMU Peak Velocity", f"{bradykinesia['imu_peak_velocity']:.1f}°/s"),
+        ]))
+
+    force = results.get('force')
+    if force is not None:
+        unit_label = force['unit_label']
+        tables.append(("Force Metrics", [
+            ("Maximum Force (Sensor 1)", f"{force['max_force1']:.2f} {unit_label}"),
+            ("Maximum Force (Sensor 2)", f"{force['max_force2']:.2f} {unit_label}"),
+            ("Average Force (Sensor 1)", f"{force['avg_force1']:.2f} {unit_label}"),
+            ("Average Force (Sensor 2)", f"{force['avg_force2']:.2f} {unit_label}"),
+            ("Peak Combined Force", f"{force['peak_combined_force']:.2f} {unit_label}"),
+            ("Work Done", f"{force['work']:.3f} J"),
+            ("Max Force Rate (Sensor 1)", f"{force['max_force_rate1']:.2f} {unit_label}/s"),
+            ("Max Force Rate (Sensor 2)", f"{force['max_force_rate2']:.2f} {unit_label}/s"),
+        ]))
+
+    return tables
+
+
+def report_path(session_path, fmt='html', report_dir=REPORT_DIR):
+    """Path of the report file for a session"""
+    return os.path.join(report_dir, os.path.basename(session_path) + '.' + fmt)
+
+
+def is_up_to_date(session_path, path):
+    """True if the report exists and is newer than both session files"""
+    if not os.path.exists(path):
+        return False
+    session_mtime = max(os.path.getmtime(session_path + '.bin'), os.path.getmtime(session_path + '.json'))
+    return os.path.getmtime(path) >= session_mtime
+
+
+def list_sessions(session_dir=SESSION_DIR):
+    """Base paths of all recorded sessions, oldest first"""
+    return sorted(path[:-len('.json')] for path in glob.glob(os.path.join(session_dir, '*.json'))
+                  if os.path.exists(path[:-len('.json')] + '.bin'))
+
+
+def render_report(session_path, fmt='html', report_dir=REPORT_DIR, return_results=False):
+    """Analyze one session and write its report; returns the report path (and the analysis results)"""
+    data, sample_rate, recording = load_session_data(session_path)
+    if len(data) < 10:
+        raise ValueError("not enough data in session")
+
+    results = analyze_session(data, sample_rate, session_profile(recording.metadata))
+    measure_type = recording.measure_type or MODE_NAMES.get(results['mode'], "Unknown")
+    title = f"{measure_type} session {os.path.basename(session_path)}"
+    started = recording.metadata.get('started', '')
+
+    # Figures are rendered one after the other so each template can be reused immediately
+    renderers = [("Raw Data", render_raw_figure, data)]
+    if 'spectra' in results:
+        renderers.append(("Frequency Analysis", render_spectra_figure, results['spectra']))
+    for key, name, renderer in (('tremor', "Tremor Comparison", render_tremor_figure),
+                                ('movement', "Movement Analysis", render_movement_figure),
+                                ('bradykinesia', "Bradykinesia Sensor Comparison", render_bradykinesia_figure),
+                                ('force', "Force Analysis", render_force_figure)):
+        if key in results:
+            renderers.append((name, renderer, results[key]))
+
+    tables = metric_tables(results)
+    os.makedirs(report_dir, exist_ok=True)
+    path = report_path(session_path, fmt, report_dir)
+
+    if fmt == 'pdf':
+        with PdfPages(path) as pdf:
+            pdf.savefig(_table_figure(title, started, tables))
+            for name, renderer, item in renderers:
+                pdf.savefig(renderer(item))
+    elif fmt == 'html':
+        images = []
+        for name, renderer, item in renderers:
+            buffer = io.BytesIO()
+            renderer(item).savefig(buffer, format='png', dpi=90)
+            images.append((name, base64.b64encode(buffer.getvalue()).decode('ascii')))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(_html_report(title, started, tables, images))
+    else:
+        raise ValueError("fmt must be 'html' or 'pdf'")
+
+    if return_results:
+        return path, results
+    return path
+
+
+def _table_figure(title, started, tables):
+    """First PDF page: session details and metric tables"""
+    fig = Figure(figsize=(8.27, 11.69))  # A4 portrait
+    FigureCanvasAgg(fig)
+    lines = [title, f"Recorded: {started}", ""]
+    for section, rows in tables:
+        lines.append(section)
+        lines += [f"    {label}: {value}" for label, value in rows]
+        lines.append("")
+    fig.text(0.06, 0.96, "\n".join(lines), va='top', family='monospace', fontsize=9)
+    return fig
+
+
+def _html_report(title, started, tables, images):
+    parts = [
+        "<!DOCTYPE html>",
+        f"<html><head><meta charset='utf-8'><title>{html.escape(title)}</title>",
+        "<style>body{font-family:Arial,sans-serif;margin:24px}table{border-collapse:collapse;margin-bottom:16px}"
+        "td{border:1px solid #ccc;padding:4px 10px}td.value{font-weight:bold}img{max-width:100%}</style>",
+        "</head><body>",
+        f"<h1>{html.escape(title)}</h1>",
+        f"<p>Recorded: {html.escape(started)}</p>",
+    ]
+    for section, rows in tables:
+        parts.append(f"<h2>{html.escape(section)}</h2><table>")
+        parts += [f"<tr><td>{html.escape(label)}</td><td class='value'>{html.escape(value)}</td></tr>"
+                  for label, value in rows]
+        parts.append("</table>")
+    for name, image in images:
+        parts.append(f"<h2>{html.escape(name)}</h2><img src='data:image/png;base64,{image}' alt='{html.escape(name)}'>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def _init_worker():
+    """Worker processes only ever render off-screen"""
+    matplotlib.use('Agg')
+
+
+def generate_reports(session_paths=None, fmt='html', report_dir=REPORT_DIR, max_workers=None, force=False,
+                     progress=None):
+    """
+    Render the reports of many sessions in a process pool
+
+    Sessions whose report is newer than their recording are skipped unless `force`.
+    Each worker keeps its own figure templates, so a worker rendering several
+    sessions only refills line data. `progress(done, total, session_path, result)`
+    is called from the calling thread as reports finish; result is the report
+    path or the exception raised for that session.
+
+    Returns (written, skipped, failed) lists.
+    """
+    if session_paths is None:
+        session_paths = list_sessions()
+
+    pending = []
+    skipped = []
+    for session_path in session_paths:
+        if not force and is_up_to_date(session_path, report_path(session_path, fmt, report_dir)):
+            skipped.append(session_path)
+        else:
+            pending.append(session_path)
+
+    written = []
+    failed = []
+    if not pending:
+        return written, skipped, failed
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+        futures = {executor.submit(render_report, session_path, fmt, report_dir): session_path
+                   for session_path in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            session_path = futures[future]
+            try:
+                result = future.result()
+                written.append(result)
+            except Exception as e:
+                result = e
+                failed.append((session_path, e))
+            if progress is not None:
+                progress(done, len(pending), session_path, result)
+
+    return written, skipped, failed
@@ -0,0 +1,173 @@
+import numpy as np
+
+from session_recorder import N_COLUMNS
+
+# Signal mirrored onto both ends before zero-phase filtering (filtfilt's default
+# padding of 27 samples for the 4th-order band-passes at the firmware's 100 Hz)
+FILTER_PAD_SECONDS = 0.27
+
+# Grid rows interpolated at a time; resampling a long recording holds one chunk
+# besides the output, whatever the recording's length
+RESAMPLE_CHUNK_ROWS = 65536
+
+
+def _short_recording(data, start_ms, create):
+    """Result of resample_uniform for a recording too short to resample: its rows as they are"""
+    rows = np.array(data, dtype=np.float64).reshape(-1, N_COLUMNS)
+    if start_ms is not None:
+        rows = rows[np.searchsorted(rows[:, 1], start_ms):]
+        if len(rows) > 0:
+            rows[:, 1] -= rows[0, 1]
+    if create is None:
+        return rows
+    recording = create(len(rows))
+    recording.extend(rows)
+    return recording.view()
+
+
+def resample_uniform(data, target_fs=None, start_ms=None, create=None):
+    """
+    Put a recording onto an exact uniform time grid and report its timing problems
+
+    Rows are [index, time_ms, mode, value1..value5]. The checks are vectorized:
+    duplicates and out-of-order rows are found from the index column, gaps and
+    jitter from the time column. Rows are then sorted (if they are not in order
+    already), duplicates dropped and every value column is linearly
+    interpolated onto the grid, RESAMPLE_CHUNK_ROWS grid rows at a time.
+
+    Parameters:
+    data: list of rows or (rows, N_COLUMNS) array, e.g. a memory-mapped recording
+    target_fs: grid rate in Hz (default: rate implied by the regular time steps)
+    start_ms: leave out the grid before this time stamp and restart the time at
+        zero there (the settling time the analyses skip)
+    create: function(rows) returning a new recording (e.g. SharedRecording) that
+        the resampled rows are written to chunk by chunk with extend(); by default
+        they are written to a new array
+
+    Returns (resampled (rows, N_COLUMNS) array, report dict); with `create` the
+    array is the new recording's view()
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim != 2 or len(data) < 2:
+        return _short_recording(data, start_ms, create), {'samples': len(data)}
+
+    index = data[:, 0]
+    time_ms = data[:, 1]
+
+    # Order and duplicate checks on the sample index sent by the device
+    out_of_order = int(np.count_nonzero(np.diff(index) < 0))
+    unique_index = np.unique(index)
+    duplicates = len(index) - len(unique_index)
+    missing_indices = int(unique_index[-1] - unique_index[0] + 1 - len(unique_index))
+
+    # Sort by time and keep the first row of each time stamp; a recording already in
+    # order (and without repeated stamps) is read in place
+    if np.any(np.diff(time_ms) < 0):
+        data = data[np.argsort(time_ms, kind='stable')]
+        time_ms = data[:, 1]
+    keep = np.concatenate([[True], np.diff(time_ms) > 0])
+    duplicate_times = int(np.count_nonzero(~keep))
+
+    # Millisecond time stamps cannot resolve rates near 1 kHz: different samples
+    # share a stamp. The device's sample counter is then the better clock, so
+    # every sample is timed by a straight-line fit of its stamp against its index.
+    shared_stamps = np.count_nonzero(~keep & (np.diff(data[:, 0], prepend=np.nan) != 0))
+    index_timing = bool(shared_stamps) and len(unique_index) > 2
+    if index_timing:
+        data = data[np.argsort(data[:, 0], kind='stable')]
+        data = data[np.concatenate([[True], np.diff(data[:, 0]) > 0])]
+        slope, intercept = np.polyfit(data[:, 0], data[:, 1], 1)
+        stamp_error = data[:, 1] - (intercept + slope * data[:, 0])
+        data[:, 1] = intercept + slope * data[:, 0]
+    elif not keep.all():
+        data = data[keep]
+    time_ms = data[:, 1]
+    if len(data) < 2:
+        return _short_recording(data, start_ms, create), {'samples': int(len(index))}
+
+    # Timing statistics
+    dt = np.diff(time_ms)
+    # Median step locates the nominal interval, the mean of the regular steps refines it
+    nominal_dt = float(np.median(dt))
+    regular = dt[dt <= 1.5 * nominal_dt]
+    fs = float(target_fs) if target_fs else 1000.0 / float(np.mean(regular))
+    grid_dt = 1000.0 / fs
+    gap_mask = dt > 1.5 * grid_dt
+    jitter = stamp_error if index_timing else dt[~gap_mask] - grid_dt
+
+    # Exact uniform grid covering the recording, from the first grid point at or after start_ms
+    n_grid = int(np.floor((time_ms[-1] - time_ms[0]) / grid_dt)) + 1
+    first = 0
+    origin = 0.0
+    if start_ms is not None:
+        first = min(n_grid, max(0, int(np.ceil((start_ms - time_ms[0]) / grid_dt))))
+        if first > 0 and time_ms[0] + (first - 1) * grid_dt >= start_ms:
+            first -= 1  # Rounding put the cut one grid point late
+        origin = time_ms[0] + first * grid_dt
+
+    rows = n_grid - first
+    recording = create(rows) if create is not None else None
+    resampled = np.empty((rows if recording is None else min(rows, RESAMPLE_CHUNK_ROWS), N_COLUMNS))
+    for start in range(first, n_grid, RESAMPLE_CHUNK_ROWS):
+        stop = min(start + RESAMPLE_CHUNK_ROWS, n_grid)
+        chunk = resampled[start - first:stop - first] if recording is None else resampled[:stop - start]
+        grid_ms = time_ms[0] + np.arange(start, stop) * grid_dt
+
+        # Only the rows around this part of the grid are read
+        low = max(0, int(np.searchsorted(time_ms, grid_ms[0], side='right')) - 1)
+        high = min(len(time_ms), int(np.searchsorted(time_ms, grid_ms[-1], side='left')) + 1)
+        chunk[:, 0] = np.arange(start, stop)
+        chunk[:, 1] = grid_ms - origin
+        chunk[:, 2] = data[0, 2]
+        for column in range(3, N_COLUMNS):
+            chunk[:, column] = np.interp(grid_ms, time_ms[low:high], data[low:high, column])
+        if recording is not None:
+            recording.extend(chunk)
+    if recording is not None:
+        resampled = recording.view()
+
+    report = {
+        'samples': int(len(index)),
+        'resampled_samples': int(n_grid),
+        'fs': fs,
+        'measured_fs': 1000.0 * (len(time_ms) - 1) / float(time_ms[-1] - time_ms[0]),
+        'duplicates': int(duplicates),
+        'duplicate_times': duplicate_times,
+        'index_timing': index_timing,
+        'out_of_order': out_of_order,
+        'missing_indices': missing_indices,
+        'gaps': int(np.count_nonzero(gap_mask)),
+        'largest_gap_ms': float(dt.max()),
+        'jitter_std_ms': float(np.std(jitter)) if len(jitter) > 0 else 0.0,
+        'jitter_max_ms': float(np.max(np.abs(jitter))) if len(jitter) > 0 else 0.0,
+    }
+    return resampled, report
+
+
+def format_timing_report(report):
+    """One-line summary of a timing report for the activity log"""
+    if 'fs' not in report:
+        return f"Timing report: only {report.get('samples', 0)} samples"
+    return (f"Timing: {report['samples']} samples -> {report['resampled_samples']} on a "
+            f"{report['fs']:.1f} Hz grid (measured {report['measured_fs']:.1f} Hz), "
+            f"{report['gaps']} gaps (largest {report['largest_gap_ms']:.0f} ms), "
+            f"{report['missing_indices']} missing, {report['duplicates']} duplicate, "
+            f"{report['out_of_order']} out-of-order indices, jitter {report['jitter_std_ms']:.2f} ms std"
+            + (", timed by sample index" if report.get('index_timing') else ""))
+
+
+def sample_rate_of(time_data):
+    """Sampling rate in Hz of a (uniform) time axis in seconds"""
+    if len(time_data) < 2:
+        return 1.0
+    return 1.0 / float(np.median(np.diff(time_data)))
+
+
+def seconds_to_samples(seconds, fs, minimum=1):
+    """Number of samples spanning `seconds` at `fs` Hz, at least `minimum`"""
+    return max(minimum, int(round(seconds * fs)))
+
+
+def filter_padding(fs, n):
+    """filtfilt/sosfiltfilt padlen covering FILTER_PAD_SECONDS of an n-sample signal"""
+    return min(seconds_to_samples(FILTER_PAD_SECONDS, fs), n - 1)
@@ -0,0 +1,105 @@
+"""
+Check that the analyses give the same results at any sampling rate and duration
+
+Simulated tremor, bradykinesia and stiffness recordings (see SimulatedDevice)
+are generated at every rate in RATES and both durations in DURATIONS, prepared
+the way the app prepares a measurement (resampled onto a uniform grid, start
+trimmed) and analyzed with analyze_session. Every key metric is compared with
+the firmware's 100 Hz recording of the same duration (peak values such as the
+tremor amplitude depend on how long the recording is); metrics that grow with
+the recording (tap count, work) are compared per second. The runtime per
+sample shows whether the analyses scale linearly. Run: python scaling_benchmark.py
+"""
+import sys
+import time
+
+import numpy as np
+
+from simulated_device import SimulatedDevice
+from resampling import resample_uniform
+from session_analysis import analyze_session, summary_metrics, INITIAL_TRIM_SECONDS
+
+RATES = (100.0, 200.0, 500.0, 1000.0)
+DURATIONS = (10.5, 105.0)  # The firmware's MEASUREMENT_DURATION_MS and ten times that
+SEEDS = (1, 2, 3, 4)  # Noise realizations averaged per case
+
+# Relative deviation from the 100 Hz reference that counts as a rate dependence,
+# widened to three times the spread between noise realizations of the reference
+TOLERANCE = 0.05
+
+# Metrics that scale with the duration of the recording, compared per second
+PER_SECOND = ('tap_count', 'work')
+
+
+def simulate(mode, fs, duration, seed=1):
+    """
+    Rows [index, time_ms, mode, value1..value5] of a simulated measurement
+
+    The per-sample noise grows with the rate like that of a sensor whose
+    bandwidth widens with its output rate, so every rate carries the same noise
+    in the analyzed bands as the 100 Hz device.
+    """
+    device = SimulatedDevice(samples=int(round(duration * fs)), sample_rate=fs,
+                             noise=np.sqrt(fs / RATES[0]), seed=seed)
+    index, time_ms, values = device.measure(mode)
+    return np.column_stack([index, time_ms, np.full(len(index), mode), values.T]).astype(np.float64)
+
+
+def analyze(rows):
+    """Key metrics of one recording prepared like a new measurement; returns (metrics, samples)"""
+    data, timing_report = resample_uniform(rows, start_ms=INITIAL_TRIM_SECONDS * 1000.0)
+    metrics = summary_metrics(analyze_session(data, timing_report['fs']))
+    analyzed_seconds = (data[-1, 1] - data[0, 1]) / 1000.0
+    for name in PER_SECOND:
+        if name in metrics:
+            metrics[name] /= analyzed_seconds
+    return metrics, len(data)
+
+
+def run_case(mode, fs, duration, seeds=SEEDS):
+    """
+    Analyze one simulated recording per seed
+
+    Returns (mean metrics, relative spread of each metric, seconds per recording, samples)
+    """
+    runs = []
+    elapsed = 0.0
+    for seed in seeds:
+        rows = simulate(mode, fs, duration, seed)
+        start = time.perf_counter()
+        metrics, samples = analyze(rows)
+        elapsed += time.perf_counter() - start
+        runs.append(metrics)
+
+    mean = {name: float(np.mean([run[name] for run in runs])) for name in runs[0]}
+    spread = {name: float(np.std([run[name] for run in runs])) / max(abs(mean[name]), 1e-9) for name in mean}
+    return mean, spread, elapsed / len(seeds), samples
+
+
+def deviation(value, reference):
+    return abs(value - reference) / max(abs(reference), 1e-9)
+
+
+def main(rates=RATES, durations=DURATIONS):
+    failures = 0
+    for mode, name in ((1, "Tremor"), (2, "Bradykinesia"), (3, "Stiffness")):
+        print(f"\n{name}")
+        print(f"{'rate':>8} {'duration':>9} {'samples':>8} {'time':>9} {'us/sample':>10}  worst metric")
+        for duration in durations:
+            reference, spread, _, _ = run_case(mode, rates[0], duration)
+            tolerance = {metric: max(TOLERANCE, 3 * spread[metric]) for metric in reference}
+            for fs in rates:
+                metrics, _, elapsed, samples = run_case(mode, fs, duration)
+                worst = max(reference, key=lambda metric: deviation(metrics[metric], reference[metric]) / tolerance[metric])
+                worst_deviation = deviation(metrics[worst], reference[worst])
+                status = "ok" if worst_deviation <= tolerance[worst] else "DEVIATES"
+                failures += status != "ok"
+                print(f"{fs:6.0f}Hz {duration:8.1f}s {samples:8d} {elapsed * 1000:7.0f}ms {elapsed / samples * 1e6:10.2f}  "
+                      f"{worst} {metrics[worst]:.4g} vs {reference[worst]:.4g} "
+                      f"({worst_deviation:.1%}, tolerance {tolerance[worst]:.1%}) {status}")
+    print(f"\n{failures} cases outside the tolerance of the 100 Hz reference")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,134 @@
+import numpy as np
+
+from session_recorder import SessionRecording
+from resampling import resample_uniform
+from frequency_analysis import FrequencyAnalyzer
+from movement_analysis import MovementAnalyzer
+from force_analysis import ForceAnalyzer
+from bradykinesia_comparison import BradykinesiaComparison
+from tremor_comparison import TremorComparison
+from calibration import CalibrationProfile
+
+# Test type of each measurement mode (column 2 of a row)
+MODE_NAMES = {1: 'Tremor', 2: 'Bradykinesia', 3: 'Stiffness'}
+
+# Settling time at the start of every recording that is left out of the analyses
+INITIAL_TRIM_SECONDS = 0.5
+
+
+class AnalysisContext:
+    """
+    Stand-in for SensorApp so the analyzers' compute methods can run without a GUI
+
+    Used for batch work (reports, trends) and in worker processes. Log messages
+    are collected instead of being written to the activity log.
+    """
+
+    def __init__(self, sample_rate, calibration=None):
+        self.sample_rate = sample_rate
+        self.calibration = calibration or CalibrationProfile()
+        self.range_statistics = None
+        self.messages = []
+
+    def log(self, message):
+        self.messages.append(message)
+
+
+def trim_initial_data(data, start_seconds=INITIAL_TRIM_SECONDS):
+    """Drop the start of a time-ordered (rows, columns) array and restart its time at zero"""
+    start = np.searchsorted(data[:, 1], start_seconds * 1000.0)
+    trimmed = np.array(data[start:], dtype=np.float64)
+    if len(trimmed) > 0:
+        trimmed[:, 1] -= trimmed[0, 1]
+    return trimmed
+
+
+def load_session_data(path):
+    """
+    Load a recorded session prepared the same way the app prepares a new measurement
+
+    Returns (data, sample_rate, recording): the resampled recording without its
+    first 0.5 seconds, the uniform grid rate and the opened SessionRecording.
+    The memory-mapped recording is read a chunk at a time as it is resampled.
+    """
+    recording = SessionRecording(path)
+    data, report = resample_uniform(recording.view(), start_ms=INITIAL_TRIM_SECONDS * 1000.0)
+    return data, report.get('fs'), recording
+
+
+def analyze_session(data, sample_rate, calibration=None):
+    """
+    Run the computation part of every analyzer that applies to the data's test type
+
+    Raw sensor readings are converted with `calibration` (the default profile if None).
+
+    Returns a dict with the 'mode', the channel 'spectra' and, depending on the
+    mode, 'tremor', 'movement' and 'bradykinesia' or 'force' results, plus the
+    collected 'log' messages. Analyses without enough valid data are left out.
+    """
+    context = AnalysisContext(sample_rate, calibration)
+    data = np.asarray(data, dtype=np.float64)
+    mode = int(data[0, 2])
+    results = {'mode': mode, 'log': context.messages}
+
+    if len(data) >= 10:
+        results['spectra'] = FrequencyAnalyzer(context).compute_channel_spectra(data, True)
+
+    time_data = data[:, 1] / 1000.0  # Convert to seconds
+    valid = ~(np.isnan(data[:, 3]) | np.isnan(data[:, 4]))
+
+    if mode == 1 and np.count_nonzero(valid) >= 50:
+        results['tremor'] = TremorComparison(context).compute_comparison(
+            time_data[valid], data[valid, 3], data[valid, 4])
+
+    elif mode == 2:
+        movement_analyzer = MovementAnalyzer(context)
+        angle_valid = ~np.isnan(data[:, 4])
+        if np.count_nonzero(angle_valid) >= 10:
+            angles = data[angle_valid, 4]
+            smooth_seconds, peak_height, peak_distance_seconds, peak_prominence, unit_label = \
+                movement_analyzer.default_parameters(angles)
+            results['movement'] = movement_analyzer.compute_movement_metrics(
+                time_data[angle_valid], angles, smooth_seconds, peak_height, peak_distance_seconds, peak_prominence)
+            results['movement']['time'] = time_data[angle_valid]
+            results['movement']['unit_label'] = unit_label
+        if np.count_nonzero(valid) >= 50:
+            results['bradykinesia'] = BradykinesiaComparison(context).compare_angles(data[valid, 3], data[valid, 4])
+            results['bradykinesia']['time'] = time_data[valid]
+
+    elif mode == 3 and len(data) >= 10:
+        force_analyzer = ForceAnalyzer(context)
+        results['force'] = force_analyzer.compute_force_metrics(data)
+        results['force']['unit_label'] = force_analyzer.force_label
+
+    return results
+
+
+def summary_metrics(results):
+    """Flat dict of the key scalar metrics of analyze_session results (missing analyses are left out)"""
+    metrics = {}
+
+    tremor = results.get('tremor')
+    if tremor is not None:
+        metrics['tremor_frequency'] = float(tremor['freq_accel']['dominant_freq'])
+        metrics['tremor_amplitude'] = float(tremor['accel_amplitude'])
+        metrics['analog_tremor_frequency'] = float(tremor['freq_analog']['dominant_freq'])
+        metrics['analog_tremor_amplitude'] = float(tremor['analog_amplitude'])
+
+    movement = results.get('movement')
+    if movement is not None:
+        metrics['tap_count'] = float(movement['movement_count'])
+        metrics['tap_average_range'] = float(movement['avg_range'])
+        metrics['tap_frequency'] = float(movement['movement_frequency'])
+        metrics['tap_peak_velocity'] = float(movement['peak_velocity'])
+
+    bradykinesia = results.get('bradykinesia')
+    if bradykinesia is not None:
+        metrics['angle_correlation'] = float(bradykinesia['correlation'])
+
+    force = results.get('force')
+    if force is not None:
+        metrics['peak_force'] = float(force['peak_combined_force'])
+        metrics['work'] = float(force['work'])
+
+    return metrics
@@ -0,0 +1,221 @@
+import threading
+from collections import OrderedDict
+
+import tkinter as tk
+from tkinter import ttk
+
+from session_index import THUMBNAIL_SIZE
+from ui_components import VirtualList
+
+TEST_FILTERS = ("All", "Tremor", "Bradykinesia", "Stiffness")
+
+# Rows shown at once and thumbnails kept loaded as Tk images
+VISIBLE_ROWS = 12
+IMAGE_CACHE_SIZE = 4 * VISIBLE_ROWS
+
+# Delay after the last change of a filter before the list is searched again
+FILTER_DELAY_MS = 150
+
+# Sortable columns: (name, heading, width, index key)
+COLUMNS = (
+    ('started', "Started", 140, 'started'),
+    ('patient', "Patient", 110, 'patient_id'),
+    ('test', "Test", 90, 'measure_type'),
+    ('duration', "Duration", 70, 'duration'),
+    ('issues', "Quality", 70, 'issues'),
+    ('metric', "Metric", 120, None),
+)
+
+
+def parse_bound(text):
+    """Float value of a filter field, None if it is empty or not a number"""
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+class SessionBrowser:
+    """
+    Tab listing every recorded session from the session index
+
+    Filtering by patient, test, date range and a metric range, and sorting by
+    any column, only search the index entries; the list is virtual, so it
+    shows one screen of rows and their cached thumbnails whatever the number of
+    sessions. Opening a session memory-maps that one recording. The index is
+    brought up to date with the session folder in the background when the
+    tab is created.
+    """
+
+    def __init__(self, app, parent, index):
+        self.app = app
+        self.index = index
+        self.results = []
+        self.images = OrderedDict()
+        self.sort_key = 'started'
+        self.descending = True
+        self.filter_timer = None
+
+        # Rows tall enough for the thumbnails
+        ttk.Style().configure('Sessions.Treeview', rowheight=THUMBNAIL_SIZE[1] + 4)
+
+        # Filters
+        filter_frame = ttk.LabelFrame(parent, text="Search", padding=5)
+        filter_frame.pack(fill='x', padx=10, pady=5)
+        self.patient_var = tk.StringVar()
+        self.test_var = tk.StringVar(value=TEST_FILTERS[0])
+        self.date_from_var = tk.StringVar()
+        self.date_to_var = tk.StringVar()
+        self.metric_var = tk.StringVar()
+        self.metric_min_var = tk.StringVar()
+        self.metric_max_var = tk.StringVar()
+
+        ttk.Label(filter_frame, text="Patient:").grid(row=0, column=0, sticky='w', padx=5)
+        ttk.Entry(filter_frame, textvariable=self.patient_var, width=15).grid(row=0, column=1, padx=5)
+        ttk.Label(filter_frame, text="Test:").grid(row=0, column=2, sticky='w', padx=5)
+        ttk.Combobox(filter_frame, textvariable=self.test_var, values=TEST_FILTERS, state='readonly',
+                     width=12).grid(row=0, column=3, padx=5)
+        ttk.Label(filter_frame, text="From (YYYY-MM-DD):").grid(row=0, column=4, sticky='w', padx=5)
+        ttk.Entry(filter_frame, textvariable=self.date_from_var, width=11).grid(row=0, column=5, padx=5)
+        ttk.Label(filter_frame, text="To:").grid(row=0, column=6, sticky='w', padx=5)
+        ttk.Entry(filter_frame, textvariable=self.date_to_var, width=11).grid(row=0, column=7, padx=5)
+
+        ttk.Label(filter_frame, text="Metric:").grid(row=1, column=0, sticky='w', padx=5, pady=5)
+        self.metric_combo = ttk.Combobox(filter_frame, textvariable=self.metric_var, state='readonly', width=22)
+        self.metric_combo.grid(row=1, column=1, columnspan=2, sticky='w', padx=5, pady=5)
+        ttk.Label(filter_frame, text="Min:").grid(row=1, column=3, sticky='e', padx=5)
+        ttk.Entry(filter_frame, textvariable=self.metric_min_var, width=10).grid(row=1, column=4, sticky='w', padx=5)
+        ttk.Label(filter_frame, text="Max:").grid(row=1, column=5, sticky='e', padx=5)
+        ttk.Entry(filter_frame, textvariable=self.metric_max_var, width=10).grid(row=1, column=6, sticky='w', padx=5)
+
+        for var in (self.patient_var, self.test_var, self.date_from_var, self.date_to_var, self.metric_var,
+                    self.metric_min_var, self.metric_max_var):
+            var.trace_add('write', lambda *args: self.schedule_search())
+
+        # Session list and details of the selected session
+        self.list = VirtualList(parent, [(name, heading, width) for name, heading, width, key in COLUMNS],
+                                VISIBLE_ROWS, self.row, on_select=self.show_details, on_open=self.open_session,
+                                on_heading=self.sort_by, tree_width=THUMBNAIL_SIZE[0] + 24, style='Sessions.Treeview')
+        self.list.frame.pack(fill='both', expand=True, padx=10, pady=5)
+
+        bottom = ttk.Frame(parent)
+        bottom.pack(fill='x', padx=10, pady=5)
+        self.open_btn = ttk.Button(bottom, text="Open Session", command=lambda: self.list.open())
+        self.open_btn.pack(side='left', padx=5)
+        self.rebuild_btn = ttk.Button(bottom, text="Update Index", command=self.update_index)
+        self.rebuild_btn.pack(side='left', padx=5)
+        self.count_var = tk.StringVar()
+        ttk.Label(bottom, textvariable=self.count_var).pack(side='left', padx=10)
+        self.details_var = tk.StringVar()
+        ttk.Label(parent, textvariable=self.details_var, justify='left', wraplength=1000).pack(fill='x', padx=10,
+                                                                                             pady=5)
+
+        self.search()
+        self.update_index()
+
+    def schedule_search(self):
+        """Search again shortly after the filters stop changing (typing in a field)"""
+        if self.filter_timer is not None:
+            self.app.root.after_cancel(self.filter_timer)
+        self.filter_timer = self.app.root.after(FILTER_DELAY_MS, self.search)
+
+    def search(self, keep_position=False):
+        """Fill the list with the index entries matching the filters"""
+        self.filter_timer = None
+        test = self.test_var.get()
+        metric = self.metric_var.get() or None
+        self.results = self.index.query(
+            patient=self.patient_var.get(), measure_type=None if test == "All" else test,
+            date_from=self.date_from_var.get().strip(), date_to=self.date_to_var.get().strip(),
+            metric=metric, metric_min=parse_bound(self.metric_min_var.get()),
+            metric_max=parse_bound(self.metric_max_var.get()), sort_key=self.sort_key, descending=self.descending)
+
+        self.list.heading('metric', metric or "Metric")
+        self.list.set_count(len(self.results), keep_position)
+        self.count_var.set(f"{len(self.results)} of {len(self.index)} sessions")
+
+    def sort_by(self, column):
+        """Sort by a column; a second click on the same column reverses the order"""
+        key = dict((name, key) for name, heading, width, key in COLUMNS)[column]
+        if column == 'metric':
+            key = self.metric_var.get()
+            if not key:
+                return
+        self.descending = not self.descending if key == self.sort_key else key not in ('patient_id', 'measure_type')
+        self.sort_key = key
+        self.search()
+
+    def row(self, index):
+        """Text, values and thumbnail of one visible row"""
+        entry = self.results[index]
+        duration = f"{entry['duration']:.1f} s" if entry['duration'] is not None else ""
+        issues = f"{entry['issues']} issues" if entry['issues'] else "OK"
+        value = entry['metrics'].get(self.metric_var.get())
+        metric = f"{value:.3f}" if value is not None else ""
+        values = (entry['started'], entry['patient_id'], entry['measure_type'], duration, issues, metric)
+        return "", values, self.thumbnail(entry)
+
+    def thumbnail(self, entry):
+        """Tk image of an entry's thumbnail, loaded on first display and kept for the next few screens"""
+        session_id = entry['id']
+        if session_id in self.images:
+            self.images.move_to_end(session_id)
+            return self.images[session_id]
+
+        path = self.index.thumbnail_file(entry)
+        image = None
+        if path is not None:
+            try:
+                image = tk.PhotoImage(file=path)
+            except tk.TclError:
+                image = None
+        self.images[session_id] = image
+        if len(self.images) > IMAGE_CACHE_SIZE:
+            self.images.popitem(last=False)
+        return image
+
+    def show_details(self, index):
+        entry = self.results[index]
+        metrics = ", ".join(f"{name} {value:.3f}" for name, value in sorted(entry['metrics'].items()))
+        self.details_var.set(f"{entry['id']}: {entry['rows']} samples. {metrics or 'No metrics stored.'}")
+
+    def open_session(self, index):
+        self.app.open_session(self.index.session_path(self.results[index]['id']))
+
+    def add(self, entry):
+        """Add a new session to the index and the list (Tk thread)"""
+        self.index.add(entry)
+        self.images.pop(entry['id'], None)
+        self.update_metric_names()
+        self.search(keep_position=True)
+
+    def update_metric_names(self):
+        self.metric_combo.configure(values=[""] + self.index.metric_names())
+
+    def update_index(self):
+        """Index new and changed sessions in the background (analysing older sessions once)"""
+        self.rebuild_btn.configure(state='disabled')
+
+        def progress(done, total, session_path, error):
+            if error is not None:
+                self.app.log(f"Could not index {session_path}: {error}")
+            if done % 20 == 0 or done == total:
+                self.app.root.after(0, lambda: self.count_var.set(f"Indexing sessions: {done}/{total}"))
+
+        def run():
+            try:
+                updated, removed, failed = self.index.refresh(progress=progress)
+                if updated or removed or failed:
+                    self.app.log(f"Session index: {updated} sessions indexed, {removed} removed, {failed} failed")
+            except Exception as e:
+                self.app.log(f"Session index error: {e}")
+            self.app.root.after(0, finished)
+
+        def finished():
+            self.rebuild_btn.configure(state='normal')
+            self.images.clear()
+            self.update_metric_names()
+            self.search(keep_position=True)
+
+        self.update_metric_names()
+        threading.Thread(target=run, daemon=True).start()
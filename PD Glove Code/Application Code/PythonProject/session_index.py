@@ -0,0 +1,278 @@
+import os
+import json
+import threading
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from session_recorder import SESSION_DIR, SessionRecording
+from session_analysis import load_session_data, analyze_session, summary_metrics, INITIAL_TRIM_SECONDS
+from data_quality import CHANNELS
+from calibration import session_profile
+from report_generator import SENSOR_COLORS, list_sessions
+
+# Index file and thumbnail folder, next to the sessions they describe
+INDEX_NAME = 'session_index.json'
+THUMBNAIL_FOLDER = 'thumbnails'
+
+# Thumbnail size in pixels (width, height)
+THUMBNAIL_SIZE = (160, 40)
+
+# Entries written between two saves while the index is rebuilt
+SAVE_EVERY = 50
+
+
+def thumbnail_path(session_path):
+    """Path of the thumbnail of a session"""
+    return os.path.join(os.path.dirname(session_path), THUMBNAIL_FOLDER, os.path.basename(session_path) + '.png')
+
+
+def trace_envelope(values, width):
+    """
+    Minimum and maximum of each of `width` consecutive blocks of a trace, interleaved
+
+    Drawing the envelope instead of every sample keeps spikes and dropouts
+    visible at thumbnail size. Returns (x in 0..1, y); NaNs are ignored.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) <= 2 * width:
+        return np.linspace(0.0, 1.0, len(values)), values
+    blocks = values[:len(values) // width * width].reshape(width, -1)
+    envelope = np.column_stack([np.fmin.reduce(blocks, axis=1), np.fmax.reduce(blocks, axis=1)]).ravel()
+    return np.repeat(np.linspace(0.0, 1.0, width), 2), envelope
+
+
+def render_thumbnail(data, path, size=THUMBNAIL_SIZE):
+    """
+    Draw the raw sensor channels of a (rows, N_COLUMNS) recording into a small PNG with Agg
+
+    Every channel of the mode gets its own band, scaled to its own range, in the
+    colours of the Raw Data plots.
+    """
+    width, height = size
+    fig = Figure(figsize=(width / 100.0, height / 100.0), dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    ax.set_xlim(0, 1)
+
+    mode = int(data[0, 2]) if len(data) > 0 else 0
+    columns = [column for name, column, kind in CHANNELS.get(mode, [])] or [3, 4, 5]
+    ax.set_ylim(0, len(columns))
+    for band, column in enumerate(columns):
+        x, y = trace_envelope(data[:, column], width)
+        if len(y) == 0:
+            continue
+        low, high = np.fmin.reduce(y), np.fmax.reduce(y)
+        span = high - low
+        y = (y - low) / span if span > 0 else np.full_like(y, 0.5)
+        # First channel at the top, as in the Raw Data tab
+        ax.plot(x, len(columns) - 1 - band + 0.1 + 0.8 * y, color=SENSOR_COLORS[band % len(SENSOR_COLORS)],
+                linewidth=0.6)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    canvas.print_png(path)
+    return path
+
+
+def write_thumbnail(session_path):
+    """Render a session's thumbnail from its recording (without the settling time at the start)"""
+    data = SessionRecording(session_path).view()
+    # A slice of the memory map; the thumbnail does not need the time restarted at zero
+    data = data[np.searchsorted(data[:, 1], INITIAL_TRIM_SECONDS * 1000.0):]
+    return render_thumbnail(data, thumbnail_path(session_path))
+
+
+def index_entry(session_path, recording=None):
+    """Index entry of a session, built from its metadata, file size and time stamps without reading the recording"""
+    if recording is None:
+        recording = SessionRecording(session_path)
+    metadata = recording.metadata
+    rows = len(recording)
+    # First and last time stamps only touch two pages of the memory map
+    times = recording.view()[[0, -1], 1] if rows > 1 else None
+    thumbnail = thumbnail_path(session_path)
+    return {
+        'id': os.path.basename(session_path),
+        'patient_id': metadata.get('patient_id', ''),
+        'measure_type': metadata.get('measure_type', ''),
+        'started': metadata.get('started', ''),
+        'rows': rows,
+        'duration': float(times[1] - times[0]) / 1000.0 if times is not None else None,
+        'issues': len(metadata.get('quality_report', {}).get('issues', [])),
+        'metrics': metadata.get('metrics', {}),
+        'thumbnail': os.path.basename(thumbnail) if os.path.exists(thumbnail) else None,
+        'modified': os.path.getmtime(recording.meta_path),
+    }
+
+
+def index_session(session_path, analyze=True):
+    """
+    Complete a session for the index and return its entry
+
+    Sessions recorded before metrics were stored with them are analyzed once
+    (if `analyze`) and the key metrics are added to their metadata; a missing
+    thumbnail is rendered.
+    """
+    recording = SessionRecording(session_path)
+    if analyze and 'metrics' not in recording.metadata:
+        data, sample_rate, recording = load_session_data(session_path)
+        metrics = {}
+        if len(data) >= 10:
+            metrics = summary_metrics(analyze_session(data, sample_rate, session_profile(recording.metadata)))
+        recording.update_metadata(metrics=metrics)
+    if not os.path.exists(thumbnail_path(session_path)):
+        write_thumbnail(session_path)
+    return index_entry(session_path, recording)
+
+
+class SessionIndex:
+    """
+    Searchable list of every recorded session, kept in one JSON file
+
+    Each entry holds what the session browser filters and sorts by (patient,
+    test type, start time, length, quality problems, key metrics) and the name
+    of the session's thumbnail. Entries come from the session metadata, so
+    searching thousands of sessions never opens a recording. Entries may be
+    added from any thread.
+    """
+
+    def __init__(self, session_dir=SESSION_DIR):
+        self.session_dir = session_dir
+        self.path = os.path.join(session_dir, INDEX_NAME)
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.entries = {}
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.entries = {entry['id']: entry for entry in json.load(f).get('sessions', [])}
+            except (OSError, ValueError, KeyError):
+                self.entries = {}  # Rebuilt from the sessions by refresh()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def session_path(self, session_id):
+        return os.path.join(self.session_dir, session_id)
+
+    def thumbnail_file(self, entry):
+        """Path of an entry's thumbnail, or None if it has none"""
+        if not entry.get('thumbnail'):
+            return None
+        return os.path.join(self.session_dir, THUMBNAIL_FOLDER, entry['thumbnail'])
+
+    def add(self, entry, save=True):
+        with self.lock:
+            self.entries[entry['id']] = entry
+        if save:
+            self.save()
+
+    def save(self):
+        with self.lock:
+            stored = {'sessions': list(self.entries.values())}
+        os.makedirs(self.session_dir, exist_ok=True)
+        # Write a new file and swap it in so an interrupted save never corrupts the index
+        with self.save_lock:
+            temporary_path = self.path + '.tmp'
+            with open(temporary_path, 'w') as f:
+                json.dump(stored, f)
+            os.replace(temporary_path, self.path)
+
+    def stale_sessions(self):
+        """
+        Sessions whose metadata changed since they were indexed (or that are not indexed),
+        and ids of entries whose session no longer exists
+        """
+        with self.lock:
+            indexed = {session_id: entry['modified'] for session_id, entry in self.entries.items()}
+        stale = []
+        found = set()
+        for session_path in list_sessions(self.session_dir):
+            session_id = os.path.basename(session_path)
+            found.add(session_id)
+            if indexed.get(session_id) != os.path.getmtime(session_path + '.json'):
+                stale.append(session_path)
+        return stale, [session_id for session_id in indexed if session_id not in found]
+
+    def refresh(self, analyze=True, progress=None):
+        """
+        Bring the index up to date with the session folder
+
+        `progress(done, total, session_path, error)` is called after every
+        session. Returns (updated, removed, failed) counts.
+        """
+        stale, removed = self.stale_sessions()
+        with self.lock:
+            for session_id in removed:
+                del self.entries[session_id]
+
+        failed = 0
+        for done, session_path in enumerate(stale, 1):
+            error = None
+            try:
+                self.add(index_session(session_path, analyze), save=False)
+            except Exception as e:
+                error = e
+                failed += 1
+            if done % SAVE_EVERY == 0:
+                self.save()
+            if progress is not None:
+                progress(done, len(stale), session_path, error)
+
+        if stale or removed:
+            self.save()
+        return len(stale) - failed, len(removed), failed
+
+    def patients(self):
+        with self.lock:
+            return sorted({entry['patient_id'] for entry in self.entries.values() if entry['patient_id']})
+
+    def metric_names(self):
+        with self.lock:
+            return sorted({name for entry in self.entries.values() for name in entry['metrics']})
+
+    def query(self, patient='', measure_type=None, date_from='', date_to='', metric=None, metric_min=None,
+              metric_max=None, sort_key='started', descending=True):
+        """
+        Entries matching every given filter, sorted
+
+        patient: part of the patient ID (any case)
+        measure_type: test type, or None for all
+        date_from, date_to: first and last day (YYYY-MM-DD) of the start time
+        metric, metric_min, metric_max: range of a key metric; sessions without
+            the metric are left out when a bound is given
+        sort_key: 'started', 'patient_id', 'measure_type', 'duration', 'issues'
+            or a metric name; entries without a value come last either way
+        """
+        patient = patient.strip().lower()
+        with self.lock:
+            entries = list(self.entries.values())
+
+        if patient:
+            entries = [entry for entry in entries if patient in entry['patient_id'].lower()]
+        if measure_type:
+            entries = [entry for entry in entries if entry['measure_type'] == measure_type]
+        if date_from:
+            entries = [entry for entry in entries if entry['started'][:len(date_from)] >= date_from]
+        if date_to:
+            entries = [entry for entry in entries if entry['started'][:len(date_to)] <= date_to]
+        if metric and (metric_min is not None or metric_max is not None):
+            low = -np.inf if metric_min is None else metric_min
+            high = np.inf if metric_max is None else metric_max
+            entries = [entry for entry in entries
+                       if entry['metrics'].get(metric) is not None and low <= entry['metrics'][metric] <= high]
+
+        if sort_key in ('started', 'patient_id', 'measure_type', 'duration', 'issues', 'rows'):
+            def value(entry):
+                return entry.get(sort_key)
+        else:
+            def value(entry):
+                return entry['metrics'].get(sort_key)
+
+        present = [entry for entry in entries if value(entry) not in (None, '')]
+        missing = [entry for entry in entries if value(entry) in (None, '')]
+        present.sort(key=value, reverse=descending)
+        return present + missing
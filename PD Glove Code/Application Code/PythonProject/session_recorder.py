@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import numpy as np
+
+# Column layout of one recorded row (same order as the lists built by SerialDataCollector)
+COLUMNS = ['index', 'time_ms', 'mode', 'value1', 'value2', 'value3', 'value4', 'value5']
+N_COLUMNS = len(COLUMNS)
+
+# Folder holding the session files, next to the application code
+SESSION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sessions')
+
+
+def new_session_path(measure_type, session_dir=SESSION_DIR):
+    """Return a new session base path (without extension) named after the start time and test type"""
+    os.makedirs(session_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(session_dir, f"{stamp}_{measure_type.lower()}")
+
+    # Never append to an existing session started within the same second
+    suffix = 1
+    while os.path.exists(path + '.bin') or os.path.exists(path + '.json'):
+        suffix += 1
+        path = os.path.join(session_dir, f"{stamp}_{measure_type.lower()}_{suffix}")
+    return path
+
+
+class SessionRecorder:
+    """
+    Record rows into a fixed-size in-memory chunk that is appended to a session file when full
+
+    The session is stored as two files:
+    <path>.bin  - raw float64 rows (N_COLUMNS values each), append-only
+    <path>.json - metadata (measurement type, start time, number of rows, ...)
+    Memory use stays at one chunk regardless of the recording length.
+    """
+
+    def __init__(self, path, measure_type, chunk_rows=4096):
+        self.path = path
+        self.data_path = path + '.bin'
+        self.meta_path = path + '.json'
+
+        self.chunk = np.empty((chunk_rows, N_COLUMNS), dtype=np.float64)
+        self.chunk_fill = 0
+        self.rows_written = 0
+
+        self.metadata = {
+            'measure_type': measure_type,
+            'columns': COLUMNS,
+            'started': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'rows': 0,
+        }
+
+        self._file = open(self.data_path, 'ab')
+        self._write_metadata()
+
+    def __len__(self):
+        return self.rows_written + self.chunk_fill
+
+    def append(self, row):
+        """Add one row; the chunk is flushed to disk when it is full"""
+        self.chunk[self.chunk_fill, :len(row)] = row
+        if len(row) < N_COLUMNS:
+            self.chunk[self.chunk_fill, len(row):] = 0.0
+        self.chunk_fill += 1
+
+        if self.chunk_fill == len(self.chunk):
+            self.flush()
+
+    def flush(self):
+        """Append the filled part of the chunk to the session file"""
+        if self.chunk_fill == 0:
+            return
+
+        self.chunk[:self.chunk_fill].tofile(self._file)
+        self._file.flush()
+        self.rows_written += self.chunk_fill
+        self.chunk_fill = 0
+
+        self.metadata['rows'] = self.rows_written
+        self._write_metadata()
+
+    def close(self):
+        """Flush any remaining rows and close the session file"""
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+        self.metadata['finished'] = time.strftime("%Y-%m-%d %H:%M:%S")
+        self._write_metadata()
+
+    def _write_metadata(self):
+        with open(self.meta_path, 'w') as f:
+            json.dump(self.metadata, f, indent=2)
+
+
+class SessionRecording:
+    """Read access to a recorded session through memory-mapped views"""
+
+    def __init__(self, path):
+        self.path = path
+        self.data_path = path + '.bin'
+        self.meta_path = path + '.json'
+
+        with open(self.meta_path) as f:
+            self.metadata = json.load(f)
+
+    def __len__(self):
+        return os.path.getsize(self.data_path) // (N_COLUMNS * 8)
+
+    @property
+    def measure_type(self):
+        return self.metadata.get('measure_type')
+
+    def view(self):
+        """Return a read-only memory-mapped (rows, N_COLUMNS) array of the whole recording"""
+        n_rows = len(self)
+        if n_rows == 0:
+            return np.empty((0, N_COLUMNS), dtype=np.float64)
+        return np.memmap(self.data_path, dtype=np.float64, mode='r', shape=(n_rows, N_COLUMNS))
+
+    def column(self, name):
+        """Return a memory-mapped view of a single column"""
+        return self.view()[:, COLUMNS.index(name)]
+
+    def update_metadata(self, **items):
+        """Store additional results (reports, settings) alongside the recording"""
+        self.metadata.update(items)
+        with open(self.meta_path, 'w') as f:
+            json.dump(self.metadata, f, indent=2)
+
+
+def save_session(rows, measure_type, session_dir=SESSION_DIR):
+    """Write a complete in-memory measurement as a session and return it opened for reading"""
+    recorder = SessionRecorder(new_session_path(measure_type, session_dir), measure_type,
+                               chunk_rows=max(1, len(rows)))
+    for row in rows:
+        recorder.append(row)
+    recorder.close()
+    return SessionRecording(recorder.path)
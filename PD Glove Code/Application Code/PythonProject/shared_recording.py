@@ -0,0 +1,121 @@
+import os
+import atexit
+from collections import namedtuple
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from session_recorder import N_COLUMNS
+
+# Everything a worker process needs to attach to a recording: block name and array shape
+SharedRecordingHandle = namedtuple('SharedRecordingHandle', ['name', 'rows', 'columns'])
+
+# Blocks created by this process that are still open, released at exit
+_owned = {}
+
+
+class SharedRecording:
+    """
+    A (rows, columns) float64 recording in a named shared memory block
+
+    The creating process fills it with `extend` (resample_uniform writes a
+    recording this way, one chunk at a time) or `from_array` and owns it:
+    `close()` releases the block, and blocks still open when the process
+    exits are released then. If the process dies without exiting normally,
+    multiprocessing's resource tracker removes the block.
+    Worker processes attach by `handle` with `attached()` and get a
+    read-only view, so a recording fans out to any number of workers
+    without pickling rows or copying memory.
+    """
+
+    def __init__(self, capacity, columns=N_COLUMNS):
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, capacity * columns * 8))
+        self.capacity = capacity
+        self.columns = columns
+        self.rows = 0
+        self._array = np.ndarray((capacity, columns), dtype=np.float64, buffer=self.shm.buf)
+        _owned[self.shm.name] = self
+
+    @classmethod
+    def from_array(cls, data):
+        """Copy a complete (rows, columns) array into a new shared recording"""
+        data = np.asarray(data, dtype=np.float64)
+        recording = cls(len(data), data.shape[1])
+        recording.extend(data)
+        return recording
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def handle(self):
+        """Picklable handle of the rows filled so far, for `attached()` in another process"""
+        return SharedRecordingHandle(self.shm.name, self.rows, self.columns)
+
+    def extend(self, rows):
+        """Add a (rows, columns) array at once"""
+        rows = np.asarray(rows, dtype=np.float64)
+        if self.rows + len(rows) > self.capacity:
+            raise ValueError(f"shared recording is full ({self.capacity} rows)")
+        self._array[self.rows:self.rows + len(rows)] = rows
+        self.rows += len(rows)
+
+    def view(self):
+        """Read-only view of the filled rows"""
+        view = self._array[:self.rows]
+        view.flags.writeable = False
+        return view
+
+    def close(self):
+        """Release the block; views handed out before must no longer be used"""
+        if _owned.pop(self.shm.name, None) is None:
+            return
+        self._array = None
+        self.shm.unlink()
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # Views are still referenced; the memory is freed with the last of them
+
+
+def prepare_workers():
+    """
+    Call before starting worker processes that will attach to shared recordings
+
+    Attaching registers a block with the resource tracker (before Python 3.13).
+    Workers started after this process's tracker share it; a worker started
+    before would run a tracker of its own, which removes the blocks the worker
+    attached to when it exits, while their owner still uses them.
+    """
+    if os.name == 'posix':
+        resource_tracker.ensure_running()
+
+
+@contextmanager
+def attached(handle):
+    """
+    Read-only array of a shared recording created by another process
+
+    The array is only valid inside the with block; keep copies of anything
+    needed afterwards.
+    """
+    shm = shared_memory.SharedMemory(name=handle.name)
+    try:
+        array = np.ndarray((handle.rows, handle.columns), dtype=np.float64, buffer=shm.buf)
+        array.flags.writeable = False
+        yield array
+    finally:
+        array = None
+        shm.close()
+
+
+@atexit.register
+def close_all():
+    """Release every shared recording this process still owns"""
+    for recording in list(_owned.values()):
+        recording.close()
@@ -0,0 +1,224 @@
+import os
+import asyncio
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from acquisition import Transport, MAX_LINE_LENGTH
+
+# Measurement commands understood by the ESP32 receiver and the mode each one starts
+COMMAND_MODES = {'TREM': 1, 'BRAD': 2, 'STIF': 3}
+
+
+class SimulatedDevice:
+    """
+    Software stand-in for the ESP32 receiver (ESP32_TO_LABVIEW) and glove
+
+    Answers the same commands with the same lines: "Sent Successfully", then,
+    after `transfer_delay` seconds (glove measurement and screen drawing on the
+    real device), one "DATA..." line per sample. Like the firmware it sends
+    indices 0 .. max_index - 1 only, answers the PING handshake with READY and
+    resends a range of the last measurement on "RSND first last".
+    Commands are handled one at a time, so a command sent during a transfer is
+    answered after it, as on the firmware; only STOP interrupts the running
+    measurement or transfer, which is confirmed with STOPPED. Optional faults: `drop_rate` drops lines and
+    `garble_rate` corrupts them, both at random. `noise` scales the sensor noise added to every sample.
+    """
+
+    def __init__(self, samples=1050, sample_rate=100.0, transfer_delay=0.0, line_interval=0.0,
+                 drop_rate=0.0, garble_rate=0.0, noise=1.0, seed=None):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.transfer_delay = transfer_delay
+        self.line_interval = line_interval
+        self.drop_rate = drop_rate
+        self.garble_rate = garble_rate
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.measurement = None
+        self.mode = 0
+        self._busy = None
+        self._stop = None
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Create a device from 'sim://?samples=..&rate=..&delay=..&interval=..&drop=..&garble=..&noise=..&seed=..'"""
+        query = parse_qs(urlparse(spec).query)
+
+        def option(name, default, kind=float):
+            return kind(query[name][0]) if name in query else default
+
+        return cls(samples=option('samples', 1050, int), sample_rate=option('rate', 100.0),
+                   transfer_delay=option('delay', 0.0), line_interval=option('interval', 0.0),
+                   drop_rate=option('drop', 0.0), garble_rate=option('garble', 0.0),
+                   noise=option('noise', 1.0), seed=option('seed', None, int))
+
+    def measure(self, mode):
+        """Generate one measurement (rows of index, time_ms, value1..value5) like the glove would"""
+        n = self.samples
+        time_ms = np.round(np.arange(n) * 1000.0 / self.sample_rate + self.rng.normal(0, 0.3, n)).astype(int)
+        t = time_ms / 1000.0
+        noise = self.rng.normal(0, self.noise, (5, n))
+
+        values = np.zeros((5, n))
+        if mode == 1:  # Tremor: accelerometer X/Y/Z in g, 5 Hz tremor
+            tremor = np.sin(2 * np.pi * 5.0 * t)
+            values[0] = 0.05 * tremor + 0.005 * noise[0]
+            values[1] = 0.08 * tremor + 0.005 * noise[1]
+            values[2] = 1.0 + 0.02 * tremor + 0.005 * noise[2]
+        elif mode == 2:  # Bradykinesia: contact state and two roll angles, 1.5 Hz tapping
+            tapping = 30.0 * np.sin(2 * np.pi * 1.5 * t)
+            values[0] = (tapping > 20.0).astype(float)
+            values[1] = tapping + 0.5 * noise[1]
+            values[2] = 0.5 * tapping + 0.5 * noise[2]
+        elif mode == 3:  # Stiffness: four force ADC readings and a roll angle
+            press = np.clip(np.sin(2 * np.pi * 0.5 * t), 0, 1)
+            for sensor, gain in ((0, 1500.0), (1, 1200.0), (3, 900.0), (4, 700.0)):
+                values[sensor] = np.clip(1500.0 + gain * press + 10.0 * noise[sensor], 0, 4095)
+            values[2] = 20.0 * np.sin(2 * np.pi * 0.5 * t) + 0.5 * noise[2]
+
+        return np.arange(n), time_ms, values
+
+    def format_line(self, index, max_index, time_ms, values):
+        """DATA line exactly as the receiver prints it (5 values in stiffness mode, 3 otherwise)"""
+        count = 5 if self.mode == 3 else 3
+        formatted = "x".join(f"{value:.3f}" for value in values[:count])
+        return f"DATA{index}x{max_index}x{time_ms}x{formatted}\r\n".encode()
+
+    async def respond(self, command, send):
+        """Handle one command line and send the reply lines with the coroutine `send(bytes)`"""
+        if self._busy is None:
+            self._busy = asyncio.Lock()
+            self._stop = asyncio.Event()
+        command = command.strip()
+        if command == 'STOP':
+            self._stop.set()
+            async with self._busy:  # The interrupted command finishes first
+                self._stop.clear()
+                await send(b"STOPPED\r\n")
+            return
+
+        async with self._busy:
+            if command == 'PING':
+                await send(b"READY\r\n")
+                return
+            if command.startswith('RSND'):
+                if self.measurement is not None:
+                    first, last = (int(part) for part in command[4:].split())
+                    await self.send_range(first, last + 1, send)
+                return
+            if command not in COMMAND_MODES:
+                return
+
+            self.mode = COMMAND_MODES[command]
+            await send(b"Sent Successfully\r\n")
+            if self.transfer_delay > 0:
+                try:
+                    async with asyncio.timeout(self.transfer_delay):
+                        await self._stop.wait()
+                    return  # Stopped during the glove measurement
+                except TimeoutError:
+                    pass
+
+            self.measurement = self.measure(self.mode)
+            await self.send_range(0, self.samples - 1, send)
+
+    async def send_range(self, first, last, send):
+        """Send the DATA lines of indices first .. last - 1 of the current measurement"""
+        indices, time_ms, values = self.measurement
+        max_index = self.samples - 1
+        for i in range(first, min(last, max_index)):
+            if self._stop.is_set():
+                return
+            if self.drop_rate > 0 and self.rng.random() < self.drop_rate:
+                continue
+            line = self.format_line(indices[i], max_index, time_ms[i], values[:, i])
+            if self.garble_rate > 0 and self.rng.random() < self.garble_rate:
+                position = int(self.rng.integers(0, len(line) - 2))
+                line = line[:position] + bytes([0xFF]) + line[position + 1:]
+            await send(line)
+            if self.line_interval > 0:
+                await asyncio.sleep(self.line_interval)
+
+    async def serve_pty(self):
+        """
+        Expose the device on a pseudo-terminal (POSIX) and return the port name to open
+
+        The app can then use the normal serial transport against a simulated device.
+        """
+        master, slave = os.openpty()
+        os.set_blocking(master, False)
+        loop = asyncio.get_running_loop()
+        received = bytearray()
+
+        async def send(data):
+            while data:
+                try:
+                    written = os.write(master, data)
+                    data = data[written:]
+                except BlockingIOError:
+                    await asyncio.sleep(0.001)  # pty buffer full: the reader is behind
+
+        def readable():
+            try:
+                received.extend(os.read(master, 1024))
+            except OSError:
+                return
+            while b'\n' in received:
+                newline = received.index(b'\n')
+                command = bytes(received[:newline]).decode(errors='replace')
+                del received[:newline + 1]
+                loop.create_task(self.respond(command, send))
+
+        loop.add_reader(master, readable)
+        self._pty = (master, slave)
+        return os.ttyname(slave)
+
+    async def serve_tcp(self, host='127.0.0.1', port=0):
+        """Expose the device on a TCP port; returns the asyncio server (port in server.sockets[0])"""
+        async def handle(reader, writer):
+            async def send(data):
+                writer.write(data)
+                await writer.drain()
+
+            while True:
+                command = await reader.readline()
+                if not command:
+                    break
+                # Handled as tasks so a STOP is read while a transfer is running
+                asyncio.ensure_future(self.respond(command.decode(errors='replace'), send))
+            writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+
+class LoopbackTransport(Transport):
+    """Transport connected directly to a SimulatedDevice in the same event loop"""
+
+    def __init__(self, device, queue_lines=256):
+        self.device = device
+        self.name = "sim://"
+        self.sample_rate = device.sample_rate
+        self._queue_lines = queue_lines
+        self._lines = None
+        # Responses in progress; finished ones remove themselves
+        self._tasks = set()
+
+    async def open(self):
+        # Bounded like a real port buffer: the device waits while the reader is behind
+        self._lines = asyncio.Queue(maxsize=self._queue_lines)
+
+    async def readline(self):
+        line = await self._lines.get()
+        return line[:MAX_LINE_LENGTH]
+
+    async def write(self, data):
+        for command in data.decode(errors='replace').splitlines():
+            task = asyncio.ensure_future(self.device.respond(command, self._lines.put))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        self._tasks.clear()
@@ -0,0 +1,87 @@
+from math import factorial
+
+import numpy as np
+from scipy.ndimage import convolve1d
+from scipy.signal import savgol_coeffs
+
+# Convolution kernels and edge-fit matrices per (window, polyorder, deriv), built once per process
+_kernels = {}
+
+
+def valid_window(window, n_samples, polyorder=3):
+    """
+    Nearest usable Savitzky-Golay window for a signal of n_samples
+
+    Makes the window odd, no longer than the signal allows and longer than
+    the polynomial order. Returns None if the signal is too short to smooth.
+    """
+    window = int(window)
+    if window % 2 == 0:
+        window += 1
+    if window > n_samples:
+        window = n_samples if n_samples % 2 == 1 else n_samples - 1
+    if window <= polyorder:
+        return None
+    return window
+
+
+def get_kernel(window, polyorder, deriv):
+    """
+    Cached (convolution kernel, edge matrix) of one filter
+
+    The edge matrix maps the first `window` samples to the filtered values of
+    the first window // 2 samples by fitting one polynomial to them, like
+    savgol_filter(mode='interp'); flipped, it serves the end of the signal.
+    """
+    key = (window, polyorder, deriv)
+    if key not in _kernels:
+        kernel = savgol_coeffs(window, polyorder, deriv=deriv, use='conv')
+
+        # Least-squares polynomial fit to positions 0 .. window-1, evaluated (or differentiated)
+        # at positions 0 .. half-1
+        half = window // 2
+        positions = np.arange(window, dtype=float)
+        fit = np.linalg.pinv(np.vander(positions, polyorder + 1, increasing=True))
+        evaluate = np.zeros((half, polyorder + 1))
+        for power in range(deriv, polyorder + 1):
+            evaluate[:, power] = factorial(power) / factorial(power - deriv) * positions[:half] ** (power - deriv)
+        _kernels[key] = (kernel, evaluate @ fit)
+    return _kernels[key]
+
+
+def savgol(data, window, polyorder=3, derivs=(0,), delta=1.0, axis=-1):
+    """
+    Savitzky-Golay smoothing and derivatives of one or many channels
+
+    All channels (every slice along the other axes) are filtered by one
+    convolution along `axis` per derivative, with the edges fitted as
+    savgol_filter's default mode does, so results match savgol_filter.
+
+    Parameters:
+    data: array with the signal(s) along `axis`
+    window: window length in samples (see valid_window)
+    polyorder: polynomial order
+    derivs: derivative orders to return (0 = smoothed signal, 1 = velocity, 2 = acceleration)
+    delta: sample spacing, for derivatives in units per second
+    axis: time axis
+
+    Returns a list with one array per derivative order, each shaped like data.
+    """
+    data = np.asarray(data, dtype=float)
+    moved = np.moveaxis(data, axis, -1)
+    half = window // 2
+
+    results = []
+    for deriv in derivs:
+        kernel, edge = get_kernel(window, polyorder, deriv)
+        filtered = convolve1d(moved, kernel, axis=-1, mode='constant')
+
+        # Polynomial fit at both ends; the end uses the start matrix on the reversed window
+        filtered[..., :half] = moved[..., :window] @ edge.T
+        end = moved[..., :-window - 1:-1] @ edge.T
+        filtered[..., -half:] = (end if deriv % 2 == 0 else -end)[..., ::-1]
+
+        if deriv > 0:
+            filtered /= delta ** deriv
+        results.append(np.moveaxis(filtered, -1, axis))
+    return results
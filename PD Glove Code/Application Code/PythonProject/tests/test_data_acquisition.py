@@ -0,0 +1,228 @@
+import random
+import asyncio
+
+import numpy as np
+import pytest
+
+import device_session
+from data_acquisition import IndexBitmap, SerialDataCollector, REPAIR_ROUNDS, STOP_TIMEOUT
+from device_session import DeviceSession
+from simulated_device import SimulatedDevice, LoopbackTransport
+
+
+class Value:
+    def __init__(self):
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+
+class Root:
+    def after(self, delay, callback):
+        callback()
+
+
+class FakeApp:
+    """The parts of PDGloveApp that SerialDataCollector uses"""
+
+    def __init__(self):
+        self.root = Root()
+        self.status_var = Value()
+        self.progress_var = Value()
+        self.data = []
+        self.messages = []
+        self.aborted = 0
+        self.completed = 0
+
+    def log(self, message):
+        self.messages.append(message)
+
+    def show_error(self, message):
+        self.messages.append(message)
+
+    def measurement_aborted(self):
+        self.aborted += 1
+
+    def measurement_complete(self):
+        self.completed += 1
+
+
+class RecordingDevice(SimulatedDevice):
+    """Simulated receiver that remembers every command it was sent"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.commands = []
+
+    async def respond(self, command, send):
+        self.commands.append(command.strip())
+        await super().respond(command, send)
+
+
+@pytest.fixture
+def device(monkeypatch):
+    """Simulated receiver behind every sim:// session opened by a test"""
+    device = RecordingDevice(samples=20000, seed=1)
+    monkeypatch.setattr(device_session, 'open_transport', lambda spec: LoopbackTransport(device))
+    return device
+
+
+async def wait_for_rows(app, count, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while len(app.data) < count:
+        assert loop.time() < deadline, "no data received"
+        await asyncio.sleep(0.001)
+
+
+def measure(device, measure_type="Tremor"):
+    """Run one measurement against a device; returns the app it was collected into"""
+    async def run():
+        session = DeviceSession("sim://")
+        try:
+            await SerialDataCollector(app).collect_data(session, measure_type, 5.0)
+        finally:
+            await session.close()
+
+    app = FakeApp()
+    asyncio.run(run())
+    return app
+
+
+def test_index_bitmap_missing_ranges():
+    bitmap = IndexBitmap(10)
+    assert bitmap.missing_ranges() == [(0, 9)]
+    for index in (0, 1, 4, 5, 6, 9):
+        assert bitmap.add(index)
+    assert not bitmap.add(4)  # Duplicate
+    assert not bitmap.add(10) and not bitmap.add(-1)  # Out of range
+    assert bitmap.count == 6
+    assert not bitmap.complete
+    assert bitmap.missing_ranges() == [(2, 3), (7, 8)]
+
+    bitmap.resize(12)
+    assert bitmap.missing_ranges() == [(2, 3), (7, 8), (10, 11)]
+    for index in (2, 3, 7, 8, 10, 11):
+        bitmap.add(index)
+    assert bitmap.complete
+    assert bitmap.missing_ranges() == []
+    assert not IndexBitmap().complete
+
+
+async def replies(device, command):
+    lines = []
+
+    async def send(line):
+        lines.append(line)
+
+    await device.respond(command, send)
+    return lines
+
+
+def test_simulated_device_resends_ranges():
+    device = SimulatedDevice(samples=50, seed=3)
+
+    async def run():
+        assert await replies(device, "RSND 0 10") == []  # Nothing measured yet
+        transfer = await replies(device, "TREM")
+        assert transfer[0] == b"Sent Successfully\r\n"
+        assert len(transfer) == 1 + device.samples - 1
+
+        resent = await replies(device, "RSND 5 9")
+        assert resent == transfer[1 + 5:1 + 10]
+        # Ranges are cut at the last index the receiver sends
+        assert await replies(device, "RSND 45 60") == transfer[1 + 45:]
+
+    asyncio.run(run())
+
+
+def test_repair_recovers_dropped_and_garbled_lines(monkeypatch):
+    device = SimulatedDevice(samples=2000, drop_rate=0.05, garble_rate=0.02, seed=4)
+    monkeypatch.setattr(device_session, 'open_transport', lambda spec: LoopbackTransport(device))
+    app = measure(device)
+
+    rows = np.array(app.data)
+    indices, time_ms, values = device.measurement
+    assert app.completed == 1
+    assert np.array_equal(rows[:, 0], indices[:-1])
+    assert np.array_equal(rows[:, 1], time_ms[:-1])
+    assert any(message.startswith("Retransmission:") for message in app.messages)
+    assert not any("still missing" in message for message in app.messages)
+
+
+def test_repair_reports_gap_left_on_lossy_link(monkeypatch):
+    device = SimulatedDevice(samples=2000, drop_rate=0.8, seed=5)
+    monkeypatch.setattr(device_session, 'open_transport', lambda spec: LoopbackTransport(device))
+    app = measure(device)
+
+    rows = np.array(app.data)
+    received = len(rows)
+    assert 0 < received < device.samples - 1
+    assert np.all(np.diff(rows[:, 0]) > 0)  # Sorted, no duplicates
+    assert f"{device.samples - 1 - received} points still missing after {REPAIR_ROUNDS} " \
+           f"retransmission rounds" in app.messages
+    assert f"Measurement complete ({received}/{device.samples - 1} points)" == app.status_var.value
+
+
+def test_abort_stops_transfer_promptly(device):
+    """Every abort ends the measurement within the STOP timeout, wherever it lands in the transfer"""
+    rng = random.Random(2)
+
+    async def run():
+        session = DeviceSession("sim://")
+        collector = SerialDataCollector(FakeApp())
+        try:
+            for attempt in range(30):
+                app = collector.app = FakeApp()
+                stops = device.commands.count('STOP')
+                task = asyncio.ensure_future(collector.collect_data(session, "Tremor", 5.0))
+                await wait_for_rows(app, rng.randint(1, 2000))
+
+                loop = asyncio.get_running_loop()
+                start = loop.time()
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                latency = loop.time() - start
+
+                assert latency < STOP_TIMEOUT + 0.25, f"abort {attempt} took {latency:.3f} s"
+                assert len(app.data) < device.samples - 1
+                assert app.aborted == 1 and app.completed == 0
+                assert device.commands.count('STOP') == stops + 1
+        finally:
+            await session.close()
+
+    asyncio.run(run())
+
+
+def test_next_measurement_after_abort_has_no_stale_lines(device):
+    """Lines still in flight from an aborted transfer never end up in the next measurement"""
+    device.samples = 3000
+
+    async def run():
+        session = DeviceSession("sim://")
+        collector = SerialDataCollector(FakeApp())
+        try:
+            for attempt in range(5):
+                app = collector.app = FakeApp()
+                task = asyncio.ensure_future(collector.collect_data(session, "Tremor", 5.0))
+                await wait_for_rows(app, 100)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+
+                app = collector.app = FakeApp()
+                await collector.collect_data(session, "Stiffness", 5.0)
+                assert app.completed == 1
+
+                rows = np.array(app.data)
+                indices, time_ms, values = device.measurement
+                assert len(rows) == device.samples - 1
+                assert np.array_equal(rows[:, 0], indices[:-1])
+                assert np.array_equal(rows[:, 1], time_ms[:-1])
+                assert np.allclose(rows[:, 3:], values[:, :-1].T, atol=0.001)
+        finally:
+            await session.close()
+
+    asyncio.run(run())
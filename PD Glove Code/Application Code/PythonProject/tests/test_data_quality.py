@@ -0,0 +1,30 @@
+import numpy as np
+
+from data_quality import screen_recording, DEVICE_SAMPLE_RATE
+from simulated_device import SimulatedDevice, LoopbackTransport
+
+
+def recording(sample_rate, seconds=10.0, mode=1):
+    """Rows (index, time_ms, mode, value1..value5) of a simulated glove running at `sample_rate`"""
+    device = SimulatedDevice(samples=int(seconds * sample_rate), sample_rate=sample_rate, seed=1)
+    index, time_ms, values = device.measure(mode)
+    return np.column_stack([index, time_ms, np.full(len(index), mode), values.T])
+
+
+def test_wrong_device_rate_is_reported():
+    report = screen_recording(recording(60.0))
+    assert report['target_fs'] == DEVICE_SAMPLE_RATE
+    assert abs(report['actual_fs'] - 60.0) < 0.5
+    assert any(issue.startswith("Sampling rate") for issue in report['issues'])
+
+
+def test_device_rate_is_the_target():
+    device = SimulatedDevice(sample_rate=1000.0)
+    assert LoopbackTransport(device).sample_rate == 1000.0
+
+    # Repeated millisecond stamps at 1 kHz are neither a rate nor an ordering problem
+    report = screen_recording(recording(1000.0), LoopbackTransport(device).sample_rate)
+    assert report['shared_time_stamps'] > 0
+    assert report['issues'] == []
+
+    assert screen_recording(recording(60.0), None)['rate_error'] is None
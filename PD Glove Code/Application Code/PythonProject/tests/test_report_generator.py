@@ -0,0 +1,37 @@
+import numpy as np
+
+from report_generator import render_force_figure, render_tremor_figure
+
+
+def legend_texts(fig, ax_index=0):
+    return [text.get_text() for text in fig.axes[ax_index].get_legend().get_texts()]
+
+
+def force_results(max_force1, max_force2):
+    time = np.linspace(0.0, 10.0, 1000)
+    return {'time': time, 'force1': max_force1 * np.sin(time) ** 2, 'force2': max_force2 * np.cos(time) ** 2,
+            'max_force1': max_force1, 'max_force2': max_force2, 'unit_label': 'N'}
+
+
+def tremor_results(analog_freq, accel_freq):
+    time = np.linspace(0.0, 10.0, 1000)
+    freqs = np.linspace(0.0, 50.0, 501)
+
+    def spectrum(freq):
+        return {'freqs': freqs, 'magnitude': np.exp(-(freqs - freq) ** 2), 'dominant_freq': freq}
+
+    return {'time': time, 'analog': np.sin(time), 'accel': np.cos(time), 'accel_filtered': np.cos(time),
+            'freq_analog': spectrum(analog_freq), 'freq_accel': spectrum(accel_freq),
+            'analog_displacement': None, 'accel_displacement': None, 'correlation': None}
+
+
+def test_reused_template_shows_each_sessions_legend():
+    first = legend_texts(render_force_figure(force_results(8.4, 3.1)))
+    second = legend_texts(render_force_figure(force_results(4.72, 2.5)))
+    assert first == ["Sensor 1 (Max: 8.40N)", "Sensor 2 (Max: 3.10N)"]
+    assert second == ["Sensor 1 (Max: 4.72N)", "Sensor 2 (Max: 2.50N)"]
+
+    first = legend_texts(render_tremor_figure(tremor_results(5.0, 5.1)), 2)
+    second = legend_texts(render_tremor_figure(tremor_results(7.25, 7.5)), 2)
+    assert first == ["Analog Sensor (5.00 Hz)", "Accelerometer (5.10 Hz)"]
+    assert second == ["Analog Sensor (7.25 Hz)", "Accelerometer (7.50 Hz)"]
@@ -0,0 +1,132 @@
+"""
+Tremor classifier scoring tremor feature vectors
+
+The classifier is a Gaussian naive Bayes model over chosen tremor features
+(see tremor_features.FEATURE_NAMES): each class has a mean and spread per
+feature and a prior, so scoring any number of vectors is one broadcast over
+(vectors, classes, features). The built-in model encodes the published
+frequency ranges of the tremor types as overlapping distributions instead of
+hard thresholds, together with how sharp and ordered a tremor spectrum is. A
+model fitted on labeled sessions (TremorClassifier.fit) is saved as
+tremor_classifier.json next to this file and used instead.
+"""
+import os
+import json
+
+import numpy as np
+
+from tremor_features import FEATURE_NAMES, feature_matrix
+
+CLASSIFIER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tremor_classifier.json')
+
+# Built-in model: (mean, spread) per feature and class
+NO_TREMOR = "No tremor detected"
+DEFAULT_MODEL = {
+    'classes': [NO_TREMOR, "Parkinsonian tremor", "Essential tremor", "Physiological tremor", "Atypical frequency"],
+    'features': ['peak_frequency', 'peak_sharpness', 'spectral_entropy', 'power_3_7'],
+    'means': [[10.0, 0.10, 0.90, 0.20],
+              [5.0, 0.80, 0.35, 0.75],
+              [7.0, 0.75, 0.40, 0.50],
+              [10.5, 0.60, 0.50, 0.15],
+              [2.0, 0.50, 0.50, 0.15]],
+    'spreads': [[6.0, 0.08, 0.08, 0.15],
+                [0.8, 0.25, 0.20, 0.20],
+                [1.5, 0.25, 0.20, 0.25],
+                [1.5, 0.25, 0.20, 0.15],
+                [0.6, 0.30, 0.25, 0.15]],
+    'priors': [0.2, 0.2, 0.2, 0.2, 0.2],
+}
+
+# Smallest spread of a fitted feature, relative to its spread over all classes
+MIN_RELATIVE_SPREAD = 0.05
+
+
+class TremorClassifier:
+    """
+    Gaussian naive Bayes classifier of tremor feature vectors
+
+    Features missing from a vector (NaN) are left out of its score, so a
+    channel without a valid peak is still classified from the rest.
+    """
+
+    def __init__(self, classes, features, means, spreads, priors):
+        self.classes = list(classes)
+        self.features = list(features)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.spreads = np.asarray(spreads, dtype=np.float64)
+        self.priors = np.asarray(priors, dtype=np.float64)
+        self.columns = [FEATURE_NAMES.index(name) for name in self.features]
+
+    @classmethod
+    def from_dict(cls, model):
+        return cls(model['classes'], model['features'], model['means'], model['spreads'], model['priors'])
+
+    def to_dict(self):
+        return {'classes': self.classes, 'features': self.features, 'means': self.means.tolist(),
+                'spreads': self.spreads.tolist(), 'priors': self.priors.tolist()}
+
+    @classmethod
+    def fit(cls, features, labels, feature_names=FEATURE_NAMES):
+        """
+        Fit the model to labeled feature vectors
+
+        features: (vectors, len(FEATURE_NAMES)) array from tremor_features
+        labels: class name of every vector
+        """
+        features = np.asarray(features, dtype=np.float64)
+        labels = np.asarray(labels)
+        classes = sorted(set(labels.tolist()))
+        selected = features[:, [FEATURE_NAMES.index(name) for name in feature_names]]
+        floor = np.maximum(MIN_RELATIVE_SPREAD * np.nanstd(selected, axis=0), np.finfo(float).tiny)
+        means = [np.nanmean(selected[labels == name], axis=0) for name in classes]
+        spreads = [np.maximum(np.nanstd(selected[labels == name], axis=0), floor) for name in classes]
+        priors = [np.count_nonzero(labels == name) / len(labels) for name in classes]
+        return cls(classes, feature_names, means, spreads, priors)
+
+    def probabilities(self, features):
+        """Class probabilities of (vectors, len(FEATURE_NAMES)) feature vectors, (vectors, classes)"""
+        x = np.atleast_2d(np.asarray(features, dtype=np.float64))[:, self.columns]
+        z = (x[:, None, :] - self.means[None]) / self.spreads[None]
+        log_likelihood = np.where(np.isnan(z), 0.0, -0.5 * z ** 2 - np.log(self.spreads[None]))
+        scores = log_likelihood.sum(axis=-1) + np.log(self.priors)
+        scores -= scores.max(axis=-1, keepdims=True)
+        probabilities = np.exp(scores)
+        return probabilities / probabilities.sum(axis=-1, keepdims=True)
+
+    def classify(self, features):
+        """(class names, probability of that class) of feature vectors"""
+        probabilities = self.probabilities(features)
+        best = np.argmax(probabilities, axis=-1)
+        return [self.classes[i] for i in best], probabilities[np.arange(len(best)), best]
+
+
+def save_classifier(classifier, path=CLASSIFIER_PATH):
+    with open(path, 'w') as f:
+        json.dump(classifier.to_dict(), f, indent=2)
+    return path
+
+
+def load_classifier(path=CLASSIFIER_PATH):
+    """The saved (fitted) classifier, or the built-in model if none was saved"""
+    if os.path.exists(path):
+        with open(path) as f:
+            return TremorClassifier.from_dict(json.load(f))
+    return TremorClassifier.from_dict(DEFAULT_MODEL)
+
+
+# Loaded once per process by classify_signals
+_classifier = None
+
+
+def classify_signals(signals, fs):
+    """Features and (class names, probabilities) of a (signals, samples) array, with the loaded classifier"""
+    global _classifier
+    if _classifier is None:
+        _classifier = load_classifier()
+    features = feature_matrix(signals, fs)
+    return features, _classifier.classify(features)
+
+
+def describe(name, probability):
+    """Classification as shown to the user, e.g. "Parkinsonian tremor (72%)" """
+    return name if name == NO_TREMOR else f"{name} ({probability:.0%})"
@@ -3,13 +3,14 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from scipy.signal import butter, filtfilt, find_peaks
+from scipy.signal import butter, sosfiltfilt
 from scipy.stats import pearsonr
-
-try:
-    from scipy.integrate import cumulative_trapezoid
-except ImportError:
-    from scipy.integrate import cumtrapz as cumulative_trapezoid
+from extrema import find_extrema
+from alignment import estimate_lag, shift_signal
+from integration import integrate_displacement, sliding_windows, displacement_amplitude
+from pipeline import Pipeline, stage_executor
+from spectral_peak import TREMOR_BAND, dominant_frequency
+from tremor_classifier import classify_signals, describe
 
 
 class TremorComparison:
@@ -18,9 +19,20 @@ class TremorComparison:
         self.canvas = None
         self.fig = None
 
+        # Largest analog/accelerometer latency difference searched for; kept below half
+        # a tremor period so the alignment cannot jump by a whole cycle
+        self.max_lag_seconds = 0.04
+
+        # Band-pass filter edges (Hz) of each sensor
+        self.analog_band = (1.0, 20.0)
+        self.accel_band = (1.0, 20.0)
+
+        # Stages of the comparison, memoized across calls
+        self.pipeline = self.build_pipeline()
+
     def analyze(self, data, measure_type):
         """Compare value1 (analog sensor) and value2 (accelerometer Y) for tremor measurements using frequency analysis"""
-        if not data or len(data) < 50:
+        if data is None or len(data) < 50:
             self.app.show_error("Not enough data for tremor frequency comparison")
             return
 
@@ -50,29 +62,22 @@ class TremorComparison:
             messagebox.showerror("Error", "Not enough valid data points for frequency analysis")
             return
 
-        # Calculate sampling rate
-        if len(time_clean) > 1:
-            dt = np.mean(np.diff(time_clean))
-            fs = 1.0 / dt  # Sampling frequency in Hz
-        else:
-            fs = 100  # Default sampling rate
-
-        # Apply bandpass filter (1-20 Hz) to both signals
-        value1_filtered = self.apply_bandpass_filter(value1_clean, fs)
-        value2_filtered = self.apply_bandpass_filter(value2_clean, fs)
-
-        # Perform frequency analysis on both signals
-        freq_results_analog = self.analyze_tremor_frequency(value1_clean, fs)
-        freq_results_accel = self.analyze_tremor_frequency(value2_clean, fs)
-
-        # Calculate displacements
-        analog_displacement = self.calculate_displacement_from_analog(value1_filtered)
-        accel_displacement_data = self.calculate_displacement_from_acceleration(value2_filtered, time_clean)
-        accel_displacement = accel_displacement_data['displacement'] * 1000  # Convert to mm
-
-        # Calculate amplitudes for display
-        analog_amplitude = self.calculate_amplitude_from_analog(value1_filtered)
-        accel_amplitude = self.calculate_amplitude_from_double_integration(value2_filtered, time_clean)
+        # All numbers shown in the window (also used for batch reports)
+        comparison = self.compute_comparison(time_clean, value1_clean, value2_clean)
+        value2_filtered = comparison['accel_filtered']
+        freq_results_analog = comparison['freq_analog']
+        freq_results_accel = comparison['freq_accel']
+        analog_amplitude = comparison['analog_amplitude']
+        accel_amplitude = comparison['accel_amplitude']
+        displacement_correlation = comparison['correlation']
+        displacement_avg_diff = comparison['avg_diff']
+        displacement_std_diff = comparison['std_diff']
+        displacement_rms_diff = comparison['rms_diff']
+        displacement_lag_ms = comparison['lag_ms']
+        analog_avg_peak_to_trough = comparison['analog_peak_to_trough']
+        accel_avg_peak_to_trough = comparison['accel_peak_to_trough']
+        analog_extrema = comparison['analog_extrema']
+        accel_extrema = comparison['accel_extrema']
 
         # Create visualization with 6 plots (2 rows, 3 columns)
         self.fig = plt.Figure(figsize=(18, 10))
@@ -142,106 +147,44 @@ class TremorComparison:
         # Bottom right: Displacement comparison from both sensors
         ax6 = self.fig.add_subplot(236)
 
-        # Ensure both signals have the same time base
-        min_length = min(len(time_clean), len(analog_displacement))
-        analog_displacement_trimmed = analog_displacement[:min_length]
-        time_trimmed = time_clean[:min_length]
-
-        # Initialize comparison statistics
-        displacement_correlation = None
-        displacement_avg_diff = None
-        displacement_std_diff = None
-        displacement_rms_diff = None
-        analog_avg_peak_to_trough = None
-        accel_avg_peak_to_trough = None
-
-        # Get accelerometer displacement data
-        if len(accel_displacement_data['time']) > 0:
-            accel_displacement_plot = accel_displacement_data['displacement'] * 1000  # Convert to mm
-            accel_time_plot = accel_displacement_data['time']
-
-            # Trim accelerometer data to match the minimum length
-            if len(accel_displacement_plot) > min_length:
-                accel_displacement_plot = accel_displacement_plot[:min_length]
-                accel_time_plot = accel_time_plot[:min_length]
-
-            # ALIGNMENT: Make both signals start at the same point
-            if len(analog_displacement_trimmed) > 0:
-                # Align both to start at zero
-                analog_displacement_aligned = analog_displacement_trimmed - analog_displacement_trimmed[0]
-                accel_displacement_aligned = accel_displacement_plot - accel_displacement_plot[0]
-
-                # Ensure both arrays are exactly the same length for comparison
-                final_length = min(len(analog_displacement_aligned), len(accel_displacement_aligned))
-                analog_displacement_final = analog_displacement_aligned[:final_length]
-                accel_displacement_final = accel_displacement_aligned[:final_length]
-                time_final = time_trimmed[:final_length]
-
-                # Calculate correlation coefficient and difference statistics
-                try:
-                    displacement_correlation, p_value = pearsonr(analog_displacement_final, accel_displacement_final)
-
-                    # Calculate difference statistics
-                    displacement_diff = analog_displacement_final - accel_displacement_final
-                    displacement_avg_diff = np.mean(displacement_diff)
-                    displacement_std_diff = np.std(displacement_diff)
-                    displacement_rms_diff = np.sqrt(np.mean(displacement_diff ** 2))
-
-                    # Calculate peak-to-trough distances for both signals
-                    analog_avg_peak_to_trough = self.calculate_peak_to_trough_distance(analog_displacement_final)
-                    accel_avg_peak_to_trough = self.calculate_peak_to_trough_distance(accel_displacement_final)
-
-                    # Log detailed statistics
-                    self.app.log(f"Displacement comparison statistics:")
-                    self.app.log(f"  Correlation coefficient: {displacement_correlation:.4f} (p={p_value:.6f})")
-                    self.app.log(f"  Average difference: {displacement_avg_diff:.3f} mm")
-                    self.app.log(f"  Std dev of difference: {displacement_std_diff:.3f} mm")
-                    self.app.log(f"  RMS difference: {displacement_rms_diff:.3f} mm")
-                    if analog_avg_peak_to_trough is not None:
-                        self.app.log(f"  Analog avg peak-to-trough: {analog_avg_peak_to_trough:.3f} mm")
-                    else:
-                        self.app.log(f"  Analog avg peak-to-trough: Could not calculate")
-                    if accel_avg_peak_to_trough is not None:
-                        self.app.log(f"  Accel avg peak-to-trough: {accel_avg_peak_to_trough:.3f} mm")
-                    else:
-                        self.app.log(f"  Accel avg peak-to-trough: Could not calculate")
-
-                except Exception as e:
-                    self.app.log(f"Error calculating displacement statistics: {str(e)}")
-
-                # Plot both aligned signals
-                ax6.plot(accel_time_plot[:final_length], accel_displacement_final, 'r-', linewidth=1.5,
-                         label='Accelerometer (Double Integration)')
-                ax6.plot(time_final, analog_displacement_final, 'b-', linewidth=1.5,
-                         label='Analog Sensor')
-
-                # Add peak and trough markers if analysis was successful
+        if comparison['accel_displacement'] is not None:
+            # Plot both aligned signals
+            time_final = comparison['displacement_time']
+            analog_displacement_final = comparison['analog_displacement']
+            accel_displacement_final = comparison['accel_displacement']
+            ax6.plot(comparison['accel_displacement_time'], accel_displacement_final, 'r-', linewidth=1.5,
+                     label='Accelerometer (Double Integration)')
+            ax6.plot(time_final, analog_displacement_final, 'b-', linewidth=1.5,
+                     label='Analog Sensor')
+
+            # Add peak and trough markers if analysis was successful
+            if analog_avg_peak_to_trough is not None:
+                self.mark_peaks_and_troughs(ax6, time_final, analog_displacement_final, 'blue', alpha=0.6,
+                                            extrema=analog_extrema)
+            if accel_avg_peak_to_trough is not None:
+                self.mark_peaks_and_troughs(ax6, comparison['accel_displacement_time'], accel_displacement_final,
+                                            'red', alpha=0.6, extrema=accel_extrema)
+
+            # Add statistics text to plot (expanded)
+            if displacement_correlation is not None:
+                stats_text = f'r = {displacement_correlation:.3f}\nΔ = {displacement_avg_diff:.2f}±{displacement_std_diff:.2f} mm'
+                stats_text += f'\nLag: {displacement_lag_ms:.1f} ms'
                 if analog_avg_peak_to_trough is not None:
-                    self.mark_peaks_and_troughs(ax6, time_final, analog_displacement_final, 'blue', alpha=0.6)
+                    stats_text += f'\nAnalog P-T: {analog_avg_peak_to_trough:.2f} mm'
                 if accel_avg_peak_to_trough is not None:
-                    self.mark_peaks_and_troughs(ax6, accel_time_plot[:final_length], accel_displacement_final, 'red',
-                                                alpha=0.6)
-
-                # Add statistics text to plot (expanded)
-                if displacement_correlation is not None:
-                    stats_text = f'r = {displacement_correlation:.3f}\nΔ = {displacement_avg_diff:.2f}±{displacement_std_diff:.2f} mm'
-                    if analog_avg_peak_to_trough is not None:
-                        stats_text += f'\nAnalog P-T: {analog_avg_peak_to_trough:.2f} mm'
-                    if accel_avg_peak_to_trough is not None:
-                        stats_text += f'\nAccel P-T: {accel_avg_peak_to_trough:.2f} mm'
+                    stats_text += f'\nAccel P-T: {accel_avg_peak_to_trough:.2f} mm'
 
-                    ax6.text(0.02, 0.98, stats_text, transform=ax6.transAxes,
-                             verticalalignment='top', fontsize=9,
-                             bbox=dict(boxstyle='round', facecolor='white', alpha=0.9))
+                ax6.text(0.02, 0.98, stats_text, transform=ax6.transAxes,
+                         verticalalignment='top', fontsize=9,
+                         bbox=dict(boxstyle='round', facecolor='white', alpha=0.9))
 
         # If only analog data available
-        elif len(analog_displacement_trimmed) > 0:
-            analog_displacement_aligned = analog_displacement_trimmed - analog_displacement_trimmed[0]
+        elif comparison['analog_displacement'] is not None:
+            time_trimmed = comparison['displacement_time']
+            analog_displacement_aligned = comparison['analog_displacement']
             ax6.plot(time_trimmed, analog_displacement_aligned, 'b-', linewidth=1.5, label='Analog Sensor')
-
-            # Calculate peak-to-trough for analog only
-            analog_avg_peak_to_trough = self.calculate_peak_to_trough_distance(analog_displacement_aligned)
-            self.mark_peaks_and_troughs(ax6, time_trimmed, analog_displacement_aligned, 'blue', alpha=0.6)
+            self.mark_peaks_and_troughs(ax6, time_trimmed, analog_displacement_aligned, 'blue', alpha=0.6,
+                                        extrema=analog_extrema)
 
             if analog_avg_peak_to_trough is not None:
                 stats_text = f'Analog P-T: {analog_avg_peak_to_trough:.2f} mm'
@@ -288,7 +231,7 @@ class TremorComparison:
                   font=('Arial', 10, 'bold')).grid(row=1, column=3, sticky='w', padx=10, pady=5)
 
         # Tremor classification
-        tremor_classification = self.classify_tremor(freq_results_accel['dominant_freq'])
+        tremor_classification = comparison['classification']
         ttk.Label(results_frame, text="Tremor Classification:").grid(row=2, column=0, sticky='w', padx=10, pady=5)
         ttk.Label(results_frame, text=tremor_classification,
                   font=('Arial', 10, 'bold')).grid(row=2, column=1, columnspan=3, sticky='w', padx=10, pady=5)
@@ -330,6 +273,10 @@ class TremorComparison:
             ttk.Label(results_frame, text=interpretation,
                       font=('Arial', 10, 'bold')).grid(row=5, column=3, sticky='w', padx=10, pady=5)
 
+            ttk.Label(results_frame, text="Accelerometer Lag:").grid(row=4, column=4, sticky='w', padx=10, pady=5)
+            ttk.Label(results_frame, text=f"{displacement_lag_ms:.1f} ms",
+                      font=('Arial', 10, 'bold')).grid(row=4, column=5, sticky='w', padx=10, pady=5)
+
             # ADD PEAK-TO-TROUGH MEASUREMENTS
             if analog_avg_peak_to_trough is not None or accel_avg_peak_to_trough is not None:
                 # Peak-to-trough section header
@@ -387,6 +334,201 @@ class TremorComparison:
                      f"({analog_amplitude:.2f}mm), Accel={freq_results_accel['dominant_freq']:.2f}Hz "
                      f"({accel_amplitude:.2f}mm), Classification={tremor_classification}")
 
+    def build_pipeline(self):
+        """
+        The comparison as pipeline stages
+
+        The analog and accelerometer branches are independent and run
+        concurrently; each stage is recomputed only when one of its inputs
+        changed (e.g. changing one sensor's filter band leaves both spectra and
+        the other sensor's branch as they were).
+        """
+        pipeline = Pipeline(stage_executor())
+        pipeline.input('time', 'analog', 'accel', 'fs', 'analog_band', 'accel_band', 'max_lag')
+
+        # Spectra of the unfiltered signals
+        pipeline.node('freq_analog', self.analyze_tremor_frequency, 'analog', 'fs')
+        pipeline.node('freq_accel', self.analyze_tremor_frequency, 'accel', 'fs')
+        pipeline.node('classification', self.classify_tremor, 'accel', 'fs')
+
+        # Band-passed signals, their displacements and amplitudes
+        pipeline.node('analog_filtered', lambda signal, fs, band: self.apply_bandpass_filter(signal, fs, *band),
+                      'analog', 'fs', 'analog_band')
+        pipeline.node('accel_filtered', lambda signal, fs, band: self.apply_bandpass_filter(signal, fs, *band),
+                      'accel', 'fs', 'accel_band')
+        pipeline.node('analog_displacement', self.calculate_displacement_from_analog, 'analog_filtered')
+        pipeline.node('accel_displacement', self.calculate_displacement_from_acceleration,
+                      'accel_filtered', 'time', 'fs')
+        pipeline.node('analog_amplitude', self.calculate_amplitude_from_analog, 'analog_filtered')
+        pipeline.node('accel_amplitude', self.calculate_amplitude_from_double_integration,
+                      'accel_filtered', 'time', 'fs')
+
+        # Agreement of the two displacement traces
+        pipeline.node('displacement_comparison', self.compare_displacements,
+                      'time', 'analog_displacement', 'accel_displacement', 'fs', 'max_lag')
+        return pipeline
+
+    def compute_comparison(self, time_clean, value1_clean, value2_clean):
+        """
+        Compute every tremor comparison result without creating any widgets
+
+        Returns a dict with the filtered accelerometer signal, both spectra and dominant
+        frequencies, amplitudes, classification, the aligned displacement traces and the
+        displacement agreement statistics (None where they could not be calculated).
+        Results of stages whose inputs are unchanged since the last call are reused.
+        """
+        self.pipeline.set(time=time_clean, analog=value1_clean, accel=value2_clean, fs=self.app.sample_rate,
+                          analog_band=self.analog_band, accel_band=self.accel_band, max_lag=self.max_lag_seconds)
+        stages = self.pipeline.results('accel_filtered', 'freq_analog', 'freq_accel', 'analog_amplitude',
+                                       'accel_amplitude', 'classification', 'displacement_comparison')
+
+        result = {
+            'time': time_clean,
+            'analog': value1_clean,
+            'accel': value2_clean,
+            'accel_filtered': stages['accel_filtered'],
+            'freq_analog': stages['freq_analog'],
+            'freq_accel': stages['freq_accel'],
+            'analog_amplitude': stages['analog_amplitude'],
+            'accel_amplitude': stages['accel_amplitude'],
+            'classification': stages['classification'],
+        }
+        result.update(stages['displacement_comparison'])
+        return result
+
+    def compare_displacements(self, time_clean, analog_displacement, accel_displacement_data, fs, max_lag_seconds):
+        """
+        Align the analog and accelerometer displacement traces and compare them
+
+        Returns a dict with the aligned traces, their extrema and peak-to-trough
+        distances, the accelerometer lag, correlation and difference statistics
+        (None where they could not be calculated).
+        """
+        result = {
+            'displacement_time': None,
+            'analog_displacement': None,
+            'accel_displacement': None,
+            'accel_displacement_time': None,
+            'correlation': None,
+            'p_value': None,
+            'avg_diff': None,
+            'std_diff': None,
+            'rms_diff': None,
+            'lag_ms': None,
+            'analog_peak_to_trough': None,
+            'accel_peak_to_trough': None,
+            'analog_extrema': None,
+            'accel_extrema': None,
+        }
+
+        # Ensure both signals have the same time base
+        min_length = min(len(time_clean), len(analog_displacement))
+        analog_displacement_trimmed = analog_displacement[:min_length]
+        time_trimmed = time_clean[:min_length]
+
+        # Get accelerometer displacement data
+        if len(accel_displacement_data['time']) > 0:
+            accel_displacement_plot = accel_displacement_data['displacement'] * 1000  # Convert to mm
+            accel_time_plot = accel_displacement_data['time']
+
+            # Trim accelerometer data to match the minimum length
+            if len(accel_displacement_plot) > min_length:
+                accel_displacement_plot = accel_displacement_plot[:min_length]
+                accel_time_plot = accel_time_plot[:min_length]
+
+            # ALIGNMENT: Make both signals start at the same point
+            if len(analog_displacement_trimmed) > 0:
+                # Align both to start at zero
+                analog_displacement_aligned = analog_displacement_trimmed - analog_displacement_trimmed[0]
+                accel_displacement_aligned = accel_displacement_plot - accel_displacement_plot[0]
+
+                # Ensure both arrays are exactly the same length for comparison
+                final_length = min(len(analog_displacement_aligned), len(accel_displacement_aligned))
+                analog_displacement_final = analog_displacement_aligned[:final_length]
+                accel_displacement_final = accel_displacement_aligned[:final_length]
+                time_final = time_trimmed[:final_length]
+
+                # Calculate correlation coefficient and difference statistics
+                try:
+                    # Estimate the delay between the sensors and shift the accelerometer onto the analog sensor
+                    lag = estimate_lag(analog_displacement_final, accel_displacement_final, fs,
+                                       max_lag_seconds=max_lag_seconds)
+                    displacement_lag_ms = lag['lag_seconds'] * 1000
+                    accel_displacement_final = shift_signal(accel_displacement_final, lag['lag_samples'])
+
+                    displacement_correlation, p_value = pearsonr(analog_displacement_final, accel_displacement_final)
+
+                    # Calculate difference statistics
+                    displacement_diff = analog_displacement_final - accel_displacement_final
+                    displacement_avg_diff = np.mean(displacement_diff)
+                    displacement_std_diff = np.std(displacement_diff)
+                    displacement_rms_diff = np.sqrt(np.mean(displacement_diff ** 2))
+
+                    # Detect extrema once per signal; shared by the metrics and the plot markers
+                    analog_extrema = find_extrema(analog_displacement_final, fs=fs)
+                    accel_extrema = find_extrema(accel_displacement_final, fs=fs)
+
+                    # Calculate peak-to-trough distances for both signals
+                    analog_avg_peak_to_trough = self.calculate_peak_to_trough_distance(
+                        analog_displacement_final, extrema=analog_extrema)
+                    accel_avg_peak_to_trough = self.calculate_peak_to_trough_distance(
+                        accel_displacement_final, extrema=accel_extrema)
+
+                    result.update({
+                        'correlation': displacement_correlation,
+                        'p_value': p_value,
+                        'avg_diff': displacement_avg_diff,
+                        'std_diff': displacement_std_diff,
+                        'rms_diff': displacement_rms_diff,
+                        'lag_ms': displacement_lag_ms,
+                        'analog_peak_to_trough': analog_avg_peak_to_trough,
+                        'accel_peak_to_trough': accel_avg_peak_to_trough,
+                        'analog_extrema': analog_extrema,
+                        'accel_extrema': accel_extrema,
+                    })
+
+                    # Log detailed statistics
+                    self.app.log(f"Displacement comparison statistics:")
+                    self.app.log(f"  Accelerometer lag: {displacement_lag_ms:.1f} ms")
+                    self.app.log(f"  Correlation coefficient: {displacement_correlation:.4f} (p={p_value:.6f})")
+                    self.app.log(f"  Average difference: {displacement_avg_diff:.3f} mm")
+                    self.app.log(f"  Std dev of difference: {displacement_std_diff:.3f} mm")
+                    self.app.log(f"  RMS difference: {displacement_rms_diff:.3f} mm")
+                    if analog_avg_peak_to_trough is not None:
+                        self.app.log(f"  Analog avg peak-to-trough: {analog_avg_peak_to_trough:.3f} mm")
+                    else:
+                        self.app.log(f"  Analog avg peak-to-trough: Could not calculate")
+                    if accel_avg_peak_to_trough is not None:
+                        self.app.log(f"  Accel avg peak-to-trough: {accel_avg_peak_to_trough:.3f} mm")
+                    else:
+                        self.app.log(f"  Accel avg peak-to-trough: Could not calculate")
+
+                except Exception as e:
+                    self.app.log(f"Error calculating displacement statistics: {str(e)}")
+
+                result.update({
+                    'displacement_time': time_final,
+                    'analog_displacement': analog_displacement_final,
+                    'accel_displacement': accel_displacement_final,
+                    'accel_displacement_time': accel_time_plot[:final_length],
+                })
+
+        # If only analog data available
+        elif len(analog_displacement_trimmed) > 0:
+            analog_displacement_aligned = analog_displacement_trimmed - analog_displacement_trimmed[0]
+
+            # Calculate peak-to-trough for analog only
+            analog_extrema = find_extrema(analog_displacement_aligned, fs=fs)
+            result.update({
+                'displacement_time': time_trimmed,
+                'analog_displacement': analog_displacement_aligned,
+                'analog_extrema': analog_extrema,
+                'analog_peak_to_trough': self.calculate_peak_to_trough_distance(analog_displacement_aligned,
+                                                                                extrema=analog_extrema),
+            })
+
+        return result
+
     def apply_bandpass_filter(self, signal, fs, low_freq=1.0, high_freq=20.0):
         """Apply bandpass filter to remove noise and focus on tremor frequencies"""
         try:
@@ -399,8 +541,10 @@ class TremorComparison:
             high = min(high_freq / nyquist, 0.95)  # Ensure we don't exceed Nyquist
 
             if low < high:
-                b, a = butter(4, [low, high], btype='band')
-                filtered_signal = filtfilt(b, a, signal_centered)
+                # Second-order sections stay accurate at high sampling rates; mirroring the whole
+                # signal avoids an edge transient that double integration turns into false amplitude
+                sos = butter(4, [low, high], btype='band', output='sos')
+                filtered_signal = sosfiltfilt(sos, signal_centered, padtype='even', padlen=len(signal_centered) - 1)
                 return filtered_signal
             else:
                 return signal_centered
@@ -424,14 +568,12 @@ class TremorComparison:
             magnitude = np.abs(fft_result) * 2.0 / len(signal_centered)
 
             # Focus on tremor frequency range (1-20 Hz)
-            tremor_mask = (freqs >= 1.0) & (freqs <= 20.0)
-            tremor_freqs = freqs[tremor_mask]
+            tremor_mask = (freqs >= TREMOR_BAND[0]) & (freqs <= TREMOR_BAND[1])
             tremor_magnitude = magnitude[tremor_mask]
 
-            # Find dominant frequency
+            # Dominant frequency from the zoomed spectrum of the band, refined between its points
             if len(tremor_magnitude) > 0:
-                peak_idx = np.argmax(tremor_magnitude)
-                dominant_freq = tremor_freqs[peak_idx]
+                dominant_freq = dominant_frequency(signal, fs, TREMOR_BAND)['frequency']
             else:
                 dominant_freq = 0
 
@@ -444,6 +586,17 @@ class TremorComparison:
             self.app.log(f"Frequency analysis error: {str(e)}")
             return {'freqs': [], 'magnitude': [], 'dominant_freq': 0}
 
+    def analog_to_mm(self, analog_change):
+        """
+        Convert a change of the analog angle reading to linear displacement in mm
+
+        The glove's calibration profile gives the angle per ADC count and the
+        finger radius the angle acts on.
+        """
+        calibration = self.app.calibration
+        angle_radians = np.radians(analog_change * calibration.parameter('analog_angle', 'degrees_per_count'))
+        return calibration.parameter('analog_angle', 'radius_cm') * angle_radians * 10
+
     def calculate_displacement_from_analog(self, analog_signal):
         """
         Calculate displacement from analog sensor (convert angular position to linear displacement)
@@ -453,22 +606,8 @@ class TremorComparison:
             # Remove DC component to center around zero
             signal_centered = analog_signal - np.mean(analog_signal)
 
-            # Convert analog reading to degrees
-            # Assuming 0-4095 analog range corresponds to 0-360 degrees
-            angle_degrees = (signal_centered / 4095.0) * 360.0
-
-            # Convert to radians
-            angle_radians = np.radians(angle_degrees)
-
-            # Convert angular displacement to linear displacement
-            # Assuming 8cm radius (typical finger length)
-            radius_cm = 7.5
-            linear_displacement_cm = radius_cm * angle_radians
-
-            # Convert to mm
-            displacement_mm = linear_displacement_cm * 10
-
-            return displacement_mm
+            # Convert the angular position to linear displacement at the fingertip
+            return self.analog_to_mm(signal_centered)
 
         except Exception as e:
             self.app.log(f"Analog displacement calculation error: {str(e)}")
@@ -477,7 +616,7 @@ class TremorComparison:
     def calculate_amplitude_from_analog(self, analog_signal):
         """
         Calculate tremor amplitude from analog sensor (angular position)
-        Convert angular variation to linear displacement assuming 8cm radius
+        Convert angular variation to linear displacement at the calibrated finger radius
         """
         try:
             # Remove DC component
@@ -486,20 +625,8 @@ class TremorComparison:
             # Calculate peak-to-peak amplitude of the filtered signal
             peak_to_peak_analog = np.ptp(signal_centered)
 
-            # Convert analog reading to degrees
-            # Assuming 0-4095 analog range corresponds to 0-360 degrees
-            peak_to_peak_degrees = (peak_to_peak_analog / 4095.0) * 360.0
-
-            # Convert to radians
-            peak_to_peak_radians = np.radians(peak_to_peak_degrees)
-
-            # Convert angular displacement to linear displacement
-            # Assuming 8cm radius (typical finger length)
-            radius_cm = 7.5
-            linear_displacement_cm = radius_cm * peak_to_peak_radians
-
             # Convert to mm and take half for amplitude (peak-to-peak to amplitude)
-            amplitude_mm = (linear_displacement_cm * 10) / 2
+            amplitude_mm = self.analog_to_mm(peak_to_peak_analog) / 2
 
             return amplitude_mm
 
@@ -507,31 +634,16 @@ class TremorComparison:
             self.app.log(f"Analog amplitude calculation error: {str(e)}")
             return 0
 
-    def calculate_amplitude_from_double_integration(self, acceleration_signal, time_data):
+    def calculate_amplitude_from_double_integration(self, acceleration_signal, time_data, fs):
         """
-        Calculate tremor amplitude from acceleration using double integration
+        Calculate tremor amplitude from acceleration (sampled at fs Hz) using double integration
         """
         try:
-            # Remove DC component
-            accel_centered = acceleration_signal - np.mean(acceleration_signal)
-
-            # Convert acceleration from g to m/s² (1g = 9.81 m/s²)
-            accel_ms2 = accel_centered * 9.81
-
-            # First integration: acceleration -> velocity
-            velocity = cumulative_trapezoid(accel_ms2, time_data, initial=0)
-
-            # Remove any DC drift in velocity
-            velocity = velocity - np.mean(velocity)
-
-            # Second integration: velocity -> displacement
-            displacement = cumulative_trapezoid(velocity, time_data, initial=0)
-
-            # Remove any DC drift in displacement
-            displacement = displacement - np.mean(displacement)
+            # Drift-robust double integration (frequency domain, 1-20 Hz tremor band)
+            displacement = integrate_displacement(acceleration_signal, fs)
 
             # Calculate peak-to-peak amplitude and convert to mm
-            amplitude_m = np.ptp(displacement) / 2  # Peak-to-peak to amplitude
+            amplitude_m = displacement_amplitude(displacement)  # Peak-to-peak to amplitude
             amplitude_mm = amplitude_m * 1000  # Convert to mm
 
             return amplitude_mm
@@ -540,29 +652,14 @@ class TremorComparison:
             self.app.log(f"Double integration amplitude calculation error: {str(e)}")
             return 0
 
-    def calculate_displacement_from_acceleration(self, acceleration_signal, time_data):
+    def calculate_displacement_from_acceleration(self, acceleration_signal, time_data, fs):
         """
-        Calculate displacement from acceleration using double integration
+        Calculate displacement from acceleration (sampled at fs Hz) using double integration
         Returns time and displacement arrays for plotting
         """
         try:
-            # Remove DC component
-            accel_centered = -acceleration_signal
-
-            # Convert acceleration from g to m/s² (1g = 9.81 m/s²)
-            accel_ms2 = accel_centered * 9.81
-
-            # First integration: acceleration -> velocity
-            velocity = cumulative_trapezoid(accel_ms2, time_data, initial=0)
-
-            # Remove any DC drift in velocity
-            velocity = velocity - np.mean(velocity)
-
-            # Second integration: velocity -> displacement
-            displacement = cumulative_trapezoid(velocity, time_data, initial=0)
-
-            # Remove any DC drift in displacement
-            displacement = displacement - np.mean(displacement)
+            # Drift-robust double integration of the inverted signal (sensor axis points the other way)
+            displacement = integrate_displacement(-acceleration_signal, fs)
 
             return {
                 'time': time_data,
@@ -579,7 +676,7 @@ class TremorComparison:
         """
         try:
             # Calculate window size in samples
-            dt = np.mean(np.diff(time_data))
+            dt = 1.0 / self.app.sample_rate
             window_samples = int(window_seconds / dt)
 
             if window_samples < 10:
@@ -594,11 +691,7 @@ class TremorComparison:
 
                 # Calculate amplitude from this window
                 peak_to_peak = np.ptp(window_data)
-                peak_to_peak_degrees = (peak_to_peak / 4095.0) * 360.0
-                peak_to_peak_radians = np.radians(peak_to_peak_degrees)
-                radius_cm = 8.0
-                linear_displacement_cm = radius_cm * peak_to_peak_radians
-                amplitude_mm = (linear_displacement_cm * 10) / 2
+                amplitude_mm = self.analog_to_mm(peak_to_peak) / 2
 
                 amplitude_time.append(time_data[i])
                 amplitude_values.append(amplitude_mm)
@@ -618,35 +711,20 @@ class TremorComparison:
         """
         try:
             # Calculate window size in samples
-            dt = np.mean(np.diff(time_data))
+            dt = 1.0 / self.app.sample_rate
             window_samples = int(window_seconds / dt)
 
             if window_samples < 20:
                 window_samples = 20
 
-            amplitude_time = []
-            amplitude_values = []
-
-            # Sliding window calculation
-            for i in range(window_samples, len(acceleration_signal), window_samples // 4):
-                window_accel = acceleration_signal[i - window_samples:i]
-                window_time = time_data[i - window_samples:i] - time_data[i - window_samples]
+            # Integrate the whole recording once, then take every window's amplitude in one pass
+            displacement = integrate_displacement(acceleration_signal, 1.0 / dt)
+            step = window_samples // 4
+            windows = sliding_windows(displacement, window_samples, step)
 
-                # Calculate amplitude from this window using double integration
-                accel_centered = window_accel - np.mean(window_accel)
-                accel_ms2 = accel_centered * 9.81
-
-                velocity = cumulative_trapezoid(accel_ms2, window_time, initial=0)
-                velocity = velocity - np.mean(velocity)
-
-                displacement = cumulative_trapezoid(velocity, window_time, initial=0)
-                displacement = displacement - np.mean(displacement)
-
-                amplitude_m = np.ptp(displacement) / 2
-                amplitude_mm = amplitude_m * 1000
-
-                amplitude_time.append(time_data[i])
-                amplitude_values.append(amplitude_mm)
+            # Each window is reported at the sample just after it ends
+            amplitude_time = time_data[window_samples::step]
+            amplitude_values = displacement_amplitude(windows[:len(amplitude_time)]) * 1000  # Convert to mm
 
             return {
                 'time': np.array(amplitude_time),
@@ -657,31 +735,24 @@ class TremorComparison:
             self.app.log(f"Integration amplitude over time calculation error: {str(e)}")
             return {'time': [], 'amplitude': []}
 
-    def calculate_peak_to_trough_distance(self, signal, min_prominence=None):
+    def calculate_peak_to_trough_distance(self, signal, min_prominence=None, extrema=None):
         """
         Calculate the average peak-to-trough distance for a displacement signal
 
         Parameters:
         signal: displacement signal array
         min_prominence: minimum prominence for peak detection (auto-calculated if None)
+        extrema: precomputed result of find_extrema (detected here if None)
 
         Returns:
         average peak-to-trough distance in mm, or None if insufficient peaks/troughs
         """
         try:
-            # Auto-calculate prominence if not provided
-            if min_prominence is None:
-                signal_range = np.ptp(signal)
-                min_prominence = signal_range * 0.1  # 10% of signal range
+            if extrema is None:
+                extrema = find_extrema(signal, prominence=min_prominence, fs=self.app.sample_rate)
 
-            # Minimum distance between peaks (prevent detecting noise)
-            min_distance = max(10, len(signal) // 20)  # At least 10 samples or 5% of signal length
-
-            # Find peaks
-            peaks, peak_props = find_peaks(signal, prominence=min_prominence, distance=min_distance)
-
-            # Find troughs (peaks of inverted signal)
-            troughs, trough_props = find_peaks(-signal, prominence=min_prominence, distance=min_distance)
+            peaks = extrema['peaks']
+            troughs = extrema['troughs']
 
             self.app.log(f"Peak-to-trough analysis: Found {len(peaks)} peaks and {len(troughs)} troughs")
 
@@ -689,30 +760,12 @@ class TremorComparison:
                 self.app.log("No significant peaks or troughs detected")
                 return None
 
-            # Combine peaks and troughs, sort by time
-            all_extrema = []
-            for peak_idx in peaks:
-                all_extrema.append((peak_idx, signal[peak_idx], 'peak'))
-            for trough_idx in troughs:
-                all_extrema.append((trough_idx, signal[trough_idx], 'trough'))
-
-            # Sort by index (time)
-            all_extrema.sort(key=lambda x: x[0])
-
-            if len(all_extrema) < 2:
+            if len(extrema['indices']) < 2:
                 self.app.log("Insufficient extrema for peak-to-trough calculation")
                 return None
 
-            # Calculate distances between consecutive extrema
-            peak_to_trough_distances = []
-            for i in range(len(all_extrema) - 1):
-                current_value = all_extrema[i][1]
-                next_value = all_extrema[i + 1][1]
-                distance = abs(current_value - next_value)
-                peak_to_trough_distances.append(distance)
-
-            if len(peak_to_trough_distances) == 0:
-                return None
+            # Distances between consecutive (alternating) extrema
+            peak_to_trough_distances = extrema['ranges']
 
             # Calculate average
             avg_distance = np.mean(peak_to_trough_distances)
@@ -726,7 +779,7 @@ class TremorComparison:
             self.app.log(f"Error calculating peak-to-trough distance: {str(e)}")
             return None
 
-    def mark_peaks_and_troughs(self, ax, time_data, signal, color, alpha=0.7):
+    def mark_peaks_and_troughs(self, ax, time_data, signal, color, alpha=0.7, extrema=None):
         """
         Mark peaks and troughs on a displacement plot
 
@@ -736,18 +789,14 @@ class TremorComparison:
         signal: displacement signal array
         color: color for the markers
         alpha: transparency of markers
+        extrema: precomputed result of find_extrema (detected here if None)
         """
         try:
-            # Calculate prominence for peak detection
-            signal_range = np.ptp(signal)
-            min_prominence = signal_range * 0.1  # 10% of signal range
-            min_distance = max(10, len(signal) // 20)
+            if extrema is None:
+                extrema = find_extrema(signal, fs=self.app.sample_rate)
 
-            # Find peaks
-            peaks, _ = find_peaks(signal, prominence=min_prominence, distance=min_distance)
-
-            # Find troughs
-            troughs, _ = find_peaks(-signal, prominence=min_prominence, distance=min_distance)
+            peaks = extrema['peaks']
+            troughs = extrema['troughs']
 
             # Mark peaks with upward triangles
             if len(peaks) > 0:
@@ -764,15 +813,17 @@ class TremorComparison:
         except Exception as e:
             self.app.log(f"Error marking peaks and troughs: {str(e)}")
 
-    def classify_tremor(self, dominant_freq):
-        """Classify tremor type based on dominant frequency"""
-        if dominant_freq == 0:
-            return "No tremor detected"
-        elif 3.0 <= dominant_freq <= 7.0:
-            return "Parkinsonian tremor"
-        elif 4.0 <= dominant_freq <= 12.0:
-            return "Essential tremor"
-        elif dominant_freq > 12.0:
-            return "Physiological tremor"
-        else:
-            return "Atypical frequency"
\ No newline at end of file
+    def classify_tremor(self, signal, fs):
+        """
+        Classify the tremor type from the whole tremor-band spectrum of a signal
+
+        Band powers, peak frequency and sharpness, harmonic ratio, amplitude and
+        spectral entropy are scored by the tremor classifier, so the result does
+        not hinge on one spectrum bin. Returns e.g. "Parkinsonian tremor (72%)".
+        """
+        try:
+            features, (names, probabilities) = classify_signals(signal, fs)
+            return describe(names[0], probabilities[0])
+        except Exception as e:
+            self.app.log(f"Tremor classification error: {str(e)}")
+            return "Not classified"
\ No newline at end of file
@@ -0,0 +1,104 @@
+import numpy as np
+from scipy import signal
+
+from resampling import seconds_to_samples
+from spectral_peak import TREMOR_BAND, dominant_frequency
+
+# Relative power bands within TREMOR_BAND (Hz): slow drift/voluntary movement,
+# parkinsonian, essential/physiological and fast physiological tremor
+POWER_BANDS = (('power_1_3', 1.0, 3.0), ('power_3_7', 3.0, 7.0), ('power_7_12', 7.0, 12.0),
+               ('power_12_20', 12.0, 20.0))
+
+# Feature vector of one channel, in order
+FEATURE_NAMES = tuple(name for name, low, high in POWER_BANDS) + (
+    'peak_frequency', 'peak_sharpness', 'harmonic_ratio', 'amplitude', 'spectral_entropy')
+
+# Welch segment length (0.25 Hz resolution) and the half width of the peak (and its
+# harmonic) whose power counts as the peak's (the main lobe of the Hann window)
+SEGMENT_SECONDS = 4.0
+PEAK_HALF_WIDTH = 0.5
+
+# Value columns of a tremor recording (data_quality.CHANNELS[1])
+TREMOR_COLUMNS = (3, 4, 5)
+
+
+def feature_matrix(signals, fs):
+    """
+    Tremor feature vector of every row of a (signals, samples) array
+
+    All rows are processed together: one Welch power spectrum call, one zoom
+    FFT for the peak frequencies and masked reductions over the 2-D spectra.
+    Features (FEATURE_NAMES):
+    power_*: fraction of the TREMOR_BAND power in each of POWER_BANDS
+    peak_frequency: dominant frequency in TREMOR_BAND (zoom FFT, sub-bin)
+    peak_sharpness: fraction of the band power within PEAK_HALF_WIDTH of the peak
+    harmonic_ratio: power around twice the peak frequency relative to the peak's
+    amplitude: RMS of the signal within TREMOR_BAND, in the signal's units
+    spectral_entropy: Shannon entropy of the band's spectrum, 0 (one line) to 1 (flat)
+
+    Returns a (signals, len(FEATURE_NAMES)) array; rows without power in the band
+    are NaN except for their amplitude of 0.
+    """
+    signals = np.atleast_2d(np.asarray(signals, dtype=np.float64))
+    n = signals.shape[-1]
+    centred = signals - np.mean(signals, axis=-1, keepdims=True)
+
+    freqs, psd = signal.welch(centred, fs=fs, nperseg=min(seconds_to_samples(SEGMENT_SECONDS, fs), n), axis=-1)
+    df = freqs[1] - freqs[0]
+    in_band = (freqs >= TREMOR_BAND[0]) & (freqs <= TREMOR_BAND[1])
+    band_psd = psd[:, in_band]
+    band_freqs = freqs[in_band]
+    total = band_psd.sum(axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = [band_psd[:, (band_freqs >= low) & (band_freqs < high)].sum(axis=-1) / total
+                    for name, low, high in POWER_BANDS[:-1]]
+        last_low, last_high = POWER_BANDS[-1][1:]
+        features.append(band_psd[:, (band_freqs >= last_low) & (band_freqs <= last_high)].sum(axis=-1) / total)
+
+        peak = np.atleast_1d(dominant_frequency(centred, fs, TREMOR_BAND)['frequency'])
+        peak_power = np.where(np.abs(band_freqs - peak[:, None]) <= PEAK_HALF_WIDTH, band_psd, 0.0).sum(axis=-1)
+        harmonic_power = np.where(np.abs(freqs - 2.0 * peak[:, None]) <= PEAK_HALF_WIDTH, psd, 0.0).sum(axis=-1)
+        features += [peak, peak_power / total, harmonic_power / peak_power]
+
+        features.append(np.sqrt(total * df))
+
+        share = band_psd / total[:, None]
+        entropy = -np.sum(np.where(share > 0, share * np.log(share), 0.0), axis=-1) / np.log(band_psd.shape[-1])
+        features.append(entropy)
+
+    features = np.column_stack(features)
+    silent = total <= 0
+    features[silent] = np.nan
+    features[silent, FEATURE_NAMES.index('amplitude')] = 0.0
+    return features
+
+
+def session_features(recordings, columns=TREMOR_COLUMNS):
+    """
+    Feature vectors of many recordings, (recordings, channels, len(FEATURE_NAMES))
+
+    `recordings` are (data, fs) pairs of resampled (rows, N_COLUMNS) arrays.
+    Recordings of the same length and rate (the firmware's fixed-length tests)
+    are stacked into one 2-D array and processed by a single feature_matrix
+    call, so a cohort costs a few vectorized passes instead of one per session.
+    Recordings too short for a spectrum (or without a rate, fewer than 2 rows)
+    get NaN features.
+    """
+    features = np.full((len(recordings), len(columns), len(FEATURE_NAMES)), np.nan)
+    groups = {}
+    for number, (data, fs) in enumerate(recordings):
+        if fs is None or len(data) < 2:
+            continue
+        if len(data) >= 2 * seconds_to_samples(1.0 / TREMOR_BAND[0], fs):
+            groups.setdefault((len(data), float(fs)), []).append(number)
+
+    for (n, fs), numbers in groups.items():
+        signals = np.stack([recordings[number][0][:, columns].T for number in numbers])
+        # NaN gaps are not valid spectra; those channels keep NaN features
+        valid = ~np.isnan(signals).any(axis=-1)
+        if valid.any():
+            block = np.full(signals.shape[:2] + (len(FEATURE_NAMES),), np.nan)
+            block[valid] = feature_matrix(signals[valid], fs)
+            features[numbers] = block
+    return features
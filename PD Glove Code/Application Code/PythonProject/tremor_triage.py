@@ -0,0 +1,81 @@
+"""
+Classify every tremor session of a folder at once
+
+The features of every channel of every session are computed in batch (see
+tremor_features.session_features) and scored by the tremor classifier in one
+call; each session is classified from the channel with the sharpest tremor
+peak. Run: python tremor_triage.py [session folder]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from session_recorder import SESSION_DIR, SessionRecording
+from session_analysis import load_session_data
+from report_generator import list_sessions
+from tremor_features import FEATURE_NAMES, TREMOR_COLUMNS, session_features
+from tremor_classifier import load_classifier, describe
+
+
+def tremor_sessions(session_dir=SESSION_DIR):
+    """Paths of the recorded tremor sessions"""
+    return [path for path in list_sessions(session_dir)
+            if SessionRecording(path).metadata.get('measure_type') == 'Tremor']
+
+
+def triage_sessions(session_paths, classifier=None):
+    """
+    Classify many tremor sessions
+
+    Returns one dict per session: path, classification (None if the session is
+    too short for a spectrum), probability, sensor number and the features of
+    that sensor.
+    """
+    classifier = classifier or load_classifier()
+    recordings = []
+    for path in session_paths:
+        data, fs, recording = load_session_data(path)
+        recordings.append((data, fs))
+
+    features = session_features(recordings)
+    sessions, channels, count = features.shape
+    names, probability = classifier.classify(features.reshape(-1, count))
+    probability = probability.reshape(sessions, channels)
+
+    sharpness = features[:, :, FEATURE_NAMES.index('peak_sharpness')]
+    best = np.argmax(np.nan_to_num(sharpness, nan=-1.0), axis=-1)
+    results = []
+    for number, path in enumerate(session_paths):
+        channel = best[number]
+        valid = not np.isnan(sharpness[number, channel])
+        results.append({
+            'path': path,
+            'classification': names[number * channels + channel] if valid else None,
+            'probability': float(probability[number, channel]) if valid else None,
+            'sensor': TREMOR_COLUMNS[channel] - 2,
+            'features': dict(zip(FEATURE_NAMES, features[number, channel].tolist())),
+        })
+    return results
+
+
+def main(session_dir=SESSION_DIR):
+    start = time.perf_counter()
+    results = triage_sessions(tremor_sessions(session_dir))
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        name = os.path.basename(result['path'])
+        if result['classification'] is None:
+            print(f"{name:40s} too short to classify")
+            continue
+        features = result['features']
+        print(f"{name:40s} {describe(result['classification'], result['probability']):30s} "
+              f"sensor {result['sensor']}: {features['peak_frequency']:.2f} Hz, "
+              f"sharpness {features['peak_sharpness']:.2f}, entropy {features['spectral_entropy']:.2f}")
+    print(f"\n{len(results)} tremor sessions classified in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else SESSION_DIR)
@@ -0,0 +1,216 @@
+import os
+import re
+import json
+import glob
+
+from session_recorder import SESSION_DIR, SessionRecording
+from session_analysis import load_session_data, analyze_session, summary_metrics
+from calibration import session_profile
+
+# One JSON file per patient, next to the sessions
+TREND_DIR = os.path.join(SESSION_DIR, 'trends')
+
+# Metrics followed over time and the direction that means the patient got worse
+# (+1: an increase is worse, -1: a decrease is worse)
+TREND_METRICS = {
+    'tremor_frequency': ("Tremor Dominant Frequency", "Hz", -1),
+    'tremor_amplitude': ("Tremor Amplitude", "mm", +1),
+    'tap_count': ("Tap Count", "", -1),
+    'tap_average_range': ("Tap Average Range", "degrees", -1),
+    'peak_force': ("Peak Force", "N", +1),
+    'work': ("Work", "J", +1),
+}
+
+# Relative change per visit (of the metric's mean) below which a trend counts as stable
+STABLE_CHANGE_PER_VISIT = 0.02
+
+
+class RunningAggregate:
+    """
+    Mean, variance, min/max and least-squares slope per visit of one metric
+
+    Every value updates the aggregate in O(1) (Welford's algorithm for the
+    variance and running sums for the regression against the visit number),
+    so no earlier value has to be read again.
+    """
+
+    FIELDS = ('count', 'mean', 'm2', 'min', 'max', 'sum_x', 'sum_xx', 'sum_y', 'sum_xy', 'last')
+
+    def __init__(self, **state):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.sum_x = 0.0
+        self.sum_xx = 0.0
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+        self.last = None
+        for name, value in state.items():
+            if name in self.FIELDS:
+                setattr(self, name, value)
+
+    def add(self, value):
+        x = float(self.count)  # Visit number of this value
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.sum_x += x
+        self.sum_xx += x * x
+        self.sum_y += value
+        self.sum_xy += x * value
+        self.last = value
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def slope(self):
+        """Least-squares change of the metric per visit (0 with fewer than two visits)"""
+        denominator = self.count * self.sum_xx - self.sum_x ** 2
+        if self.count < 2 or denominator == 0:
+            return 0.0
+        return (self.count * self.sum_xy - self.sum_x * self.sum_y) / denominator
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+def trend_direction(aggregate, worse_if):
+    """'Worsening', 'Improving', 'Stable' or 'Not enough visits' from the slope of an aggregate"""
+    if aggregate.count < 3:
+        return "Not enough visits"
+    scale = abs(aggregate.mean) if aggregate.mean != 0 else 1.0
+    change = aggregate.slope / scale
+    if abs(change) < STABLE_CHANGE_PER_VISIT:
+        return "Stable"
+    return "Worsening" if change * worse_if > 0 else "Improving"
+
+
+def _patient_filename(patient_id):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', patient_id.strip()) + '.json'
+
+
+class PatientTrendStore:
+    """
+    Per-patient time series of the key session metrics with incrementally maintained aggregates
+
+    The file holds, for every metric, the (session start, value) series and the
+    state of its RunningAggregate. Adding a session updates both in place; the
+    trend view reads the aggregates without touching any recording.
+    """
+
+    def __init__(self, patient_id, trend_dir=TREND_DIR):
+        self.patient_id = patient_id
+        self.path = os.path.join(trend_dir, _patient_filename(patient_id))
+        self.sessions = []
+        self.series = {}
+        self.aggregates = {}
+
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                stored = json.load(f)
+            self.sessions = stored.get('sessions', [])
+            self.series = stored.get('series', {})
+            self.aggregates = {name: RunningAggregate(**state)
+                               for name, state in stored.get('aggregates', {}).items()}
+
+    def add_session(self, session_id, started, metrics):
+        """
+        Add one session's metrics; returns False if the session was already added
+
+        Only metrics listed in TREND_METRICS are followed.
+        """
+        if session_id in self.sessions:
+            return False
+
+        self.sessions.append(session_id)
+        for name, value in metrics.items():
+            if name not in TREND_METRICS or value is None:
+                continue
+            self.aggregates.setdefault(name, RunningAggregate()).add(float(value))
+            self.series.setdefault(name, []).append([started, float(value)])
+
+        self.save()
+        return True
+
+    def summary(self):
+        """Rows of precomputed statistics for every followed metric of this patient"""
+        rows = []
+        for name, (label, unit, worse_if) in TREND_METRICS.items():
+            aggregate = self.aggregates.get(name)
+            if aggregate is None or aggregate.count == 0:
+                continue
+            rows.append({
+                'metric': name,
+                'label': label,
+                'unit': unit,
+                'visits': aggregate.count,
+                'last': aggregate.last,
+                'mean': aggregate.mean,
+                'std': aggregate.variance ** 0.5,
+                'min': aggregate.min,
+                'max': aggregate.max,
+                'slope': aggregate.slope,
+                'trend': trend_direction(aggregate, worse_if),
+            })
+        return rows
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        stored = {
+            'patient_id': self.patient_id,
+            'sessions': self.sessions,
+            'series': self.series,
+            'aggregates': {name: aggregate.to_dict() for name, aggregate in self.aggregates.items()},
+        }
+        # Write a new file and swap it in so an interrupted save never corrupts the history
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump(stored, f, indent=1)
+        os.replace(temporary_path, self.path)
+
+
+def list_patients(trend_dir=TREND_DIR):
+    """Patient IDs that have a trend file"""
+    patients = []
+    for path in sorted(glob.glob(os.path.join(trend_dir, '*.json'))):
+        with open(path) as f:
+            patients.append(json.load(f).get('patient_id', os.path.basename(path)[:-len('.json')]))
+    return patients
+
+
+def update_trends_from_sessions(session_paths, trend_dir=TREND_DIR):
+    """
+    Add recorded sessions that are not in their patient's trend store yet
+
+    Sessions without a 'patient_id' in their metadata are ignored. Returns the
+    number of sessions added.
+    """
+    stores = {}
+    added = 0
+    for session_path in session_paths:
+        recording = SessionRecording(session_path)
+        patient_id = recording.metadata.get('patient_id')
+        if not patient_id:
+            continue
+        if patient_id not in stores:
+            stores[patient_id] = PatientTrendStore(patient_id, trend_dir)
+        store = stores[patient_id]
+
+        session_id = os.path.basename(session_path)
+        if session_id in store.sessions:
+            continue
+
+        data, sample_rate, recording = load_session_data(session_path)
+        if len(data) < 10:
+            continue
+        metrics = summary_metrics(analyze_session(data, sample_rate, session_profile(recording.metadata)))
+        if store.add_session(session_id, recording.metadata.get('started', ''), metrics):
+            added += 1
+    return added
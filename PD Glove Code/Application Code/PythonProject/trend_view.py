@@ -0,0 +1,99 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+from trend_store import PatientTrendStore, TREND_METRICS, list_patients
+
+
+class TrendView:
+    """Window showing the precomputed longitudinal statistics of one patient"""
+
+    def __init__(self, app):
+        self.app = app
+        self.canvas = None
+        self.fig = None
+        self.store = None
+
+    def show(self, patient_id=None):
+        patients = list_patients()
+        if not patients:
+            messagebox.showinfo("Info", "No patient trends recorded yet. Enter a Patient ID before measuring.")
+            return
+
+        trend_window = tk.Toplevel(self.app.root)
+        trend_window.title("Patient Trends")
+        trend_window.geometry("1100x800")
+
+        # Patient selection
+        select_frame = ttk.Frame(trend_window)
+        select_frame.pack(fill='x', padx=10, pady=5)
+        ttk.Label(select_frame, text="Patient:").pack(side='left', padx=5)
+        self.patient_var = tk.StringVar(value=patient_id if patient_id in patients else patients[0])
+        patient_combo = ttk.Combobox(select_frame, textvariable=self.patient_var, values=patients,
+                                     state='readonly', width=30)
+        patient_combo.pack(side='left', padx=5)
+        patient_combo.bind("<<ComboboxSelected>>", lambda event: self.update_view())
+
+        # Aggregate table
+        columns = ('visits', 'last', 'mean', 'std', 'min', 'max', 'slope', 'trend')
+        headings = ('Visits', 'Last', 'Mean', 'Std Dev', 'Min', 'Max', 'Change/Visit', 'Trend')
+        self.table = ttk.Treeview(trend_window, columns=columns, height=len(TREND_METRICS))
+        self.table.heading('#0', text='Metric')
+        self.table.column('#0', width=220)
+        for column, heading in zip(columns, headings):
+            self.table.heading(column, text=heading)
+            self.table.column(column, width=95, anchor='e')
+        self.table.pack(fill='x', padx=10, pady=5)
+        self.table.bind("<<TreeviewSelect>>", lambda event: self.plot_selected_metric())
+
+        # Series of the selected metric
+        self.fig = plt.Figure(figsize=(10, 4))
+        self.ax = self.fig.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=trend_window)
+        self.canvas.get_tk_widget().pack(fill='both', expand=True, padx=10, pady=10)
+
+        self.update_view()
+
+    def update_view(self):
+        """Fill the table from the selected patient's stored aggregates"""
+        self.store = PatientTrendStore(self.patient_var.get())
+
+        self.table.delete(*self.table.get_children())
+        for row in self.store.summary():
+            unit = f" {row['unit']}" if row['unit'] else ""
+            self.table.insert('', 'end', iid=row['metric'], text=f"{row['label']}{unit}", values=(
+                row['visits'], f"{row['last']:.2f}", f"{row['mean']:.2f}", f"{row['std']:.2f}",
+                f"{row['min']:.2f}", f"{row['max']:.2f}", f"{row['slope']:+.3f}", row['trend']))
+
+        children = self.table.get_children()
+        if children:
+            self.table.selection_set(children[0])
+        self.plot_selected_metric()
+
+    def plot_selected_metric(self):
+        self.ax.clear()
+        selection = self.table.selection()
+        if selection:
+            metric = selection[0]
+            label, unit, worse_if = TREND_METRICS[metric]
+            series = self.store.series.get(metric, [])
+            aggregate = self.store.aggregates[metric]
+
+            visits = list(range(len(series)))
+            self.ax.plot(visits, [value for started, value in series], 'bo-', label=label)
+
+            # Least-squares trend line from the stored aggregate
+            intercept = aggregate.mean - aggregate.slope * (aggregate.count - 1) / 2
+            self.ax.plot([0, aggregate.count - 1], [intercept, intercept + aggregate.slope * (aggregate.count - 1)],
+                         'r--', alpha=0.7, label=f'Trend ({aggregate.slope:+.3f}/visit)')
+
+            self.ax.set_xticks(visits)
+            self.ax.set_xticklabels([started.split(' ')[0] for started, value in series], rotation=45,
+                                    fontsize=8)
+            self.ax.set_title(f"{label} - {self.store.patient_id}")
+            self.ax.set_ylabel(f"{label} ({unit})" if unit else label)
+            self.ax.legend()
+            self.ax.grid(True, alpha=0.3)
+        self.fig.tight_layout()
+        self.canvas.draw()
@@ -1,5 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext
+import threading
 
 def create_tab(notebook, title):
     """Create a tab in the notebook with the given title"""
@@ -12,4 +13,195 @@ def create_logger(parent):
     log_text = scrolledtext.ScrolledText(parent, height=10)
     log_text.pack(fill='both', expand=True)
     log_text.config(state='disabled')
-    return log_text
\ No newline at end of file
+    return log_text
+
+class DebouncedUpdate:
+    """
+    Recompute in the background shortly after interactive controls stop changing
+
+    `request(params)` restarts a `delay_ms` timer; when it expires,
+    compute(params) runs in a worker thread and apply(result) is called on the
+    Tk thread. One computation runs at a time: requests made meanwhile are
+    combined, only the latest parameters are computed next and results for
+    parameters that are already outdated are never applied.
+    """
+
+    def __init__(self, root, compute, apply, on_error=None, delay_ms=150):
+        self.root = root
+        self.compute = compute
+        self.apply = apply
+        self.on_error = on_error
+        self.delay_ms = delay_ms
+        self.timer = None
+        self.running = False
+        self.latest = None
+
+    def request(self, params):
+        """Schedule a recompute with `params` (Tk thread only)"""
+        self.latest = params
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+        self.timer = self.root.after(self.delay_ms, self.start)
+
+    def start(self):
+        self.timer = None
+        if self.running:
+            return  # finish() starts the latest parameters
+        self.running = True
+        params = self.latest
+        threading.Thread(target=self.run, args=(params,), daemon=True).start()
+
+    def run(self, params):
+        try:
+            result, error = self.compute(params), None
+        except Exception as e:
+            result, error = None, e
+        self.root.after(0, lambda: self.finish(params, result, error))
+
+    def finish(self, params, result, error):
+        self.running = False
+        if params is not self.latest:
+            if self.timer is None:
+                self.start()
+            return
+        if error is not None:
+            if self.on_error is not None:
+                self.on_error(error)
+            return
+        self.apply(result)
+
+class VirtualList:
+    """
+    Treeview showing a window onto a list of any length
+
+    Only `visible_rows` Treeview items exist; scrolling refills them through
+    row(index) -> (text, values, image), so showing, scrolling and re-sorting
+    cost the same for ten rows or a hundred thousand. `columns` are
+    (name, heading, width) tuples; on_select(index), on_open(index) and
+    on_heading(column name) are optional callbacks.
+    """
+
+    def __init__(self, parent, columns, visible_rows, row, on_select=None, on_open=None, on_heading=None,
+                 tree_width=200, style=None):
+        self.row = row
+        self.on_select = on_select
+        self.on_open = on_open
+        self.visible_rows = visible_rows
+        self.count = 0
+        self.first = 0
+        self.selected = None
+        self.updating = False
+
+        self.frame = ttk.Frame(parent)
+        options = {'style': style} if style else {}
+        self.tree = ttk.Treeview(self.frame, columns=[name for name, heading, width in columns],
+                                 height=visible_rows, selectmode='browse', **options)
+        self.tree.column('#0', width=tree_width, stretch=False)
+        for name, heading, width in columns:
+            command = (lambda column=name: on_heading(column)) if on_heading else ''
+            self.tree.heading(name, text=heading, command=command)
+            self.tree.column(name, width=width, anchor='w')
+        self.scrollbar = ttk.Scrollbar(self.frame, orient='vertical', command=self.scroll)
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+
+        # The items are created once and refilled (or detached past the end of the list)
+        self.items = [self.tree.insert('', 'end') for _ in range(visible_rows)]
+        self.attached = [True] * visible_rows
+
+        self.tree.bind('<<TreeviewSelect>>', self.selection_changed)
+        self.tree.bind('<Double-1>', lambda event: self.open())
+        self.tree.bind('<Return>', lambda event: self.open())
+        self.tree.bind('<MouseWheel>', lambda event: self.scroll('scroll', -1 if event.delta > 0 else 1, 'units'))
+        self.tree.bind('<Button-4>', lambda event: self.scroll('scroll', -1, 'units'))
+        self.tree.bind('<Button-5>', lambda event: self.scroll('scroll', 1, 'units'))
+        for key, step in (('<Up>', -1), ('<Down>', 1), ('<Prior>', -visible_rows), ('<Next>', visible_rows)):
+            self.tree.bind(key, lambda event, step=step: self.move_selection(step))
+        self.set_count(0)
+
+    def heading(self, column, text):
+        self.tree.heading(column, text=text)
+
+    def set_count(self, count, keep_position=False):
+        """Show a list of `count` rows (from the top unless keep_position) and refill the items"""
+        self.count = count
+        if not keep_position:
+            self.first = 0
+            self.selected = None
+        self.refresh()
+
+    def refresh(self):
+        """Refill the visible items from row()"""
+        self.first = max(0, min(self.first, self.count - self.visible_rows))
+        if self.selected is not None and self.selected >= self.count:
+            self.selected = None
+
+        self.updating = True
+        try:
+            for position, item in enumerate(self.items):
+                index = self.first + position
+                if index < self.count:
+                    text, values, image = self.row(index)
+                    self.tree.item(item, text=text, values=values, image=image or '')
+                    if not self.attached[position]:
+                        self.tree.move(item, '', position)
+                        self.attached[position] = True
+                elif self.attached[position]:
+                    self.tree.detach(item)
+                    self.attached[position] = False
+
+            if self.selected is not None and self.first <= self.selected < self.first + self.visible_rows:
+                self.tree.selection_set(self.items[self.selected - self.first])
+            else:
+                self.tree.selection_remove(self.tree.selection())
+        finally:
+            self.updating = False
+
+        if self.count > 0:
+            self.scrollbar.set(self.first / self.count, min(1.0, (self.first + self.visible_rows) / self.count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, action, amount, unit=None):
+        """Scrollbar and mouse wheel command: 'moveto' fraction or 'scroll' n 'units'/'pages'"""
+        if action == 'moveto':
+            first = int(round(float(amount) * self.count))
+        else:
+            first = self.first + int(amount) * (self.visible_rows if unit == 'pages' else 1)
+        if first != self.first:
+            self.first = first
+            self.refresh()
+
+    def move_selection(self, step):
+        """Keyboard navigation over the whole list, scrolling the window along"""
+        if self.count == 0:
+            return 'break'
+        index = 0 if self.selected is None else max(0, min(self.count - 1, self.selected + step))
+        self.select(index)
+        return 'break'
+
+    def select(self, index):
+        """Select row `index`, scrolling it into view"""
+        self.selected = index
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + self.visible_rows:
+            self.first = index - self.visible_rows + 1
+        self.refresh()
+        if self.on_select is not None:
+            self.on_select(index)
+
+    def selection_changed(self, event=None):
+        if self.updating:
+            return
+        selection = self.tree.selection()
+        if not selection:
+            return
+        self.selected = self.first + self.items.index(selection[0])
+        if self.on_select is not None:
+            self.on_select(self.selected)
+
+    def open(self):
+        if self.selected is not None and self.on_open is not None:
+            self.on_open(self.selected)
+        return 'break'
@@ -77,7 +77,7 @@ float Array_value5[1300]; // Mode-specific value 5 (for stiffness)
 #define YELLOWish    0xFEE9
 #define WHITE        0xFFFF
 
-char message[5];
+char message[24]; // Commands, including "RSND first last"
 unsigned int message_pos = 0;
 
 const char *headingsNames[] = {
@@ -96,11 +96,21 @@ bool RECEIVING_GLOVE_DATA = false;
 bool RECEIVED_ALL = false;
 bool DRAW_GLOVE_DATA = false;
 bool SEND_GLOVE_DATA = false;
+bool DISCARD_GLOVE_DATA = false; // Set by STOP until the glove has sent the rest of its measurement
 
 int prevESPNOW_Progress = -1;
 
 // UPDATED: Callback function to handle 5 values
 void OnDataRecv(const esp_now_recv_info_t *info, const uint8_t *incomingData, int len) {
+  if (DISCARD_GLOVE_DATA == true) {
+    // Remainder of a stopped measurement (the glove cannot be reached while it samples)
+    struct_message discarded;
+    memcpy(&discarded, incomingData, sizeof(discarded));
+    if (discarded.index >= discarded.max_index - 1) {
+      DISCARD_GLOVE_DATA = false;
+    }
+    return;
+  }
   RECEIVING_GLOVE_DATA = true;
   if (RECEIVED_ALL == false) {
     memcpy(&gloveData, incomingData, sizeof(gloveData));
@@ -229,12 +239,20 @@ void setup() {
 }
 
 void loop() {
+// Abort from the PC while waiting for the glove, drawing or sending
+if (WAITING_FOR_COMMAND == false || DRAW_GLOVE_DATA == true || SEND_GLOVE_DATA == true) {
+  if (STOP_REQUESTED()) {
+    STOP_MEASUREMENT();
+    return;
+  }
+}
+
 if (WAITING_FOR_COMMAND == true) {
   if (Serial.available() > 0) {
     // read the incoming byte:
     char inByte = Serial.read();
 
-    if (inByte != '\n' && (message_pos < 5))
+    if (inByte != '\n' && (message_pos < sizeof(message) - 1))
     {
       message[message_pos] = inByte;
       message_pos++;
@@ -242,6 +260,34 @@ if (WAITING_FOR_COMMAND == true) {
     } else
     {
       message[message_pos] = '\0';
+
+      // Ready handshake: the PC checks the link without starting a measurement
+      if (strcmp(message, "PING") == 0) {
+        Serial.println("READY");
+        message_pos = 0;
+        return;
+      }
+
+      // Nothing running to stop
+      if (strcmp(message, "STOP") == 0) {
+        Serial.println("STOPPED");
+        message_pos = 0;
+        return;
+      }
+
+      // Retransmission: resend indices first..last of the last measurement
+      if (strncmp(message, "RSND", 4) == 0) {
+        int first, last;
+        if (sscanf(message + 4, "%d %d", &first, &last) == 2) {
+          if (first < 0) first = 0;
+          if (last > max_iti_number - 1) last = max_iti_number - 1;
+          for (int i = first; i <= last; i++) {
+            SEND_DATA_LINE(i);
+          }
+        }
+        message_pos = 0;
+        return;
+      }
       
       if (strcmp(message, "TREM") == 0) {
         PRINT_TEXT("-> Tremor", YELLOWish);
@@ -274,6 +320,7 @@ if (WAITING_FOR_COMMAND == true) {
       gloveData.value5 = 0; // Initialize 5th value
       
       message_pos = 0;
+      DISCARD_GLOVE_DATA = false;
       
       esp_err_t result = esp_now_send(broadcastAddress, (uint8_t *) &gloveData, sizeof(gloveData));
       
@@ -478,7 +525,13 @@ if (DRAW_GLOVE_DATA == true) {
   }
 
   DRAW_GLOVE_DATA = false;
-  delay(3000);
+  for (int i = 0; i < 30; i++) {
+    delay(100);
+    if (STOP_REQUESTED()) {
+      STOP_MEASUREMENT();
+      return;
+    }
+  }
   tft.fillScreen(BACKGROUND);
   PRINT_HEADING(0);
   VERT_POS = 2*VERTICAL_STEP - 3;      
@@ -500,33 +553,12 @@ if (DRAW_GLOVE_DATA == true) {
         prevESPNOW_Progress = Progress;
       }
       
-      char buf[128]; // Increased buffer size for 5 float values
-      int mode = Array_mode[i];
-      
-      // Format data string for LabVIEW based on mode
-      if (mode == 3) {
-        // Stiffness mode: send all 5 values
-        sprintf(buf, "DATA%dx%dx%dx%.3fx%.3fx%.3fx%.3fx%.3f", 
-                Array_index[i], 
-                max_iti_number, 
-                Array_time_ms[i], 
-                Array_value1[i], 
-                Array_value2[i], 
-                Array_value3[i],
-                Array_value4[i], 
-                Array_value5[i]);
-      } else {
-        // Tremor and Bradykinesia modes: send 3 values for backward compatibility
-        sprintf(buf, "DATA%dx%dx%dx%.3fx%.3fx%.3f", 
-                Array_index[i], 
-                max_iti_number, 
-                Array_time_ms[i], 
-                Array_value1[i], 
-                Array_value2[i], 
-                Array_value3[i]);
+      SEND_DATA_LINE(i);
+
+      if (STOP_REQUESTED()) {
+        STOP_MEASUREMENT();
+        return;
       }
-              
-      Serial.println(buf);
     }
     SEND_GLOVE_DATA = false;
     prevESPNOW_Progress = -1;
@@ -536,6 +568,71 @@ if (DRAW_GLOVE_DATA == true) {
    }
 }
 
+// Read pending serial bytes while a measurement runs; true once a complete "STOP" line arrived
+bool STOP_REQUESTED() {
+  while (Serial.available() > 0) {
+    char inByte = Serial.read();
+    if (inByte != '\n' && (message_pos < sizeof(message) - 1)) {
+      message[message_pos] = inByte;
+      message_pos++;
+    } else {
+      message[message_pos] = '\0';
+      message_pos = 0;
+      if (strcmp(message, "STOP") == 0) {
+        return true;
+      }
+    }
+  }
+  return false;
+}
+
+// Abandon the running measurement and confirm with STOPPED
+void STOP_MEASUREMENT() {
+  if (WAITING_FOR_COMMAND == false && RECEIVED_ALL == false) {
+    DISCARD_GLOVE_DATA = true;
+  }
+  RECEIVING_GLOVE_DATA = false;
+  RECEIVED_ALL = false;
+  DRAW_GLOVE_DATA = false;
+  SEND_GLOVE_DATA = false;
+  WAITING_FOR_COMMAND = true;
+  prevESPNOW_Progress = -1;
+  Serial.println("STOPPED");
+  PRINT_TEXT("Stopped by PC", PINKish);
+  PRINT_TEXT("Waiting for LabVIEW...", WHITE);
+}
+
+// Send one stored sample to LabVIEW (5 values in stiffness mode, 3 otherwise)
+void SEND_DATA_LINE(int i) {
+  char buf[128]; // Increased buffer size for 5 float values
+  int mode = Array_mode[i];
+  
+  // Format data string for LabVIEW based on mode
+  if (mode == 3) {
+    // Stiffness mode: send all 5 values
+    sprintf(buf, "DATA%dx%dx%dx%.3fx%.3fx%.3fx%.3fx%.3f", 
+            Array_index[i], 
+            max_iti_number, 
+            Array_time_ms[i], 
+            Array_value1[i], 
+            Array_value2[i], 
+            Array_value3[i],
+            Array_value4[i], 
+            Array_value5[i]);
+  } else {
+    // Tremor and Bradykinesia modes: send 3 values for backward compatibility
+    sprintf(buf, "DATA%dx%dx%dx%.3fx%.3fx%.3f", 
+            Array_index[i], 
+            max_iti_number, 
+            Array_time_ms[i], 
+            Array_value1[i], 
+            Array_value2[i], 
+            Array_value3[i]);
+  }
+          
+  Serial.println(buf);
+}
+
 void PRINT_HEADING(int Screen) {
 
   uint16_t Dom_Color;